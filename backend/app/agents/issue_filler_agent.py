@@ -1,17 +1,65 @@
 """
 Issue filler agent - helps users fill in issue details.
 Simple function, no framework overhead.
+A local extraction pre-pass fills what it can before the LLM call; when that
+completes every mandatory field the LLM hop is skipped.
 """
 
-from app.shared_services.llm import call_llm_api
-from app.shared_services.logger_setup import setup_logger
-from app.prompts.issue_filler_prompt import get_issue_filler_prompt
+import os
+from typing import Callable, Optional
+
+from app.shared_services.llm import call_llm_api, acall_llm_api, astream_llm_field
+from app.shared_services.tracing import traced
+from app.shared_services.metrics import FILLER_HANDOFFS
+from app.shared_services.logger_setup import setup_logger, print_diagnostic
+from app.prompts.issue_filler_prompt import get_issue_filler_messages
 from app.models.najua_models import IssuesFillerResponse, NajuaState, IssueFillerHandoffResponse
-from app.shared_services.issue_validation import validate_issues, get_missing_fields
+from app.shared_services.issue_validation import validate_issues, get_missing_fields, is_issue_complete
+from app.shared_services.issue_extraction import prefill_issue, get_issue_extractor
 
 logger = setup_logger()
 
 
+# LLM settings shared by the sync and async entry points
+FILLER_LLM_SETTINGS = {
+    "response_format": IssuesFillerResponse,
+    "model": "gemini-2.5-flash",
+    "provider": "gemini",
+    "temperature": 0.3,
+}
+
+
+@traced("prompt.build", kind="prompt")
+def _build_messages(conversation_history: list, state: NajuaState) -> list:
+    # Static prompt and per-request status as separate system messages, then the conversation
+    return get_issue_filler_messages(state) + conversation_history
+
+
+def _prefilled_response(state: NajuaState) -> Optional[IssuesFillerResponse]:
+    """
+    Run the extraction pre-pass (updates state). If it completed the issue on this turn,
+    return the response the LLM would have given so the LLM call can be skipped.
+    An issue that was already complete (e.g. sent back by issue_reporting_agent for
+    clarification), or completed from an earlier message than the user's latest one,
+    always goes to the LLM.
+    """
+    issue, filled, current_turn = prefill_issue(state)
+    if not filled or not current_turn or not is_issue_complete(issue):
+        return None
+    if os.getenv("ISSUE_EXTRACTION_SKIP_LLM", "true").lower() != "true":
+        return None
+    get_issue_extractor().record(llm_skipped=1)
+    logger.info("Issue filler agent: all mandatory fields extracted locally, skipping LLM")
+    return IssuesFillerResponse(
+        message_to_user=(
+            f"Thank you. I have your {issue.issue_type.lower()} issue at {issue.issue_location}: "
+            f"\"{issue.issue_description}\". I'll now save it."
+        ),
+        issues=[issue],
+        suggested_handoff="issue_reporting_agent",
+    )
+
+
 def issue_filler_agent(conversation_history: list, state: NajuaState) -> IssueFillerHandoffResponse:
     """
     Issue filler agent - helps users fill in issue details.
@@ -24,22 +72,51 @@ def issue_filler_agent(conversation_history: list, state: NajuaState) -> IssueFi
     Returns:
         IssueFillerHandoffResponse object with validated handoff decision
     """
-    prompt = get_issue_filler_prompt(state)
+    llm_response = _prefilled_response(state)
+    if llm_response is None:
+        messages = _build_messages(conversation_history, state)
+        
+        # Call LLM with structured output
+        llm_response = call_llm_api(messages=messages, **FILLER_LLM_SETTINGS)
     
-    # Build messages
-    messages = [{"role": "system", "content": prompt}] + conversation_history
+    return _apply_filler_response(llm_response, state)
+
+
+def _ends_turn(partial) -> bool:
+    # A draft handed to issue_reporting_agent/welcome_agent is followed by that agent's reply -
+    # only stream it once the suggested handoff is known and the filler's reply ends the turn
+    return ("suggested_handoff" in partial.model_fields_set
+            and partial.suggested_handoff in ("continue_filling", "respond_to_user_agent"))
+
+
+async def aissue_filler_agent(conversation_history: list, state: NajuaState,
+                              on_message_delta: Optional[Callable[[str], None]] = None) -> IssueFillerHandoffResponse:
+    """
+    Async issue_filler_agent - awaits the LLM instead of blocking the event loop.
+    If on_message_delta is given, message_to_user is streamed to it as it is generated.
+    The streamed text is the LLM's draft - the final handoff message may differ after validation.
+    """
+    llm_response = _prefilled_response(state)
+    if llm_response is not None:
+        handoff = _apply_filler_response(llm_response, state)
+        if on_message_delta and handoff.agent == "respond_to_user_agent" and handoff.message_to_user:
+            on_message_delta(handoff.message_to_user)
+        return handoff
     
-    # Call LLM with structured output
-    llm_response: IssuesFillerResponse = call_llm_api(
-        messages=messages,
-        response_format=IssuesFillerResponse,
-        model="gemini-2.5-flash",
-        provider="gemini",
-        temperature=0.3
-    )
+    messages = _build_messages(conversation_history, state)
+    
+    if on_message_delta:
+        llm_response = await astream_llm_field(messages, on_message_delta, emit_when=_ends_turn, **FILLER_LLM_SETTINGS)
+    else:
+        llm_response = await acall_llm_api(messages=messages, **FILLER_LLM_SETTINGS)
+    
+    return _apply_filler_response(llm_response, state)
+
 
-    print(f"Issue filler agent LLM response: data {llm_response.model_dump_json()}")
-    logger.info(f"Issue filler agent LLM response: {llm_response}")
+def _apply_filler_response(llm_response: IssuesFillerResponse, state: NajuaState) -> IssueFillerHandoffResponse:
+    """Merge the LLM's issues into state, validate them and build the handoff"""
+    print_diagnostic("Issue filler agent LLM response", llm_response)
+    logger.debug("Issue filler agent LLM response: %s", llm_response)
     
     # Update state with issues from LLM response - merge with existing issues
     existing_issues = state.get("current_issues") or []
@@ -90,11 +167,14 @@ def issue_filler_agent(conversation_history: list, state: NajuaState) -> IssueFi
     # Validation override: If LLM suggests issue_reporting_agent but fields are incomplete, override to continue_filling
     if suggested_handoff == "issue_reporting_agent" and not all_complete:
         logger.warning(f"LLM suggested handoff to issue_reporting_agent but fields incomplete: {missing_info}. Overriding to continue_filling.")
+        FILLER_HANDOFFS.inc(decision="overridden")
         suggested_handoff = "continue_filling"
         # Update message to inform user we need more info
         if llm_response.message_to_user:
             missing_fields_str = "; ".join(missing_info)
             llm_response.message_to_user = f"{llm_response.message_to_user}\n\nI still need some information: {missing_fields_str}. Could you please provide these details?"
+    else:
+        FILLER_HANDOFFS.inc(decision=suggested_handoff)
     
     # Create handoff response programmatically
     if suggested_handoff == "issue_reporting_agent":
@@ -1,15 +1,164 @@
 """
 Issue reporting agent - saves issues that have been filled.
 Simple function, no framework overhead.
+A complete handoff from issue_filler_agent is saved without an LLM call (validated
+issues in, templated confirmation out); the LLM handles everything else.
 """
 
-from app.shared_services.llm import call_llm_api
-from app.shared_services.logger_setup import setup_logger
-from app.prompts.issue_reporting_prompt import get_issue_reporting_prompt
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from app.shared_services.llm import call_llm_api, acall_llm_api, astream_llm_field
+from app.shared_services.tracing import traced
+from app.shared_services.logger_setup import setup_logger, print_diagnostic
+from app.shared_services.issue_validation import validate_issues
+from app.prompts.issue_reporting_prompt import get_issue_reporting_messages
 from app.models.najua_models import IssueReportingHandoffResponse, NajuaState
+from app.tools.db_tools import save_issue_tool, asave_issue_tool
 
 logger = setup_logger()
 
+# LLM settings shared by the sync and async entry points
+REPORTING_LLM_SETTINGS = {
+    "response_format": IssueReportingHandoffResponse,
+    "model": "gpt-4o-mini",
+    "provider": "openai",
+    "temperature": 0.3,
+}
+
+
+@traced("prompt.build", kind="prompt")
+def _build_messages(conversation_history: list, state: NajuaState) -> list:
+    # Static prompt and per-request status as separate system messages, then the conversation
+    return get_issue_reporting_messages(state) + conversation_history
+
+
+def _responds_to_user(partial) -> bool:
+    # message_to_user is dropped unless the handoff is to respond_to_user_agent - don't stream it before that's known
+    return getattr(partial, "agent", None) == "respond_to_user_agent"
+
+
+def _log_response(response: IssueReportingHandoffResponse) -> None:
+    print_diagnostic("Issue reporting agent response", response)
+    logger.info("Issue reporting agent completed. Handoff to %s", response.agent)
+    logger.debug("Issue reporting agent response: %s", response)
+
+
+# Issue severity -> issues.priority
+SEVERITY_PRIORITY = {"low": "low", "medium": "medium", "high": "high", "critical": "critical"}
+
+
+def _issue_dict(issue) -> Dict[str, Any]:
+    return issue.model_dump() if hasattr(issue, "model_dump") else dict(issue)
+
+
+def _save_args(issue) -> Dict[str, Any]:
+    """save_issue_tool arguments for an issue in state"""
+    data = _issue_dict(issue)
+    description = data["issue_description"].strip()
+    title = description.split(". ")[0]
+    if len(title) > 80:
+        title = title[:77].rstrip() + "..."
+    return {
+        "title": title,
+        "description": description,
+        "priority": SEVERITY_PRIORITY.get(data.get("issue_severity") or "", "medium"),
+        "category": data["issue_type"],
+        "metadata": {
+            "location": data["issue_location"],
+            "issue_date": data.get("issue_date"),
+            "issue_time": data.get("issue_time"),
+            "severity": data.get("issue_severity"),
+            "source": "najua_chat",
+        },
+    }
+
+
+def _is_complete_handoff(state: NajuaState) -> bool:
+    """True when issue_filler_agent just handed over validated issues - nothing for the LLM to decide"""
+    if os.getenv("REPORTING_FAST_PATH", "true").lower() != "true":
+        return False
+    handoff = state.get("handoff_decision")
+    if state.get("current_node") != "issue_filler_agent" or getattr(handoff, "agent", None) != "issue_reporting_agent":
+        return False
+    all_complete, _ = validate_issues(state.get("current_issues"))
+    return all_complete
+
+
+def _mark_saved(state: NajuaState, results: List[Dict[str, Any]]) -> str:
+    """
+    Move the issues that were saved from current_issues to reported_issues (failed ones
+    stay for a retry); returns the confirmation lines
+    """
+    reported = list(state.get("reported_issues") or [])
+    remaining = []
+    lines = []
+    for issue, result in zip(state.get("current_issues") or [], results):
+        if not result.get("success"):
+            remaining.append(issue)
+            continue
+        data = _issue_dict(issue)
+        issue_id = result["issue"]["issue_id"]
+        reported.append({**data, "issue_status": "saved", "issue_id": issue_id, "duplicate_of": result.get("duplicate_of")})
+        if result.get("duplicate_of"):
+            lines.append(f"- {issue_id}: this was already reported, so your report was added to the existing issue")
+        else:
+            lines.append(f"- {issue_id}: {data['issue_type']} issue at {data['issue_location']}")
+    state["reported_issues"] = reported
+    state["current_issues"] = remaining
+    if lines:
+        state["issues_saved_at"] = len(state.get("conversation_history") or [])
+    return "\n".join(lines)
+
+
+def _saved_response(state: NajuaState, results: List[Dict[str, Any]]) -> IssueReportingHandoffResponse:
+    confirmation = _mark_saved(state, results)
+    failed = [r for r in results if not r.get("success")]
+    if failed:
+        # Only the failed issues are left in current_issues - the user's reply comes back here and the LLM path can retry them
+        logger.error(f"Issue reporting agent: saving failed: {[r.get('error') for r in failed]}")
+        if confirmation:
+            message = (
+                f"Some of your issues were saved. Reference number(s):\n{confirmation}\n\n"
+                "Sorry, I couldn't save the rest right now. Would you like me to try again?"
+            )
+        else:
+            message = "Sorry, I couldn't save your issue right now. Would you like me to try again?"
+        return IssueReportingHandoffResponse(
+            agent="respond_to_user_agent",
+            reasoning=f"Saving failed for {len(failed)} of {len(results)} issue(s): {failed[0].get('error')}",
+            message_to_user=message,
+            agent_after_human_response="issue_reporting_agent",
+            save_issues=True,
+        )
+    return IssueReportingHandoffResponse(
+        agent="respond_to_user_agent",
+        reasoning="Issues were complete and have been saved",
+        message_to_user=(
+            f"Your report has been saved. Reference number(s):\n{confirmation}\n\n"
+            "Is there anything else I can help you with?"
+        ),
+        agent_after_human_response="welcome_agent",
+        save_issues=True,
+    )
+
+
+def _confirms_saving(response: IssueReportingHandoffResponse, state: NajuaState) -> bool:
+    # Only an explicit save decision persists - a handback to issue_filler_agent never does
+    return (response.save_issues and response.agent != "issue_filler_agent"
+            and validate_issues(state.get("current_issues"))[0])
+
+
+def _with_references(response: IssueReportingHandoffResponse, state: NajuaState,
+                     results: List[Dict[str, Any]]) -> IssueReportingHandoffResponse:
+    """After the LLM confirmed saving: persist and add the reference numbers to its message"""
+    if not all(r.get("success") for r in results):
+        return _saved_response(state, results)
+    confirmation = _mark_saved(state, results)
+    if response.message_to_user:
+        response.message_to_user = f"{response.message_to_user}\n\nReference number(s):\n{confirmation}"
+    return response
+
 
 def issue_reporting_agent(conversation_history: list, state: NajuaState) -> IssueReportingHandoffResponse:
     """
@@ -22,24 +171,48 @@ def issue_reporting_agent(conversation_history: list, state: NajuaState) -> Issu
     Returns:
         IssueReportingHandoffResponse object (cannot handoff to itself, can handoff back to issue_filler_agent)
     """
-    prompt = get_issue_reporting_prompt(state)
+    if _is_complete_handoff(state):
+        results = [save_issue_tool.invoke(_save_args(issue)) for issue in state["current_issues"]]
+        response = _saved_response(state, results)
+        _log_response(response)
+        return response
     
-    # Build messages
-    messages = [{"role": "system", "content": prompt}] + conversation_history
+    messages = _build_messages(conversation_history, state)
     
     # Call LLM with structured output - using model that prevents self-handoff
-    response: IssueReportingHandoffResponse = call_llm_api(
-        messages=messages,
-        response_format=IssueReportingHandoffResponse,
-        model="gpt-4o-mini",
-        provider="openai",
-        temperature=0.3
-    )
+    response: IssueReportingHandoffResponse = call_llm_api(messages=messages, **REPORTING_LLM_SETTINGS)
+    
+    if _confirms_saving(response, state):
+        results = [save_issue_tool.invoke(_save_args(issue)) for issue in state["current_issues"]]
+        response = _with_references(response, state, results)
+    
+    _log_response(response)
+    return response
+
 
-    print(f"Issue reporting agent response: data {response.model_dump_json()}")
-    logger.info(f"Issue reporting agent response: {response}")
+async def aissue_reporting_agent(conversation_history: list, state: NajuaState,
+                                 on_message_delta: Optional[Callable[[str], None]] = None) -> IssueReportingHandoffResponse:
+    """Async issue_reporting_agent - awaits the LLM instead of blocking the event loop (streams like awelcome_agent)"""
+    if _is_complete_handoff(state):
+        results = [await asave_issue_tool.ainvoke(_save_args(issue)) for issue in state["current_issues"]]
+        response = _saved_response(state, results)
+        if on_message_delta:
+            on_message_delta(response.message_to_user)
+        _log_response(response)
+        return response
+    
+    messages = _build_messages(conversation_history, state)
+    
+    if on_message_delta:
+        response: IssueReportingHandoffResponse = await astream_llm_field(
+            messages, on_message_delta, emit_when=_responds_to_user, **REPORTING_LLM_SETTINGS
+        )
+    else:
+        response = await acall_llm_api(messages=messages, **REPORTING_LLM_SETTINGS)
     
-    # TODO: Update issue_status to "saved" in state if agent confirms saving
-    # This could be done here or in the node
+    if _confirms_saving(response, state):
+        results = [await asave_issue_tool.ainvoke(_save_args(issue)) for issue in state["current_issues"]]
+        response = _with_references(response, state, results)
     
+    _log_response(response)
     return response
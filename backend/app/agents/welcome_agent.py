@@ -1,15 +1,60 @@
 """
 Welcome agent - handles user triage and routing decisions.
 Simple function, no framework overhead.
+Obvious turns are answered by the local fast-path router; the LLM handles the rest.
 """
 
-from app.shared_services.llm import call_llm_api
-from app.shared_services.logger_setup import setup_logger
+import time
+from typing import Callable, Optional
+
+from app.shared_services.llm import call_llm_api, acall_llm_api, astream_llm_field
+from app.shared_services.tracing import traced
+from app.shared_services.logger_setup import setup_logger, print_diagnostic
+from app.shared_services.fast_router import get_fast_router
 from app.prompts.welcome_prompt import get_welcome_prompt
 from app.models.najua_models import WelcomeHandoffResponse
 
 logger = setup_logger()
 
+# LLM settings shared by the sync and async entry points
+WELCOME_LLM_SETTINGS = {
+    "response_format": WelcomeHandoffResponse,
+    "model": "tngtech/tng-r1t-chimera:free",
+    "provider": "openrouter",
+    "temperature": 0.3,
+    "cache": True,  # Triage is effectively deterministic - identical first turns ("hi") reuse the answer
+}
+
+
+@traced("prompt.build", kind="prompt")
+def _build_messages(conversation_history: list) -> list:
+    prompt = get_welcome_prompt()
+    
+    # Build messages: system prompt + conversation history
+    return [{"role": "system", "content": prompt}] + conversation_history
+
+
+def _responds_to_user(partial) -> bool:
+    # message_to_user is dropped unless the handoff is to respond_to_user_agent - don't stream it before that's known
+    return getattr(partial, "agent", None) == "respond_to_user_agent"
+
+
+def _log_decision(handoff_decision: WelcomeHandoffResponse) -> None:
+    print_diagnostic("Welcome agent response", handoff_decision)
+    logger.info("Welcome agent completed. Handoff to %s", handoff_decision.agent)
+    logger.debug("Welcome agent handoff decision: %s", handoff_decision)
+
+
+def _fast_path(conversation_history: list) -> Optional[WelcomeHandoffResponse]:
+    router = get_fast_router()
+    return router.route(conversation_history) if router else None
+
+
+def _record_llm_time(start: float) -> None:
+    # Fallback latency is what a fast-path hit saves
+    router = get_fast_router()
+    if router:
+        router.stats.record_llm(time.perf_counter() - start)
 
 
 def welcome_agent(conversation_history: list) -> WelcomeHandoffResponse:
@@ -22,21 +67,43 @@ def welcome_agent(conversation_history: list) -> WelcomeHandoffResponse:
     Returns:
         HandoffResponses with routing decision
     """
-    prompt = get_welcome_prompt()
+    handoff_decision = _fast_path(conversation_history)
+    if handoff_decision is None:
+        messages = _build_messages(conversation_history)
+        
+        # Call LLM with structured output using instructor
+        start = time.perf_counter()
+        handoff_decision = call_llm_api(messages=messages, **WELCOME_LLM_SETTINGS)
+        _record_llm_time(start)
     
-    # Build messages: system prompt + conversation history
-    messages = [{"role": "system", "content": prompt}] + conversation_history
+    _log_decision(handoff_decision)
+    return handoff_decision
+
+
+async def awelcome_agent(conversation_history: list,
+                         on_message_delta: Optional[Callable[[str], None]] = None) -> WelcomeHandoffResponse:
+    """
+    Async welcome_agent - awaits the LLM instead of blocking the event loop.
+    If on_message_delta is given, the response is streamed and message_to_user is
+    passed to it piece by piece as it is generated.
+    """
+    handoff_decision = _fast_path(conversation_history)
+    if handoff_decision is not None:
+        if on_message_delta and handoff_decision.message_to_user:
+            on_message_delta(handoff_decision.message_to_user)
+        _log_decision(handoff_decision)
+        return handoff_decision
     
-    # Call LLM with structured output using instructor
-    handoff_decision: WelcomeHandoffResponse = call_llm_api(
-        messages=messages,
-        response_format=WelcomeHandoffResponse,
-        model="tngtech/tng-r1t-chimera:free",
-        provider="openrouter",
-        temperature=0.3
-    )
+    messages = _build_messages(conversation_history)
     
-    print(f"Welcome agent response: data {handoff_decision.model_dump_json()}")
-    logger.info(f"Welcome agent completed. Handoff decision: {handoff_decision}")
+    start = time.perf_counter()
+    if on_message_delta:
+        handoff_decision: WelcomeHandoffResponse = await astream_llm_field(
+            messages, on_message_delta, emit_when=_responds_to_user, **WELCOME_LLM_SETTINGS
+        )
+    else:
+        handoff_decision = await acall_llm_api(messages=messages, **WELCOME_LLM_SETTINGS)
+    _record_llm_time(start)
     
+    _log_decision(handoff_decision)
     return handoff_decision
@@ -142,7 +142,8 @@ IMPORTANT: You must respond with a valid JSON object matching the WelcomeHandoff
                 AIMessage(content=handoff_decision.message_to_user)
             ]
         
-        logger.info(f"Welcome agent (LangGraph) completed. Handoff decision: {handoff_decision}")
+        logger.info("Welcome agent (LangGraph) completed. Handoff to %s", handoff_decision.agent)
+        logger.debug("Welcome agent (LangGraph) handoff decision: %s", handoff_decision)
         
     except Exception as e:
         logger.error(f"Error in welcome agent (LangGraph): {e}", exc_info=True)
@@ -201,8 +202,9 @@ def welcome_agent_langgraph(conversation_history: list) -> WelcomeHandoffRespons
     # Create initial state
     initial_state = WelcomeAgentState(messages=messages)
     
-    # Create and run graph
-    graph = create_welcome_agent_graph()
+    # Run the shared compiled graph (built once per process)
+    from app.graph.registry import get_compiled_graph
+    graph = get_compiled_graph("welcome_agent")
     result = graph.invoke(initial_state)
     
     # Extract handoff decision
@@ -1,4 +1,5 @@
 from .najua_graph import build_graph, get_graph
+from .registry import get_compiled_graph, warm_up_graphs, get_graph_registry_stats
 
-__all__ = ["build_graph", "get_graph"]
+__all__ = ["build_graph", "get_graph", "get_compiled_graph", "warm_up_graphs", "get_graph_registry_stats"]
 
@@ -2,67 +2,105 @@
 LangGraph workflow for Najua - flow control only.
 Uses your agent functions as nodes.
 Agents use instructor for LLM calls (no LangChain).
+Nodes are async and await the agents' async LLM calls, so graph.ainvoke never blocks the event loop.
+Agents see a compacted history (rolling summary + recent messages, see history_compaction).
+Each node runs in a tracing span (node.<agent>, see tracing) and is timed in metrics.
+A turn runs under a deadline (see deadline): every LLM call in its nodes gets the time left.
+With {"configurable": {"stream_messages": True}} the nodes stream message_to_user
+as it is generated (see astream_turn).
 """
 
-from typing import TypedDict, Optional, Literal
+from typing import TypedDict, Optional, Literal, Any, AsyncIterator, Callable, Dict
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END, START
 import os
+import time
 import logging
 from dotenv import load_dotenv
 
 from app.models.najua_models import NajuaState, WelcomeHandoffResponse, IssueReportingHandoffResponse, IssueFillerHandoffResponse
-from app.agents.welcome_agent import welcome_agent
-from app.agents.issue_reporting_agent import issue_reporting_agent
-from app.agents.issue_filler_agent import issue_filler_agent
+from app.agents.welcome_agent import awelcome_agent
+from app.agents.issue_reporting_agent import aissue_reporting_agent
+from app.agents.issue_filler_agent import aissue_filler_agent
+from app.shared_services.history_compaction import acompact_history
+from app.shared_services.llm import track_llm_usage
+from app.shared_services.turn_budget import guard_hop, max_turn_hops, new_turn_budget
+from app.shared_services.deadline import DeadlineExceededError, check_deadline, deadline_scope, new_turn_deadline
+from app.shared_services.tracing import traced, set_span_attributes
+from app.shared_services.metrics import timed, NODE_SECONDS, TURNS, TURN_SECONDS, TURN_HOPS
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 
-def welcome_agent_node(state: NajuaState) -> NajuaState:
+def _message_delta_writer(config: Optional[RunnableConfig], node: str) -> Optional[Callable[[str], None]]:
+    """Callback that emits message_to_user deltas on the graph's custom stream, if streaming was requested"""
+    if not config or not config.get("configurable", {}).get("stream_messages"):
+        return None
+    writer = get_stream_writer()
+    return lambda delta: writer({"node": node, "message_to_user_delta": delta})
+
+
+@traced("node.welcome_agent", kind="node")
+@timed(NODE_SECONDS, node="welcome_agent")
+async def welcome_agent_node(state: NajuaState, config: RunnableConfig = None) -> NajuaState:
     """Welcome agent node - triages and routes"""
-    conversation_history = state["conversation_history"]
-    handoff_decision = welcome_agent(conversation_history)
+    with track_llm_usage() as usage:
+        conversation_history = await acompact_history(state, "welcome_agent")
+        handoff_decision = await awelcome_agent(conversation_history, _message_delta_writer(config, "welcome_agent"))
     
     # Update state
     state["current_node"] = "welcome_agent"
     state["handoff_decision"] = handoff_decision
+    set_span_attributes(handoff=handoff_decision.agent)
     
     # Add message_to_user to conversation if it exists
     if handoff_decision.message_to_user:
         state["conversation_history"].append({"role": "assistant", "content": handoff_decision.message_to_user})
     
+    # Ends the turn instead if it has used up its hop/token budget or is looping
+    guard_hop(state, "welcome_agent", usage)
+    
     return state
 
 
-def issue_reporting_agent_node(state: NajuaState) -> NajuaState:
+@traced("node.issue_reporting_agent", kind="node")
+@timed(NODE_SECONDS, node="issue_reporting_agent")
+async def issue_reporting_agent_node(state: NajuaState, config: RunnableConfig = None) -> NajuaState:
     """Issue reporting agent node - saves issues"""
-    conversation_history = state["conversation_history"]
-    handoff_decision = issue_reporting_agent(conversation_history, state)
+    with track_llm_usage() as usage:
+        conversation_history = await acompact_history(state, "issue_reporting_agent")
+        handoff_decision = await aissue_reporting_agent(conversation_history, state, _message_delta_writer(config, "issue_reporting_agent"))
     
     # Update state
     state["current_node"] = "issue_reporting_agent"
     state["handoff_decision"] = handoff_decision
+    set_span_attributes(handoff=handoff_decision.agent)
     
     # Add message_to_user to conversation if it exists
     if handoff_decision.message_to_user:
         state["conversation_history"].append({"role": "assistant", "content": handoff_decision.message_to_user})
     
-    # TODO: Update issue_status to "saved" if agent confirms saving
-    # if handoff_decision.agent != "issue_filler_agent":
-    #     # Update issues status to "saved"
+    # Saved issues were moved from current_issues to reported_issues by the agent
+    
+    guard_hop(state, "issue_reporting_agent", usage)
     
     return state
 
 
-def issue_filler_agent_node(state: NajuaState) -> NajuaState:
+@traced("node.issue_filler_agent", kind="node")
+@timed(NODE_SECONDS, node="issue_filler_agent")
+async def issue_filler_agent_node(state: NajuaState, config: RunnableConfig = None) -> NajuaState:
     """Issue filler agent node - fills issue details and creates handoff"""
-    conversation_history = state["conversation_history"]
-    handoff_decision = issue_filler_agent(conversation_history, state)
+    with track_llm_usage() as usage:
+        conversation_history = await acompact_history(state, "issue_filler_agent")
+        handoff_decision = await aissue_filler_agent(conversation_history, state, _message_delta_writer(config, "issue_filler_agent"))
     
     # Update state
     state["current_node"] = "issue_filler_agent"
     state["handoff_decision"] = handoff_decision
+    set_span_attributes(handoff=handoff_decision.agent)
     
     # Add message_to_user to conversation if it exists
     if handoff_decision.message_to_user:
@@ -70,6 +108,8 @@ def issue_filler_agent_node(state: NajuaState) -> NajuaState:
     
     # Issues are already updated in issue_filler_agent function
     
+    guard_hop(state, "issue_filler_agent", usage)
+    
     return state
 
 
@@ -78,6 +118,7 @@ def route_after_agent(state: NajuaState) -> str:
     Route based on handoff decision from any agent.
     Returns the next node name or END.
     Note: respond_to_user_agent always ends the graph (user input expected to restart).
+    Turns over their hop/token budget are ended by the nodes (see turn_budget).
     """
     handoff_decision = state.get("handoff_decision")
     
@@ -85,6 +126,12 @@ def route_after_agent(state: NajuaState) -> str:
         logger.warning("No handoff decision found, ending")
         return END
     
+    # Backstop - nodes end the turn through guard_hop before the budget is exceeded
+    max_hops = max_turn_hops()
+    if max_hops and state.get("turn_hops", 0) > max_hops:
+        logger.warning(f"Turn exceeded {max_hops} hops ({state.get('turn_path')}), ending")
+        return END
+    
     # Get agent name from handoff decision (works for all handoff response types)
     agent_name = handoff_decision.agent
     
@@ -126,8 +173,8 @@ def determine_entry_point(state: NajuaState) -> str:
         return "welcome_agent"
 
 
-def build_graph():
-    """Build the Najua workflow graph"""
+def build_graph(checkpointer=None):
+    """Build the Najua workflow graph (pass a checkpointer to persist state per thread_id)"""
     workflow = StateGraph(NajuaState)
     
     # Add nodes
@@ -166,9 +213,76 @@ def build_graph():
             common_routing
         )
     
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def new_conversation_state() -> NajuaState:
+    """Empty state for a new conversation"""
+    return {
+        "conversation_history": [],
+        "current_node": None,
+        "handoff_decision": None,
+        "current_issues": [],
+        "history_summary": None,
+        "reported_issues": [],
+        "issues_saved_at": 0,
+        **new_turn_budget(),
+    }
+
+
+async def astream_turn(graph, state: NajuaState, config: Optional[RunnableConfig] = None,
+                       durability: Optional[str] = None, deadline: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run one conversation turn, yielding events as they happen.
+    durability is passed to LangGraph for checkpointed graphs ("exit" saves once per turn).
+    deadline (time.monotonic) bounds the turn's LLM calls; default TURN_DEADLINE_SECONDS from now.
+    Raises DeadlineExceededError if it passes before the turn could be answered.
+    Events:
+        {"type": "message_delta", "node": ..., "delta": "..."} - message_to_user text as it is generated
+        {"type": "message", "node": ..., "content": "..."} - an assistant message once its node has finished
+            (the text may differ from the streamed draft, e.g. after validation)
+        {"type": "final", "state": {...}} - the resulting state (always last)
+    """
+    config = dict(config or {})
+    config["configurable"] = {**config.get("configurable", {}), "stream_messages": True}
+    # Every turn starts with a fresh hop/token budget
+    state = {**state, **new_turn_budget()}
+    
+    kwargs = {"durability": durability} if durability else {}
+    
+    final_state = None
+    values_seen = 0
+    history_len = len(state.get("conversation_history") or [])
+    start = time.perf_counter()
+    try:
+        # Nodes run in tasks created inside the scope, so they inherit the deadline
+        with deadline_scope(deadline if deadline is not None else new_turn_deadline()):
+            check_deadline("the turn started")
+            async for mode, chunk in graph.astream(state, config=config, stream_mode=["custom", "values"], **kwargs):
+                if mode == "custom" and "message_to_user_delta" in chunk:
+                    yield {"type": "message_delta", "node": chunk["node"], "delta": chunk["message_to_user_delta"]}
+                elif mode == "values":
+                    final_state = chunk
+                    values_seen += 1
+                    history = chunk.get("conversation_history") or []
+                    for message in history[history_len:]:
+                        if message.get("role") == "assistant":
+                            yield {"type": "message", "node": chunk.get("current_node"), "content": message.get("content", "")}
+                    history_len = len(history)
+    except DeadlineExceededError:
+        TURNS.inc(status="deadline")
+        raise
+    except Exception:
+        TURNS.inc(status="error")
+        raise
+    TURNS.inc(status="ok")
+    TURN_SECONDS.observe(time.perf_counter() - start)
+    # The first values chunk is the input state; each one after it follows a node
+    TURN_HOPS.observe(max(0, values_seen - 1))
+    yield {"type": "final", "state": final_state}
 
 
 def get_graph():
-    """Get the compiled graph"""
-    return build_graph()
+    """Get the compiled graph (built once per process, see app.graph.registry)"""
+    from app.graph.registry import get_compiled_graph
+    return get_compiled_graph("najua")
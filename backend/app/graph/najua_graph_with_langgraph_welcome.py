@@ -193,6 +193,7 @@ def build_graph_with_langgraph_welcome():
 
 
 def get_graph_with_langgraph_welcome():
-    """Get the compiled graph with LangGraph welcome agent"""
-    return build_graph_with_langgraph_welcome()
+    """Get the compiled graph with LangGraph welcome agent (built once per process)"""
+    from app.graph.registry import get_compiled_graph
+    return get_compiled_graph("najua_langgraph_welcome")
 
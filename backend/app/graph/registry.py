@@ -0,0 +1,108 @@
+"""
+Compiled graph registry.
+Each workflow variant is built and compiled once per process and then shared.
+A compiled graph holds no per-conversation state, so one instance can serve any
+number of concurrent ainvoke/astream calls - pass the conversation's thread_id
+in the config ({"configurable": {"thread_id": ...}}) to keep them apart.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _build_najua():
+    from app.graph.najua_graph import build_graph
+    return build_graph()
+
+
+def _build_najua_persistent():
+    from app.graph.najua_graph import build_graph
+    from app.shared_services.checkpointer import get_checkpointer
+    return build_graph(checkpointer=get_checkpointer())
+
+
+def _build_najua_langgraph_welcome():
+    from app.graph.najua_graph_with_langgraph_welcome import build_graph_with_langgraph_welcome
+    return build_graph_with_langgraph_welcome()
+
+
+def _build_welcome_agent():
+    from app.agents.welcome_agent_langgraph import create_welcome_agent_graph
+    return create_welcome_agent_graph()
+
+
+# Workflow variants by name. Builders import lazily so optional LangChain
+# providers are only needed for the variants actually used.
+GRAPH_BUILDERS: Dict[str, Callable[[], Any]] = {
+    "najua": _build_najua,
+    "najua_persistent": _build_najua_persistent,
+    "najua_langgraph_welcome": _build_najua_langgraph_welcome,
+    "welcome_agent": _build_welcome_agent,
+}
+
+DEFAULT_GRAPH = "najua"
+
+_graphs: Dict[str, Any] = {}
+_build_times: Dict[str, float] = {}
+_lookups: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def register_graph(name: str, builder: Callable[[], Any]) -> None:
+    """Add (or replace) a workflow variant. A replaced variant is rebuilt on next use."""
+    with _lock:
+        GRAPH_BUILDERS[name] = builder
+        _graphs.pop(name, None)
+
+
+def get_compiled_graph(name: str = DEFAULT_GRAPH):
+    """Get the compiled graph for a workflow variant, building it on first use"""
+    graph = _graphs.get(name)
+    if graph is None:
+        if name not in GRAPH_BUILDERS:
+            raise KeyError(f"Unknown graph '{name}'. Available: {sorted(GRAPH_BUILDERS)}")
+        with _lock:
+            graph = _graphs.get(name)
+            if graph is None:
+                start = time.perf_counter()
+                try:
+                    graph = GRAPH_BUILDERS[name]()
+                except Exception as e:
+                    logger.error(f"Error building graph '{name}': {e}")
+                    raise
+                _build_times[name] = time.perf_counter() - start
+                _graphs[name] = graph
+                logger.info(f"Graph '{name}' compiled in {_build_times[name] * 1000:.1f} ms")
+    _lookups[name] = _lookups.get(name, 0) + 1
+    return graph
+
+
+def warm_up_graphs(names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """
+    Startup hook - compile graphs before the first request.
+    Defaults to the main Najua graph. Returns build time (seconds) per graph.
+    """
+    names = list(names) if names is not None else [DEFAULT_GRAPH]
+    for name in names:
+        get_compiled_graph(name)
+    return {name: _build_times.get(name, 0.0) for name in names}
+
+
+def clear_graph_registry() -> None:
+    """Drop all compiled graphs (e.g. after changing node code in a long-running process)"""
+    with _lock:
+        _graphs.clear()
+        _build_times.clear()
+        _lookups.clear()
+
+
+def get_graph_registry_stats() -> Dict[str, Dict[str, Any]]:
+    """Compiled graphs with their one-off build time and how often they were reused"""
+    return {
+        name: {"build_time_ms": round(_build_times.get(name, 0.0) * 1000, 3), "lookups": _lookups.get(name, 0)}
+        for name in _graphs
+    }
@@ -40,6 +40,9 @@ class IssueReportingHandoffResponse(BaseModel):
         default="welcome_agent",
         description="The agent to handle the user's response. Defaults to 'welcome_agent' if message_to_user is provided."
     )
+    save_issues: bool = Field(
+        False, description="True only if the issues are complete and should be saved now. Never true when handing back to issue_filler_agent."
+    )
     
     @model_validator(mode='after')
     def validate_message_to_user(self):
@@ -101,6 +104,13 @@ class NajuaState(TypedDict, total=False):
     current_node: Optional[str]  # Current agent/node name
     handoff_decision: Optional[Union[WelcomeHandoffResponse, IssueReportingHandoffResponse]]  # Last handoff decision (can be any type - IssueFillerHandoffResponse added after definition)
     current_issues: Optional[List[Issue]]
+    history_summary: Optional[Dict[str, Any]]  # Rolling summary of older turns: {"text": str, "covered": n messages}
+    reported_issues: Optional[List[Dict[str, Any]]]  # Issues saved this session, with issue_id and issue_status "saved"
+    issues_saved_at: int  # len(conversation_history) at the last save - issue extraction only reads later messages
+    # Turn budget (reset every turn, see turn_budget)
+    turn_hops: int  # Nodes run this turn
+    turn_llm_tokens: int  # Prompt + completion tokens used this turn
+    turn_path: List[str]  # "node->handoff" per hop this turn, for loop detection
     # Add more fields as needed:
     # user_id: Optional[str]
     # session_id: Optional[str]
@@ -1,11 +1,34 @@
 """
 Issue filler prompt for the issue filler agent.
 """
+from typing import Dict, List
+
 from app.models.najua_models import IssuesFillerResponse, NajuaState, IssueFillerResponse
-from app.shared_services.issue_validation import get_missing_fields, is_issue_complete, get_mandatory_fields
-import json
+from app.shared_services.issue_validation import is_issue_complete, get_mandatory_fields
+from app.prompts.prompt_template import PromptTemplate
+
+
+def _new_issue_status_text() -> str:
+    """Status text when there are no issues yet - depends only on the mandatory fields, so built once"""
+    issues_status_text = "No issues in state yet. You will need to create a new issue.\n"
+    issues_status_text += "\nWhen creating a new issue, you MUST collect ALL of these mandatory fields:\n"
+    for field in get_mandatory_fields():
+        field_desc = {
+            "issue_type": "Issue type (Infrastructure, Education, Health, etc.)",
+            "issue_description": "Detailed description of the issue",
+            "issue_location": "Specific location (street, area, landmarks)",
+            "issue_severity": "Severity level (low, medium, high, critical)",
+            "issue_priority": "Priority level (low, medium, high)"
+        }.get(field, field)
+        issues_status_text += f"  - {field_desc}\n"
+    return issues_status_text
+
 
-def get_issue_filler_prompt(state: NajuaState) -> str:
+NEW_ISSUE_STATUS_TEXT = _new_issue_status_text()
+
+
+def _issues_status_block(state: NajuaState) -> str:
+    """Per-request part: status of each issue in state"""
     current_issues = state.get("current_issues", [])
     
     # Build detailed issue status with missing fields
@@ -80,19 +103,15 @@ def get_issue_filler_prompt(state: NajuaState) -> str:
             
             issues_status_text += "\n"
     else:
-        issues_status_text = "No issues in state yet. You will need to create a new issue.\n"
-        issues_status_text += "\nWhen creating a new issue, you MUST collect ALL of these mandatory fields:\n"
-        for field in mandatory_fields:
-            field_desc = {
-                "issue_type": "Issue type (Infrastructure, Education, Health, etc.)",
-                "issue_description": "Detailed description of the issue",
-                "issue_location": "Specific location (street, area, landmarks)",
-                "issue_severity": "Severity level (low, medium, high, critical)",
-                "issue_priority": "Priority level (low, medium, high)"
-            }.get(field, field)
-            issues_status_text += f"  - {field_desc}\n"
+        issues_status_text = NEW_ISSUE_STATUS_TEXT
     
     return f"""
+CURRENT ISSUES STATUS:
+{issues_status_text}"""
+
+
+ISSUE_FILLER_PROMPT = PromptTemplate(
+    static="""
 You are an issue filler assistant for Najua, a system where citizens in Kenya can report non-emergency issues that need to be addressed by the government.
 
 Your role is to:
@@ -117,12 +136,11 @@ AUTO-FILLED FIELDS (will be auto-filled if not provided):
 - issue_date: Date in YYYY-MM-DD format (defaults to today)
 - issue_time: Time in HH:MM format (defaults to current time)
 
-CURRENT ISSUES STATUS:
-{issues_status_text}
+The CURRENT ISSUES STATUS at the end of this prompt shows what has been collected so far.
 
 IMPORTANT RULES:
 1. DO NOT accept incomplete information. If mandatory fields are missing, you MUST ask for them using message_to_user.
-2. Focus on the MISSING MANDATORY FIELDS shown above - these are what you need to collect.
+2. Focus on the MISSING MANDATORY FIELDS shown in CURRENT ISSUES STATUS below - these are what you need to collect.
 3. Ask for ONE or TWO missing fields at a time - don't overwhelm the user with too many questions at once.
 4. Be conversational and friendly when asking for information.
 5. **CRITICAL**: You MUST ALWAYS return the existing issue(s) in your response, updating only the fields that the user provides new information for. NEVER return None or empty list for issues.
@@ -159,7 +177,7 @@ RESPONSE FORMAT:
 You must return a valid IssuesFillerResponse object with:
 - message_to_user: ALWAYS provide this. If fields are missing, ask for them specifically. If all fields are complete, acknowledge completion.
 - issues: List of IssueFillerResponse objects with ALL information you've gathered so far. 
-  **CRITICAL**: You MUST ALWAYS include the existing issue data from CURRENT ISSUES STATUS above, and only UPDATE fields that the user provides new information for. 
+  **CRITICAL**: You MUST ALWAYS include the existing issue data from CURRENT ISSUES STATUS below, and only UPDATE fields that the user provides new information for. 
   NEVER return None or empty list for issues - always preserve and update existing data.
   If the user provides new information, merge it with existing data. If no new information, return existing data unchanged.
 - suggested_handoff: Your suggestion for next step:
@@ -171,7 +189,7 @@ You must return a valid IssuesFillerResponse object with:
 IMPORTANT: Only suggest "issue_reporting_agent" if ALL mandatory fields are filled for ALL issues. The system will validate this and override if incomplete.
 
 Schema:
-{IssuesFillerResponse.model_json_schema()}
+{schema}
 
 EXAMPLE FLOW:
 User: "I want to report a pothole in Kitengela"
@@ -179,5 +197,13 @@ You: Check status - missing severity and priority. Ask for these. suggested_hand
 User: "It's very deep and dangerous, high priority"
 You: Update issue with severity="high" and priority="high". Check status - all fields complete. suggested_handoff: "issue_reporting_agent"
 
-Remember: Your goal is to collect COMPLETE information for ALL issues. Use the CURRENT ISSUES STATUS above to know exactly what's missing. The system will prevent handoff to issue_reporting_agent if any fields are incomplete.
-"""
+Remember: Your goal is to collect COMPLETE information for ALL issues. Use the CURRENT ISSUES STATUS below to know exactly what's missing. The system will prevent handoff to issue_reporting_agent if any fields are incomplete.
+""",
+    response_format=IssuesFillerResponse,
+    dynamic=_issues_status_block,
+)
+
+
+def get_issue_filler_messages(state: NajuaState) -> List[Dict[str, str]]:
+    """System messages: the static prompt, then the per-request block"""
+    return ISSUE_FILLER_PROMPT.system_messages(state)
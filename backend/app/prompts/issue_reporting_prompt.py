@@ -2,13 +2,18 @@
 Issue reporting prompt for the issue reporting agent.
 This agent receives issues that have been filled by the issue_filler_agent and saves them.
 """
+import json
+from typing import Dict, List
+
 from app.models.najua_models import IssueReportingHandoffResponse, NajuaState
+from app.prompts.prompt_template import PromptTemplate
+
 
-def get_issue_reporting_prompt(state: NajuaState) -> str:
+def _issues_block(state: NajuaState) -> str:
+    """Per-request part: the issues currently in state"""
     current_issues = state.get("current_issues", [])
     issues_info = ""
     if current_issues:
-        import json
         issues_list = []
         for issue in current_issues:
             if hasattr(issue, 'model_dump'):
@@ -16,8 +21,15 @@ def get_issue_reporting_prompt(state: NajuaState) -> str:
             else:
                 issues_list.append(issue)
         issues_info = json.dumps(issues_list, indent=2)
-    
+
     return f"""
+CURRENT ISSUES TO SAVE:
+{issues_info if issues_info else "No issues in state yet"}
+"""
+
+
+ISSUE_REPORTING_PROMPT = PromptTemplate(
+    static="""
 You are an issue reporting assistant for Najua, a system where citizens in Kenya can report non-emergency issues that need to be addressed by the government.
 
 Your role is to:
@@ -26,13 +38,13 @@ Your role is to:
 3. Save the issue(s) by updating their status to "saved"
 4. Confirm with the user that their issue has been saved
 
-CURRENT ISSUES TO SAVE:
-{issues_info if issues_info else "No issues in state yet"}
+The issues to save are listed under CURRENT ISSUES TO SAVE at the end of this prompt.
 
 IMPORTANT GUIDELINES:
 - You receive issues that should already have all mandatory fields filled (type, description, location, severity, priority)
 - If you notice missing or unclear information, you can handoff back to issue_filler_agent to get more details
-- Once satisfied, update the issue_status to "saved" and confirm with the user
+- Once satisfied, set save_issues to true and confirm with the user - the issues are only saved when save_issues is true
+- Leave save_issues false when asking a question, handing back to issue_filler_agent, or when the user declines
 - Be professional, empathetic, and clear in your communication
 
 HANDOFF OPTIONS:
@@ -42,15 +54,22 @@ HANDOFF OPTIONS:
 - issue_enquiry_agent: If the user wants to enquire about existing issues (not yet implemented)
 
 IMPORTANT: Ensure you return a valid IssueReportingHandoffResponse object.
-{IssueReportingHandoffResponse.model_json_schema()}
+{schema}
 
 WORKFLOW:
 1. Review the issue(s) in state
-2. If complete and clear, save them (update status) and confirm with user
-3. If incomplete or unclear, handoff back to issue_filler_agent
+2. If complete and clear, save them (save_issues: true) and confirm with user
+3. If incomplete or unclear, handoff back to issue_filler_agent (save_issues: false)
 4. Use message_to_user to communicate with the user
 5. Set agent_after_human_response appropriately based on what you expect next
 
 Remember: You work WITH issue_filler_agent - they collect details, you save them. If something is missing, send it back to them.
-"""
+""",
+    response_format=IssueReportingHandoffResponse,
+    dynamic=_issues_block,
+)
+
 
+def get_issue_reporting_messages(state: NajuaState) -> List[Dict[str, str]]:
+    """System messages: the static prompt, then the per-request block"""
+    return ISSUE_REPORTING_PROMPT.system_messages(state)
@@ -0,0 +1,60 @@
+"""
+Precompiled prompt templates.
+A system prompt is split into a static prefix - instructions plus the response
+schema, rendered once per process - and a small dynamic block formatted per
+request and appended at the end. The prefix is byte-identical on every call, so
+provider-side prompt caching can reuse it.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+from app.shared_services.llm import get_schema_json
+
+SCHEMA_PLACEHOLDER = "{schema}"
+
+
+class PromptTemplate:
+    """
+    Args:
+        static: Prompt text that never changes. SCHEMA_PLACEHOLDER is replaced with the
+            response model's JSON schema (plain replace - braces elsewhere are left alone).
+        response_format: Pydantic model whose schema is embedded
+        dynamic: Optional function building the per-request block from render()'s arguments
+    """
+
+    def __init__(self, static: str, response_format: Optional[type] = None,
+                 dynamic: Optional[Callable[..., str]] = None):
+        self.static = static
+        self.response_format = response_format
+        self.dynamic = dynamic
+        self._prefix: Optional[str] = None
+
+    def build_prefix(self) -> str:
+        """Render the static part (uncached)"""
+        text = self.static
+        if self.response_format is not None:
+            text = text.replace(SCHEMA_PLACEHOLDER, get_schema_json(self.response_format))
+        return text
+
+    @property
+    def prefix(self) -> str:
+        """The static part, rendered on first use"""
+        if self._prefix is None:
+            self._prefix = self.build_prefix()
+        return self._prefix
+
+    def render(self, *args, **kwargs) -> str:
+        if self.dynamic is None:
+            return self.prefix
+        return self.prefix + self.dynamic(*args, **kwargs)
+
+    def system_messages(self, *args, **kwargs) -> List[Dict[str, str]]:
+        """
+        The prompt as system messages: the prefix first, the dynamic block (if any) as a
+        second message. Providers that cache the leading system message (Gemini context
+        caches) then only cache the part that never changes.
+        """
+        messages = [{"role": "system", "content": self.prefix}]
+        if self.dynamic is not None:
+            messages.append({"role": "system", "content": self.dynamic(*args, **kwargs)})
+        return messages
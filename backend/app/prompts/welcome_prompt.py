@@ -3,9 +3,10 @@ Welcome prompt is a prompt that is used to welcome the user to the system.
 """
 
 from app.models.najua_models import WelcomeHandoffResponse
+from app.prompts.prompt_template import PromptTemplate
 
-def get_welcome_prompt() -> str:
-    return f"""
+WELCOME_PROMPT = PromptTemplate(
+    static="""
 
 
 You are an entry point to Najua, a system where citizens in Kenya can post any issues that need to be addressed by the government.
@@ -42,7 +43,7 @@ iii. respond_to_user_agent:
  You can also use this agent if the user's issue is an emergency.
 
  To respond, strictly use the following format:
- {WelcomeHandoffResponse.model_json_schema()}
+ {schema}
  
  IMPORTANT: If you provide a 'message_to_user', you MUST also provide 'agent_after_human_response' 
  to specify which agent will handle the user's response after they see your message.
@@ -50,4 +51,10 @@ iii. respond_to_user_agent:
 
 
 
-"""
\ No newline at end of file
+""",
+    response_format=WelcomeHandoffResponse,
+)
+
+
+def get_welcome_prompt() -> str:
+    return WELCOME_PROMPT.render()
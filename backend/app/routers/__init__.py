@@ -0,0 +1,3 @@
+from .chat import router as chat_router
+
+__all__ = ["chat_router"]
@@ -0,0 +1,131 @@
+"""
+Chat endpoints - one conversation per session id.
+
+    POST   /sessions                      -> {"session_id"}
+    POST   /sessions/{session_id}/messages  {"message": "..."} -> reply once the turn completes (404 unless
+                                            the id came from POST /sessions)
+    GET    /sessions/{session_id}         -> session summary
+    DELETE /sessions/{session_id}
+    WS     /sessions/{session_id}/ws      send {"message": "..."}; receive message_delta and message events, then a reply
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field
+
+from app.shared_services.deadline import DeadlineExceededError
+from app.shared_services.logger_setup import setup_logger
+from app.shared_services.session_manager import (
+    SessionManager, SessionBusyError, ServerBusyError, SessionNotFoundError, last_assistant_message,
+)
+
+logger = setup_logger()
+
+router = APIRouter(prefix="/sessions", tags=["chat"])
+
+
+class MessageRequest(BaseModel):
+    message: str = Field(..., min_length=1, description="The citizen's message")
+
+
+class MessageResponse(BaseModel):
+    session_id: str
+    reply: str
+    current_node: Optional[str] = None
+    reported_issues: List[Dict[str, Any]] = Field(default_factory=list)
+
+
+def _sessions(app) -> SessionManager:
+    return app.state.sessions
+
+
+def _reply(session_id: str, state) -> MessageResponse:
+    return MessageResponse(
+        session_id=session_id,
+        reply=last_assistant_message(state),
+        current_node=state.get("current_node"),
+        reported_issues=state.get("reported_issues") or [],
+    )
+
+
+@router.post("")
+async def create_session(request: Request) -> Dict[str, str]:
+    try:
+        session = await _sessions(request.app).create()
+    except ServerBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"session_id": session.session_id}
+
+
+@router.post("/{session_id}/messages", response_model=MessageResponse)
+async def post_message(session_id: str, body: MessageRequest, request: Request) -> MessageResponse:
+    try:
+        future = await _sessions(request.app).submit(session_id, body.message)
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    except SessionBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ServerBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    try:
+        state = await future
+    except asyncio.CancelledError:
+        raise HTTPException(status_code=503, detail="Turn cancelled (server shutting down)")
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=f"Turn timed out: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Turn failed: {e}")
+    return _reply(session_id, state)
+
+
+@router.get("/{session_id}")
+async def get_session(session_id: str, request: Request) -> Dict[str, Any]:
+    try:
+        return _sessions(request.app).summary(session_id)
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+
+
+@router.delete("/{session_id}")
+async def delete_session(session_id: str, request: Request) -> Dict[str, Any]:
+    await _sessions(request.app).close_session(session_id)
+    return {"session_id": session_id, "closed": True}
+
+
+@router.websocket("/{session_id}/ws")
+async def session_websocket(websocket: WebSocket, session_id: str):
+    await websocket.accept()
+    sessions = _sessions(websocket.app)
+
+    async def send_event(event: Dict[str, Any]) -> None:
+        await websocket.send_json(event)
+
+    try:
+        while True:
+            data = await websocket.receive_json()
+            message = (data or {}).get("message")
+            if not message:
+                await websocket.send_json({"type": "error", "error": "Expected {\"message\": \"...\"}"})
+                continue
+            try:
+                future = await sessions.submit(session_id, message, sink=send_event)
+            except SessionNotFoundError:
+                await websocket.send_json({"type": "error", "error": f"Session {session_id} not found"})
+                await websocket.close(code=4404)
+                return
+            except (SessionBusyError, ServerBusyError) as e:
+                await websocket.send_json({"type": "error", "error": str(e), "retry": True})
+                continue
+            try:
+                state = await future
+            except DeadlineExceededError as e:
+                await websocket.send_json({"type": "error", "error": f"Turn timed out: {e}", "retry": True})
+                continue
+            except Exception as e:
+                await websocket.send_json({"type": "error", "error": f"Turn failed: {e}"})
+                continue
+            await websocket.send_json({"type": "reply", **_reply(session_id, state).model_dump()})
+    except WebSocketDisconnect:
+        logger.info(f"[Chat] WebSocket for session {session_id} disconnected")
@@ -0,0 +1,248 @@
+"""
+Async issue repository backed by asyncpg.
+Mirrors app.shared_services.db for code running on the event loop (graph.ainvoke),
+so DB calls never block it.
+"""
+
+import os
+import json
+import asyncio
+import weakref
+from typing import List, Dict, Any, Optional, AsyncIterator
+from datetime import datetime
+import logging
+
+import asyncpg
+from dotenv import load_dotenv
+
+from .db import ISSUE_SUMMARY_COLUMNS, decode_issues_cursor, encode_issues_cursor, resolve_issue_columns
+from .tracing import traced
+from .metrics import timed, DB_QUERY_SECONDS, ISSUES_SAVED
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# One pool per event loop - asyncpg pools cannot be shared across loops.
+# Keyed by the loop object itself: id() of a closed loop can be reused by the next one.
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncpg.Pool]" = weakref.WeakKeyDictionary()
+_pool_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+# Parked generators that close each loop's pool when the loop shuts down (see _close_pool_at_shutdown)
+_pool_closers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncIterator[None]]" = weakref.WeakKeyDictionary()
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Decode JSON/JSONB columns to Python objects, like psycopg2 does"""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema="pg_catalog",
+        )
+
+
+async def _close_pool_at_shutdown() -> AsyncIterator[None]:
+    """
+    Started once and left suspended: asyncio.run() (and uvicorn) call loop.shutdown_asyncgens()
+    before closing the loop, which finalizes this generator and closes the loop's pool.
+    """
+    try:
+        yield
+    finally:
+        await close_async_pool()
+
+
+async def get_async_pool() -> asyncpg.Pool:
+    """
+    Get (or create) the asyncpg pool for the running event loop.
+    Uses the same PG* / DB_SSL_MODE / DB_POOL_* settings as the sync pool.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is not None:
+        return pool
+
+    lock = _pool_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        pool = _pools.get(loop)
+        if pool is None:
+            db_ssl_mode = os.getenv("DB_SSL_MODE", "disable")
+            try:
+                pool = await asyncpg.create_pool(
+                    host=os.getenv("PGHOST", "localhost"),
+                    port=int(os.getenv("PGPORT", "5432")),
+                    database=os.getenv("PGDATABASE", "kunani"),
+                    user=os.getenv("PGUSER", "kunani_user"),
+                    password=os.getenv("PGPASSWORD", "kunani_password"),
+                    ssl=None if db_ssl_mode == "disable" else db_ssl_mode,
+                    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                    max_inactive_connection_lifetime=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                    init=_init_connection,
+                )
+            except Exception as e:
+                logger.error(f"Unable to create async database pool. Error: {e}")
+                raise
+            _pools[loop] = pool
+            closer = _pool_closers[loop] = _close_pool_at_shutdown()
+            await closer.__anext__()  # registers it with the loop's async generator tracking
+            logger.info(f"Async database pool created (min={pool.get_min_size()}, max={pool.get_max_size()})")
+    return pool
+
+
+async def close_async_pool() -> None:
+    """Close the pool belonging to the running event loop"""
+    loop = asyncio.get_running_loop()
+    pool = _pools.pop(loop, None)
+    _pool_locks.pop(loop, None)
+    _pool_closers.pop(loop, None)
+    if pool is not None:
+        await pool.close()
+
+
+@traced("db.asave_issue", kind="db")
+@timed(DB_QUERY_SECONDS, op="save_issue")
+async def asave_issue(issue: Dict[str, Any]) -> Dict[str, Any]:
+    """Save an issue to the database"""
+    try:
+        pool = await get_async_pool()
+        result = await pool.fetchrow(
+            """
+            INSERT INTO issues (
+                issue_id, title, description, status, priority,
+                category, tags, metadata
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            RETURNING *
+            """,
+            issue["issue_id"],
+            issue["title"],
+            issue["description"],
+            issue.get("status", "open"),
+            issue.get("priority", "medium"),
+            issue.get("category"),
+            issue.get("tags", []),
+            issue.get("metadata", {}),
+        )
+        logger.info(f"Issue saved: {issue['issue_id']}")
+        ISSUES_SAVED.inc(path="async")
+        return dict(result)
+    except Exception as e:
+        logger.error(f"Error saving issue: {e}")
+        raise
+
+
+@traced("db.aget_issue", kind="db")
+@timed(DB_QUERY_SECONDS, op="get_issue")
+async def aget_issue(issue_id: str) -> Optional[Dict[str, Any]]:
+    """Get an issue by issue_id"""
+    try:
+        pool = await get_async_pool()
+        result = await pool.fetchrow("SELECT * FROM issues WHERE issue_id = $1", issue_id)
+        if result:
+            return dict(result)
+        return None
+    except Exception as e:
+        logger.error(f"Error getting issue: {e}")
+        raise
+
+
+@traced("db.aget_all_issues", kind="db")
+@timed(DB_QUERY_SECONDS, op="get_all_issues")
+async def aget_all_issues(limit: int = 100, status: Optional[str] = None,
+                          columns: Optional[List[str]] = None,
+                          cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Get all issues with optional filtering, newest first (see db.get_all_issues)"""
+    try:
+        conditions = []
+        params: List[Any] = []
+        if status:
+            params.append(status)
+            conditions.append(f"status = ${len(params)}")
+        if cursor:
+            params.extend(decode_issues_cursor(cursor))
+            conditions.append(f"(created_at, id) < (${len(params) - 1}, ${len(params)})")
+        params.append(limit)
+
+        query = f"SELECT {', '.join(resolve_issue_columns(columns))} FROM issues"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY created_at DESC, id DESC LIMIT ${len(params)}"
+
+        pool = await get_async_pool()
+        results = await pool.fetch(query, *params)
+        return [dict(row) for row in results]
+    except Exception as e:
+        logger.error(f"Error getting issues: {e}")
+        raise
+
+
+@traced("db.aget_issues_page", kind="db")
+@timed(DB_QUERY_SECONDS, op="get_issues_page")
+async def aget_issues_page(limit: int = 50, status: Optional[str] = None,
+                           cursor: Optional[str] = None, summary: bool = False) -> Dict[str, Any]:
+    """One keyset-paginated page of issues (see db.get_issues_page)"""
+    columns = ISSUE_SUMMARY_COLUMNS if summary else None
+    rows = await aget_all_issues(limit=limit + 1, status=status, columns=columns, cursor=cursor)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "issues": rows,
+        "next_cursor": encode_issues_cursor(rows[-1]) if has_more else None,
+    }
+
+
+@traced("db.aattach_report_to_issue", kind="db")
+@timed(DB_QUERY_SECONDS, op="attach_report_to_issue")
+async def aattach_report_to_issue(issue_id: str, report: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Record a duplicate report against an existing issue (see db.attach_report_to_issue)"""
+    try:
+        pool = await get_async_pool()
+        result = await pool.fetchrow(
+            """
+            UPDATE issues
+            SET metadata = coalesce(metadata, '{}'::jsonb) || jsonb_build_object(
+                'report_count', coalesce((metadata->>'report_count')::int, 1) + 1,
+                'duplicate_reports', coalesce(metadata->'duplicate_reports', '[]'::jsonb) || jsonb_build_array($1::jsonb)
+            )
+            WHERE issue_id = $2
+            RETURNING *
+            """,
+            report, issue_id
+        )
+        if result:
+            logger.info(f"Duplicate report attached to issue {issue_id}")
+            return dict(result)
+        return None
+    except Exception as e:
+        logger.error(f"Error attaching report to issue: {e}")
+        raise
+
+
+@traced("db.aupdate_issue_status", kind="db")
+@timed(DB_QUERY_SECONDS, op="update_issue_status")
+async def aupdate_issue_status(issue_id: str, status: str) -> Optional[Dict[str, Any]]:
+    """Update issue status"""
+    try:
+        resolved_at = None
+        if status in ["resolved", "closed"]:
+            resolved_at = datetime.now()
+
+        pool = await get_async_pool()
+        result = await pool.fetchrow(
+            """
+            UPDATE issues
+            SET status = $1, resolved_at = $2
+            WHERE issue_id = $3
+            RETURNING *
+            """,
+            status, resolved_at, issue_id
+        )
+        if result:
+            logger.info(f"Issue {issue_id} updated to status: {status}")
+            return dict(result)
+        return None
+    except Exception as e:
+        logger.error(f"Error updating issue: {e}")
+        raise
@@ -0,0 +1,525 @@
+"""
+LangGraph checkpointer for NajuaState on the shared asyncpg pool.
+
+- Uses the same per-event-loop pool as async_db (no extra connections).
+- Inside `async with checkpointer.batch(thread_id)` every checkpoint and write of a
+  turn is buffered and committed in one transaction when the turn ends. Combined
+  with durability="exit" a multi-hop turn (welcome -> filler -> reporting) costs one
+  round of inserts instead of one per hop. If the process dies mid-turn the thread
+  resumes from the end of the previous turn.
+- Only channels whose value actually changed get a new blob. NajuaState nodes return
+  the whole state, so LangGraph bumps every channel's version each hop; a channel
+  whose serialized value is unchanged is stored as a reference to its previous blob.
+- Bytes and rows written per flush are tracked (stats()) so write amplification per
+  turn can be watched; flushes above CHECKPOINT_TURN_BYTES_WARN are logged.
+
+Tables are compatible with query_checkpoints.sql and are created by setup().
+"""
+
+import os
+import json
+import random
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from .async_db import get_async_pool
+from .tracing import traced, set_span_attributes
+
+logger = logging.getLogger(__name__)
+
+# Blob stored as a pointer to an earlier version of the same channel
+_REF_TYPE = "ref"
+
+SETUP_SQL = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BYTEA NOT NULL,
+    metadata JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+
+CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BYTEA,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    blob BYTEA NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+
+CREATE INDEX IF NOT EXISTS idx_checkpoints_thread_id ON checkpoints(thread_id);
+CREATE INDEX IF NOT EXISTS idx_checkpoint_writes_thread_id ON checkpoint_writes(thread_id);
+"""
+
+
+class _TurnBatch:
+    """Checkpoint rows buffered for one thread until the turn ends"""
+
+    def __init__(self):
+        self.depth = 0
+        self.checkpoints: List[tuple] = []
+        self.blobs: Dict[tuple, tuple] = {}  # (thread, ns, channel, version) -> row
+        self.writes: Dict[tuple, tuple] = {}  # (thread, ns, checkpoint, task, idx) -> row
+
+    def __bool__(self) -> bool:
+        return bool(self.checkpoints or self.blobs or self.writes)
+
+
+class AsyncPostgresCheckpointer(BaseCheckpointSaver[str]):
+    """
+    Async-only checkpointer backed by the asyncpg pool.
+    Use with graph.ainvoke / graph.astream and {"configurable": {"thread_id": ...}}.
+    """
+
+    def __init__(self, serde=None, turn_bytes_warn: Optional[int] = None):
+        super().__init__(serde=serde)
+        self.turn_bytes_warn = turn_bytes_warn
+        self._batches: Dict[str, _TurnBatch] = {}
+        # (thread, ns, channel) -> (digest, version holding the full blob)
+        self._last_blobs: Dict[Tuple[str, str, str], Tuple[str, str]] = {}
+        self._stats = {
+            "flushes": 0,
+            "checkpoints_written": 0,
+            "blobs_written": 0,
+            "blobs_deduplicated": 0,
+            "writes_written": 0,
+            "bytes_written": 0,
+            "bytes_saved": 0,
+            "max_flush_bytes": 0,
+            "max_flush_rows": 0,
+        }
+
+    async def setup(self) -> None:
+        """Create the checkpoint tables if they don't exist"""
+        try:
+            pool = await get_async_pool()
+            await pool.execute(SETUP_SQL)
+            logger.info("Checkpoint tables ready")
+        except Exception as e:
+            logger.error(f"Error setting up checkpoint tables: {e}")
+            raise
+
+    # --- batching -------------------------------------------------------------
+
+    @asynccontextmanager
+    async def batch(self, thread_id: str) -> AsyncIterator["AsyncPostgresCheckpointer"]:
+        """
+        Buffer every checkpoint write for thread_id until the block exits, then commit
+        them in one transaction. Buffered writes are flushed even if the turn fails,
+        so the error state is persisted like it would be without batching.
+        """
+        batch = self._batches.setdefault(thread_id, _TurnBatch())
+        batch.depth += 1
+        try:
+            yield self
+        finally:
+            batch.depth -= 1
+            if batch.depth == 0:
+                del self._batches[thread_id]
+                if batch:
+                    await self._flush(batch)
+
+    # --- serialization helpers -------------------------------------------------
+
+    def _blob_rows(self, thread_id: str, checkpoint_ns: str, values: Dict[str, Any],
+                   new_versions: ChannelVersions) -> List[tuple]:
+        """Rows for new channel versions - unchanged values become refs to the previous blob"""
+        rows = []
+        for channel, version in new_versions.items():
+            version = str(version)
+            if channel not in values:
+                rows.append((thread_id, checkpoint_ns, channel, version, "empty", None))
+                continue
+            type_, blob = self.serde.dumps_typed(values[channel])
+            digest = hashlib.sha1(type_.encode("utf-8") + b"\0" + blob).hexdigest()
+            key = (thread_id, checkpoint_ns, channel)
+            previous = self._last_blobs.get(key)
+            if previous and previous[0] == digest:
+                rows.append((thread_id, checkpoint_ns, channel, version, _REF_TYPE, previous[1].encode("utf-8")))
+                self._stats["blobs_deduplicated"] += 1
+                self._stats["bytes_saved"] += len(blob)
+            else:
+                rows.append((thread_id, checkpoint_ns, channel, version, type_, blob))
+                self._last_blobs[key] = (digest, version)
+        return rows
+
+    def _load_blob_rows(self, rows, refs: Dict[tuple, Any]) -> Dict[str, Any]:
+        values = {}
+        for row in rows:
+            if row["type"] == "empty":
+                continue
+            if row["type"] == _REF_TYPE:
+                target = refs.get((row["channel"], bytes(row["blob"]).decode("utf-8")))
+                if target is None:
+                    continue
+                values[row["channel"]] = self.serde.loads_typed((target["type"], bytes(target["blob"])))
+            else:
+                values[row["channel"]] = self.serde.loads_typed((row["type"], bytes(row["blob"])))
+        return values
+
+    @staticmethod
+    def _metadata_json(config: RunnableConfig, metadata: CheckpointMetadata) -> Dict[str, Any]:
+        # Round-trip through JSON so anything non-serializable is stringified, not fatal
+        return json.loads(json.dumps(get_checkpoint_metadata(config, metadata), default=str))
+
+    # --- writes ------------------------------------------------------------------
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+
+        copy = checkpoint.copy()
+        values = copy.pop("channel_values")
+        type_, checkpoint_blob = self.serde.dumps_typed(copy)
+
+        batch = _TurnBatch()
+        batch.checkpoints.append((
+            thread_id, checkpoint_ns, checkpoint["id"], parent_checkpoint_id,
+            type_, checkpoint_blob, self._metadata_json(config, metadata),
+        ))
+        for row in self._blob_rows(thread_id, checkpoint_ns, values, new_versions):
+            batch.blobs[row[:4]] = row
+        await self._submit(thread_id, batch)
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        batch = _TurnBatch()
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            batch.writes[(thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx)] = (
+                thread_id, checkpoint_ns, checkpoint_id, task_id, task_path, write_idx, channel, type_, blob,
+            )
+        await self._submit(thread_id, batch)
+
+    async def _submit(self, thread_id: str, rows: _TurnBatch) -> None:
+        """Add rows to the thread's open batch, or write them straight away"""
+        batch = self._batches.get(thread_id)
+        if batch is None:
+            await self._flush(rows)
+            return
+        batch.checkpoints.extend(rows.checkpoints)
+        batch.blobs.update(rows.blobs)
+        # Special writes (errors, interrupts) overwrite; regular ones keep the first copy
+        for key, row in rows.writes.items():
+            if key[4] < 0 or key not in batch.writes:
+                batch.writes[key] = row
+
+    @traced("db.checkpoint_flush", kind="db")
+    async def _flush(self, batch: _TurnBatch) -> None:
+        """Write a batch in one transaction"""
+        special_writes = [row for key, row in batch.writes.items() if key[4] < 0]
+        regular_writes = [row for key, row in batch.writes.items() if key[4] >= 0]
+        try:
+            pool = await get_async_pool()
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    if batch.checkpoints:
+                        await conn.executemany(
+                            """
+                            INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata)
+                            VALUES ($1, $2, $3, $4, $5, $6, $7)
+                            ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id) DO UPDATE
+                            SET checkpoint = EXCLUDED.checkpoint, type = EXCLUDED.type, metadata = EXCLUDED.metadata
+                            """,
+                            batch.checkpoints,
+                        )
+                    if batch.blobs:
+                        await conn.executemany(
+                            """
+                            INSERT INTO checkpoint_blobs (thread_id, checkpoint_ns, channel, version, type, blob)
+                            VALUES ($1, $2, $3, $4, $5, $6)
+                            ON CONFLICT (thread_id, checkpoint_ns, channel, version) DO NOTHING
+                            """,
+                            list(batch.blobs.values()),
+                        )
+                    if regular_writes:
+                        await conn.executemany(
+                            """
+                            INSERT INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id, task_id, task_path, idx, channel, type, blob)
+                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                            ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) DO NOTHING
+                            """,
+                            regular_writes,
+                        )
+                    if special_writes:
+                        await conn.executemany(
+                            """
+                            INSERT INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id, task_id, task_path, idx, channel, type, blob)
+                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                            ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) DO UPDATE
+                            SET channel = EXCLUDED.channel, type = EXCLUDED.type, blob = EXCLUDED.blob
+                            """,
+                            special_writes,
+                        )
+        except Exception as e:
+            # Blob refs cached for this batch point at rows that were never written
+            self._last_blobs.clear()
+            logger.error(f"Error writing checkpoint batch: {e}")
+            raise
+        self._record_flush(batch)
+
+    def _record_flush(self, batch: _TurnBatch) -> None:
+        flush_bytes = (
+            sum(len(row[5]) + len(json.dumps(row[6])) for row in batch.checkpoints)
+            + sum(len(row[5] or b"") for row in batch.blobs.values())
+            + sum(len(row[8]) for row in batch.writes.values())
+        )
+        flush_rows = len(batch.checkpoints) + len(batch.blobs) + len(batch.writes)
+        set_span_attributes(rows=flush_rows, bytes=flush_bytes)
+        stats = self._stats
+        stats["flushes"] += 1
+        stats["checkpoints_written"] += len(batch.checkpoints)
+        stats["blobs_written"] += len(batch.blobs)
+        stats["writes_written"] += len(batch.writes)
+        stats["bytes_written"] += flush_bytes
+        stats["max_flush_bytes"] = max(stats["max_flush_bytes"], flush_bytes)
+        stats["max_flush_rows"] = max(stats["max_flush_rows"], flush_rows)
+        if self.turn_bytes_warn and flush_bytes > self.turn_bytes_warn:
+            logger.warning(
+                f"Checkpoint flush wrote {flush_bytes} bytes in {flush_rows} rows "
+                f"(limit {self.turn_bytes_warn}) - conversation state is growing"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Write amplification counters: rows and bytes per flush (a batched turn is one flush)"""
+        stats = dict(self._stats)
+        flushes = stats["flushes"]
+        stats["bytes_per_flush"] = stats["bytes_written"] / flushes if flushes else 0.0
+        stats["rows_per_flush"] = (
+            (stats["checkpoints_written"] + stats["blobs_written"] + stats["writes_written"]) / flushes
+            if flushes else 0.0
+        )
+        return stats
+
+    # --- reads -------------------------------------------------------------------
+
+    @traced("db.checkpoint_load", kind="db")
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        try:
+            pool = await get_async_pool()
+            async with pool.acquire() as conn:
+                if checkpoint_id:
+                    row = await conn.fetchrow(
+                        """
+                        SELECT * FROM checkpoints
+                        WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3
+                        """,
+                        thread_id, checkpoint_ns, checkpoint_id
+                    )
+                else:
+                    row = await conn.fetchrow(
+                        """
+                        SELECT * FROM checkpoints
+                        WHERE thread_id = $1 AND checkpoint_ns = $2
+                        ORDER BY checkpoint_id DESC LIMIT 1
+                        """,
+                        thread_id, checkpoint_ns
+                    )
+                if row is None:
+                    return None
+                return await self._load_tuple(conn, row)
+        except Exception as e:
+            logger.error(f"Error loading checkpoint: {e}")
+            raise
+
+    async def _load_tuple(self, conn, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id = row["thread_id"], row["checkpoint_ns"], row["checkpoint_id"]
+        checkpoint = self.serde.loads_typed((row["type"], bytes(row["checkpoint"])))
+        versions = checkpoint.get("channel_versions", {})
+
+        blob_rows = await conn.fetch(
+            """
+            SELECT b.channel, b.version, b.type, b.blob
+            FROM checkpoint_blobs b
+            JOIN unnest($3::text[], $4::text[]) AS v(channel, version)
+              ON b.channel = v.channel AND b.version = v.version
+            WHERE b.thread_id = $1 AND b.checkpoint_ns = $2
+            """,
+            thread_id, checkpoint_ns, list(versions.keys()), [str(v) for v in versions.values()]
+        )
+        ref_targets = [(r["channel"], bytes(r["blob"]).decode("utf-8")) for r in blob_rows if r["type"] == _REF_TYPE]
+        refs = {}
+        if ref_targets:
+            target_rows = await conn.fetch(
+                """
+                SELECT b.channel, b.version, b.type, b.blob
+                FROM checkpoint_blobs b
+                JOIN unnest($3::text[], $4::text[]) AS v(channel, version)
+                  ON b.channel = v.channel AND b.version = v.version
+                WHERE b.thread_id = $1 AND b.checkpoint_ns = $2
+                """,
+                thread_id, checkpoint_ns, [c for c, _ in ref_targets], [v for _, v in ref_targets]
+            )
+            refs = {(r["channel"], r["version"]): r for r in target_rows}
+
+        write_rows = await conn.fetch(
+            """
+            SELECT task_id, channel, type, blob FROM checkpoint_writes
+            WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3
+            ORDER BY task_path, task_id, idx
+            """,
+            thread_id, checkpoint_ns, checkpoint_id
+        )
+
+        parent_checkpoint_id = row["parent_checkpoint_id"]
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": self._load_blob_rows(blob_rows, refs)},
+            metadata=row["metadata"],
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id else None
+            ),
+            pending_writes=[
+                (w["task_id"], w["channel"], self.serde.loads_typed((w["type"], bytes(w["blob"]))))
+                for w in write_rows
+            ],
+        )
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        conditions = []
+        params: List[Any] = []
+        if config:
+            params.append(config["configurable"]["thread_id"])
+            conditions.append(f"thread_id = ${len(params)}")
+            if config["configurable"].get("checkpoint_ns") is not None:
+                params.append(config["configurable"]["checkpoint_ns"])
+                conditions.append(f"checkpoint_ns = ${len(params)}")
+            if get_checkpoint_id(config):
+                params.append(get_checkpoint_id(config))
+                conditions.append(f"checkpoint_id = ${len(params)}")
+        if filter:
+            params.append(filter)  # encoded by the pool's jsonb codec
+            conditions.append(f"metadata @> ${len(params)}::jsonb")
+        if before and get_checkpoint_id(before):
+            params.append(get_checkpoint_id(before))
+            conditions.append(f"checkpoint_id < ${len(params)}")
+
+        query = "SELECT * FROM checkpoints"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+        if limit is not None:
+            params.append(limit)
+            query += f" LIMIT ${len(params)}"
+
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(query, *params)
+            for row in rows:
+                yield await self._load_tuple(conn, row)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        try:
+            pool = await get_async_pool()
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                        await conn.execute(f"DELETE FROM {table} WHERE thread_id = $1", thread_id)
+            for key in [k for k in self._last_blobs if k[0] == thread_id]:
+                del self._last_blobs[key]
+        except Exception as e:
+            logger.error(f"Error deleting thread checkpoints: {e}")
+            raise
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        # Same scheme as LangGraph's savers: zero-padded counter + random suffix, sortable as text
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # The graph only runs async here - fail loudly if a sync API is used by mistake
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        raise NotImplementedError("AsyncPostgresCheckpointer is async-only - use graph.ainvoke/astream")
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        raise NotImplementedError("AsyncPostgresCheckpointer is async-only - use graph.ainvoke/astream")
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        raise NotImplementedError("AsyncPostgresCheckpointer is async-only - use graph.ainvoke/astream")
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        raise NotImplementedError("AsyncPostgresCheckpointer is async-only - use graph.ainvoke/astream")
+
+
+# Pydantic models stored in NajuaState - allowed explicitly for msgpack deserialization
+STATE_MODELS = [
+    ("app.models.najua_models", name)
+    for name in ("WelcomeHandoffResponse", "IssueReportingHandoffResponse", "IssueFillerHandoffResponse",
+                 "IssueFillerResponse", "Issue")
+]
+
+_checkpointer: Optional[AsyncPostgresCheckpointer] = None
+
+
+def get_checkpointer() -> AsyncPostgresCheckpointer:
+    """
+    Process-wide checkpointer (tables are created with `await get_checkpointer().setup()`).
+    CHECKPOINT_TURN_BYTES_WARN: log when one turn writes more than this many bytes (default 262144).
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = AsyncPostgresCheckpointer(
+            serde=JsonPlusSerializer(allowed_msgpack_modules=STATE_MODELS),
+            turn_bytes_warn=int(os.getenv("CHECKPOINT_TURN_BYTES_WARN", "262144")) or None
+        )
+    return _checkpointer
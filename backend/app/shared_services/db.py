@@ -1,15 +1,50 @@
 import os
-from typing import List, Dict, Any, Optional
+import io
+import csv
+import json
+import uuid
+import base64
+import hashlib
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 from dotenv import load_dotenv
 import psycopg2
-from psycopg2.extras import RealDictCursor, Json
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, Json, execute_values
 from datetime import datetime
+import threading
 import logging
 
+from .db_pool import PostgresConnectionPool
+from .tracing import traced
+from .metrics import REGISTRY, timed, DB_QUERY_SECONDS, ISSUES_SAVED
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Process-wide pool, created lazily on first use
+_pool: Optional[PostgresConnectionPool] = None
+_pool_lock = threading.Lock()
+
+# Columns written by save_issue / save_issues_bulk, in insert order
+ISSUE_INSERT_COLUMNS = ["issue_id", "title", "description", "status", "priority", "category", "tags", "metadata"]
+
+# Lightweight projection for listings - everything except the large description/metadata columns
+ISSUE_SUMMARY_COLUMNS = [
+    "id", "issue_id", "title", "status", "priority", "category", "tags",
+    "created_at", "updated_at", "resolved_at",
+]
+ISSUE_COLUMNS = ISSUE_SUMMARY_COLUMNS + ["description", "metadata"]
+
+# Must match the expression index idx_issues_search_vector in db.sql exactly, or the index isn't used
+ISSUE_SEARCH_VECTOR_SQL = (
+    "(setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B'))"
+)
+
+# Batches at or above this size are loaded with COPY instead of a multi-row INSERT
+BULK_COPY_THRESHOLD = int(os.getenv("DB_BULK_COPY_THRESHOLD", "1000"))
+
 
 def get_postgres_connection():
     """Establish and return a connection to the PostgreSQL database"""
@@ -44,62 +79,108 @@ def get_postgres_connection():
         raise
 
 
+def get_pool() -> PostgresConnectionPool:
+    """
+    Get (or create) the process-wide connection pool.
+    Sized and tuned via DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+    DB_POOL_MAX_IDLE, DB_POOL_MAX_LIFETIME and DB_POOL_HEALTH_CHECK_INTERVAL (seconds).
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PostgresConnectionPool(
+                    connect=get_postgres_connection,
+                    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                    max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+                    health_check_interval=float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30")),
+                )
+                logger.info(f"Database connection pool created (min={_pool.min_size}, max={_pool.max_size})")
+    return _pool
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool size and wait metrics (empty if the pool has not been created yet)"""
+    if _pool is None:
+        return {}
+    return _pool.stats()
+
+
+def _pool_connections() -> Optional[Dict[str, int]]:
+    stats = get_pool_stats()
+    return {state: stats[state] for state in ("in_use", "idle")} if stats else None
+
+
+REGISTRY.gauge(
+    "kunani_db_pool_connections", "Pooled database connections by state (in_use, idle)", _pool_connections, ["state"]
+)
+
+
+def close_pool() -> None:
+    """Close the process-wide pool (e.g. on shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def pooled_connection():
+    """Borrow a connection from the pool: `with pooled_connection() as conn: ...`"""
+    return get_pool().connection()
+
+
+@traced("db.save_issue", kind="db")
+@timed(DB_QUERY_SECONDS, op="save_issue")
 def save_issue(issue: Dict[str, Any]) -> Dict[str, Any]:
     """Save an issue to the database"""
-    conn = None
-    cursor = None
     try:
-        conn = get_postgres_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        insert_query = """
-            INSERT INTO issues (
-                issue_id, title, description, status, priority, 
-                category, tags, metadata
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING *
-        """
-        
-        cursor.execute(
-            insert_query,
-            (
-                issue["issue_id"],
-                issue["title"],
-                issue["description"],
-                issue.get("status", "open"),
-                issue.get("priority", "medium"),
-                issue.get("category"),
-                issue.get("tags", []),
-                Json(issue.get("metadata", {}))
-            )
-        )
-        
-        result = cursor.fetchone()
-        conn.commit()
+        with pooled_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                insert_query = """
+                    INSERT INTO issues (
+                        issue_id, title, description, status, priority, 
+                        category, tags, metadata
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    RETURNING *
+                """
+                
+                cursor.execute(
+                    insert_query,
+                    (
+                        issue["issue_id"],
+                        issue["title"],
+                        issue["description"],
+                        issue.get("status", "open"),
+                        issue.get("priority", "medium"),
+                        issue.get("category"),
+                        issue.get("tags", []),
+                        Json(issue.get("metadata", {}))
+                    )
+                )
+                
+                result = cursor.fetchone()
+            conn.commit()
         logger.info(f"Issue saved: {issue['issue_id']}")
+        ISSUES_SAVED.inc(path="single")
         return dict(result)
     except Exception as e:
-        if conn:
-            conn.rollback()
         logger.error(f"Error saving issue: {e}")
         raise
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
 
+@traced("db.get_issue", kind="db")
+@timed(DB_QUERY_SECONDS, op="get_issue")
 def get_issue(issue_id: str) -> Optional[Dict[str, Any]]:
     """Get an issue by issue_id"""
-    conn = None
-    cursor = None
     try:
-        conn = get_postgres_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cursor.execute("SELECT * FROM issues WHERE issue_id = %s", (issue_id,))
-        result = cursor.fetchone()
+        with pooled_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute("SELECT * FROM issues WHERE issue_id = %s", (issue_id,))
+                result = cursor.fetchone()
         
         if result:
             return dict(result)
@@ -107,81 +188,531 @@ def get_issue(issue_id: str) -> Optional[Dict[str, Any]]:
     except Exception as e:
         logger.error(f"Error getting issue: {e}")
         raise
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
 
-def get_all_issues(limit: int = 100, status: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Get all issues with optional filtering"""
-    conn = None
-    cursor = None
+def encode_issues_cursor(row: Dict[str, Any]) -> str:
+    """Opaque page cursor for the (created_at, id) keyset of a row"""
+    raw = f"{row['created_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_issues_cursor(cursor: str) -> tuple:
+    """Inverse of encode_issues_cursor -> (created_at, id)"""
     try:
-        conn = get_postgres_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if status:
-            cursor.execute(
-                "SELECT * FROM issues WHERE status = %s ORDER BY created_at DESC LIMIT %s",
-                (status, limit)
-            )
-        else:
-            cursor.execute(
-                "SELECT * FROM issues ORDER BY created_at DESC LIMIT %s",
-                (limit,)
-            )
-        
-        results = cursor.fetchall()
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid issues cursor: {cursor!r}") from e
+
+
+def resolve_issue_columns(columns: Optional[List[str]]) -> List[str]:
+    """Validate a column projection. The keyset columns are always included so rows can produce cursors."""
+    if columns is None:
+        return ISSUE_COLUMNS
+    unknown = [col for col in columns if col not in ISSUE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown issue column(s): {unknown}")
+    return [col for col in ISSUE_COLUMNS if col in columns or col in ("id", "created_at")]
+
+
+def _build_issues_query(columns: Optional[List[str]], status: Optional[str],
+                        cursor: Optional[str]) -> tuple:
+    """SELECT for a keyset-ordered listing -> (query without LIMIT, params)"""
+    conditions = []
+    params: List[Any] = []
+    if status:
+        conditions.append(sql.SQL("status = %s"))
+        params.append(status)
+    if cursor:
+        # Row comparison lets Postgres seek straight into the (created_at, id) index
+        conditions.append(sql.SQL("(created_at, id) < (%s, %s)"))
+        params.extend(decode_issues_cursor(cursor))
+
+    query = sql.SQL("SELECT {columns} FROM issues").format(
+        columns=sql.SQL(", ").join(sql.Identifier(col) for col in resolve_issue_columns(columns))
+    )
+    if conditions:
+        query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+    query += sql.SQL(" ORDER BY created_at DESC, id DESC")
+    return query, params
+
+
+@traced("db.get_all_issues", kind="db")
+@timed(DB_QUERY_SECONDS, op="get_all_issues")
+def get_all_issues(limit: int = 100, status: Optional[str] = None,
+                   columns: Optional[List[str]] = None,
+                   cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get all issues with optional filtering, newest first.
+    
+    Args:
+        limit: Maximum number of issues to return
+        status: Optional status filter
+        columns: Optional projection (e.g. ISSUE_SUMMARY_COLUMNS); default is every column
+        cursor: Optional cursor from get_issues_page to continue after
+    """
+    try:
+        query, params = _build_issues_query(columns, status, cursor)
+        with pooled_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as db_cursor:
+                db_cursor.execute(query + sql.SQL(" LIMIT %s"), params + [limit])
+                results = db_cursor.fetchall()
         return [dict(row) for row in results]
     except Exception as e:
         logger.error(f"Error getting issues: {e}")
         raise
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
 
+@traced("db.get_issues_page", kind="db")
+@timed(DB_QUERY_SECONDS, op="get_issues_page")
+def get_issues_page(limit: int = 50, status: Optional[str] = None,
+                    cursor: Optional[str] = None, summary: bool = False) -> Dict[str, Any]:
+    """
+    Get one page of issues using keyset pagination on (created_at, id).
+    Each page costs the same regardless of how deep it is.
+    
+    Args:
+        limit: Page size
+        status: Optional status filter
+        cursor: next_cursor from the previous page (None for the first page)
+        summary: Return summary rows only (no description/metadata)
+    
+    Returns:
+        {"issues": [...], "next_cursor": str or None when there are no more pages}
+    """
+    columns = ISSUE_SUMMARY_COLUMNS if summary else None
+    # Fetch one extra row to know whether another page exists
+    rows = get_all_issues(limit=limit + 1, status=status, columns=columns, cursor=cursor)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "issues": rows,
+        "next_cursor": encode_issues_cursor(rows[-1]) if has_more else None,
+    }
+
+
+def iter_all_issues(status: Optional[str] = None, columns: Optional[List[str]] = None,
+                    batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every matching issue (newest first) through a server-side named cursor,
+    holding at most batch_size rows in memory. Intended for exports and index warm-up.
+    The pooled connection is held until the iterator is exhausted or closed.
+    """
+    query, params = _build_issues_query(columns, status, None)
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor(name=f"issues_export_{uuid.uuid4().hex}",
+                             cursor_factory=RealDictCursor) as db_cursor:
+                db_cursor.itersize = batch_size
+                db_cursor.execute(query, params)
+                for row in db_cursor:
+                    yield dict(row)
+    except Exception as e:
+        logger.error(f"Error streaming issues: {e}")
+        raise
+
+
+@traced("db.attach_report_to_issue", kind="db")
+@timed(DB_QUERY_SECONDS, op="attach_report_to_issue")
+def attach_report_to_issue(issue_id: str, report: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Record a duplicate citizen report against an existing issue instead of creating a new one.
+    Appends the report to metadata.duplicate_reports and bumps metadata.report_count.
+    """
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    """
+                    UPDATE issues
+                    SET metadata = coalesce(metadata, '{}'::jsonb) || jsonb_build_object(
+                        'report_count', coalesce((metadata->>'report_count')::int, 1) + 1,
+                        'duplicate_reports', coalesce(metadata->'duplicate_reports', '[]'::jsonb) || jsonb_build_array(%s::jsonb)
+                    )
+                    WHERE issue_id = %s
+                    RETURNING *
+                    """,
+                    (Json(report), issue_id)
+                )
+                result = cursor.fetchone()
+            conn.commit()
+        
+        if result:
+            logger.info(f"Duplicate report attached to issue {issue_id}")
+            return dict(result)
+        return None
+    except Exception as e:
+        logger.error(f"Error attaching report to issue: {e}")
+        raise
+
+
+@traced("db.search_issues", kind="db")
+@timed(DB_QUERY_SECONDS, op="search_issues")
+def search_issues(
+    query: Optional[str] = None,
+    location: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """
+    Ranked search over issues. Every filter is optional and they are combined with AND.
+    
+    Args:
+        query: Free text matched against title + description (web-search syntax: quotes, OR, -word)
+        location: Fuzzy (trigram) match against metadata->>'location', e.g. "Kitengela"
+        category: Fuzzy (trigram) match against category
+        status: Exact status filter
+        priority: Exact priority filter
+        tags: Issues must carry all of these tags
+        limit: Page size
+        offset: Number of ranked results to skip
+    
+    Returns:
+        {"issues": [... summary rows with a "rank" score ...], "next_offset": int or None}
+    """
+    conditions = []
+    condition_params: List[Any] = []
+    rank_terms = []
+    rank_params: List[Any] = []
+
+    if query:
+        conditions.append(f"{ISSUE_SEARCH_VECTOR_SQL} @@ websearch_to_tsquery('english', %s)")
+        condition_params.append(query)
+        rank_terms.append(f"ts_rank_cd({ISSUE_SEARCH_VECTOR_SQL}, websearch_to_tsquery('english', %s))")
+        rank_params.append(query)
+    if location:
+        # word_similarity: "Kitengela" matches "Namanga Road, Kitengela" - indexable via <%
+        conditions.append("%s <%% (metadata->>'location')")
+        condition_params.append(location)
+        rank_terms.append("word_similarity(%s, metadata->>'location')")
+        rank_params.append(location)
+    if category:
+        conditions.append("%s <%% category")
+        condition_params.append(category)
+        rank_terms.append("word_similarity(%s, category)")
+        rank_params.append(category)
+    if status:
+        conditions.append("status = %s")
+        condition_params.append(status)
+    if priority:
+        conditions.append("priority = %s")
+        condition_params.append(priority)
+    if tags:
+        conditions.append("tags @> %s::text[]")
+        condition_params.append(list(tags))
+
+    columns = ", ".join(ISSUE_SUMMARY_COLUMNS + ["metadata->>'location' AS location"])
+    rank_sql = " + ".join(rank_terms) if rank_terms else "0"
+    search_query = f"SELECT {columns}, {rank_sql} AS rank FROM issues"
+    if conditions:
+        search_query += " WHERE " + " AND ".join(conditions)
+    search_query += " ORDER BY rank DESC, created_at DESC, id DESC LIMIT %s OFFSET %s"
+    # Fetch one extra row to know whether another page exists
+    params = rank_params + condition_params + [limit + 1, offset]
+
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(search_query, params)
+                results = [dict(row) for row in cursor.fetchall()]
+        has_more = len(results) > limit
+        return {
+            "issues": results[:limit],
+            "next_offset": offset + limit if has_more else None,
+        }
+    except Exception as e:
+        logger.error(f"Error searching issues: {e}")
+        raise
+
+
+@traced("db.update_issue_status", kind="db")
+@timed(DB_QUERY_SECONDS, op="update_issue_status")
 def update_issue_status(issue_id: str, status: str) -> Optional[Dict[str, Any]]:
     """Update issue status"""
-    conn = None
-    cursor = None
     try:
-        conn = get_postgres_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        resolved_at = None
-        if status in ["resolved", "closed"]:
-            resolved_at = datetime.now()
-        
-        cursor.execute(
-            """
-            UPDATE issues 
-            SET status = %s, resolved_at = %s 
-            WHERE issue_id = %s
-            RETURNING *
-            """,
-            (status, resolved_at, issue_id)
-        )
-        
-        result = cursor.fetchone()
-        conn.commit()
+        with pooled_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                resolved_at = None
+                if status in ["resolved", "closed"]:
+                    resolved_at = datetime.now()
+                
+                cursor.execute(
+                    """
+                    UPDATE issues 
+                    SET status = %s, resolved_at = %s 
+                    WHERE issue_id = %s
+                    RETURNING *
+                    """,
+                    (status, resolved_at, issue_id)
+                )
+                
+                result = cursor.fetchone()
+            conn.commit()
         
         if result:
             logger.info(f"Issue {issue_id} updated to status: {status}")
             return dict(result)
         return None
     except Exception as e:
-        if conn:
-            conn.rollback()
         logger.error(f"Error updating issue: {e}")
         raise
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
+
+def _issue_row(issue: Dict[str, Any]) -> tuple:
+    """Issue dict -> tuple of values in ISSUE_INSERT_COLUMNS order (with the same defaults as save_issue)"""
+    return (
+        issue["issue_id"],
+        issue["title"],
+        issue["description"],
+        issue.get("status", "open"),
+        issue.get("priority", "medium"),
+        issue.get("category"),
+        issue.get("tags", []),
+        issue.get("metadata", {}),
+    )
+
+
+def _conflict_clause(on_conflict: str) -> str:
+    if on_conflict == "ignore":
+        return "ON CONFLICT (issue_id) DO NOTHING"
+    if on_conflict == "update":
+        updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in ISSUE_INSERT_COLUMNS if col != "issue_id")
+        return f"ON CONFLICT (issue_id) DO UPDATE SET {updates}"
+    raise ValueError(f"on_conflict must be 'ignore' or 'update', got: {on_conflict}")
+
+
+def _pg_array_literal(values: List[str]) -> str:
+    """Render a list of strings as a PostgreSQL array literal for COPY"""
+    escaped = []
+    for value in values:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        escaped.append(f'"{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+# xmax is 0 only for a row version created by this INSERT (not by ON CONFLICT DO UPDATE)
+BULK_RETURNING = "RETURNING *, (xmax = 0) AS inserted"
+
+
+def _insert_rows_values(cursor, rows: List[tuple], on_conflict: str) -> List[Dict[str, Any]]:
+    """Single round-trip multi-row INSERT ... RETURNING *"""
+    rows = [row[:7] + (Json(row[7]),) for row in rows]
+    return execute_values(
+        cursor,
+        f"INSERT INTO issues ({', '.join(ISSUE_INSERT_COLUMNS)}) VALUES %s "
+        f"{_conflict_clause(on_conflict)} {BULK_RETURNING}",
+        rows,
+        page_size=len(rows),
+        fetch=True,
+    )
+
+
+def _insert_rows_copy(cursor, rows: List[tuple], on_conflict: str) -> List[Dict[str, Any]]:
+    """COPY rows into a transaction-scoped staging table, then upsert them into issues in one statement"""
+    cursor.execute("""
+        CREATE TEMP TABLE issues_bulk_staging (
+            issue_id VARCHAR(255),
+            title VARCHAR(500),
+            description TEXT,
+            status VARCHAR(50),
+            priority VARCHAR(50),
+            category VARCHAR(100),
+            tags TEXT[],
+            metadata JSONB
+        ) ON COMMIT DROP
+    """)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for row in rows:
+        issue_id, title, description, status, priority, category, tags, metadata = row
+        writer.writerow([
+            issue_id, title, description, status, priority, category or "",
+            _pg_array_literal(tags or []), json.dumps(metadata or {}, default=str),
+        ])
+    buffer.seek(0)
+
+    columns = ", ".join(ISSUE_INSERT_COLUMNS)
+    cursor.copy_expert(
+        f"COPY issues_bulk_staging ({columns}) FROM STDIN WITH (FORMAT csv, FORCE_NULL (category))",
+        buffer,
+    )
+    cursor.execute(
+        f"INSERT INTO issues ({columns}) SELECT {columns} FROM issues_bulk_staging "
+        f"{_conflict_clause(on_conflict)} {BULK_RETURNING}"
+    )
+    return cursor.fetchall()
+
+
+@traced("db.save_issues_bulk", kind="db")
+@timed(DB_QUERY_SECONDS, op="save_issues_bulk")
+def save_issues_bulk(
+    issues: List[Dict[str, Any]],
+    on_conflict: str = "ignore",
+    use_copy: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Save many issues in one transaction.
+    
+    Args:
+        issues: Issue dicts with the same keys as save_issue
+        on_conflict: What to do when an issue_id already exists:
+            - "ignore": keep the stored row (re-running the same batch is a no-op)
+            - "update": overwrite the stored row with the new values
+        use_copy: Force COPY (True) or multi-row INSERT (False).
+            Default: COPY for batches of BULK_COPY_THRESHOLD rows or more.
+    
+    Returns:
+        The stored rows for every issue_id in the batch (including pre-existing
+        ones when on_conflict="ignore"), in input order. Each row has "inserted":
+        True only if this call created it (False for rows that already existed,
+        whether kept or updated).
+    """
+    if not issues:
+        return []
+
+    # Collapse duplicate issue_ids within the batch (last one wins) -
+    # Postgres rejects an upsert that touches the same row twice
+    rows_by_id: Dict[str, tuple] = {}
+    for issue in issues:
+        row = _issue_row(issue)
+        rows_by_id[row[0]] = row
+    rows = list(rows_by_id.values())
+
+    if use_copy is None:
+        use_copy = len(rows) >= BULK_COPY_THRESHOLD
+
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                if use_copy:
+                    saved = _insert_rows_copy(cursor, rows, on_conflict)
+                else:
+                    saved = _insert_rows_values(cursor, rows, on_conflict)
+
+                saved_by_id = {row["issue_id"]: dict(row) for row in saved}
+                inserted = sum(1 for row in saved if row["inserted"])
+
+                # Rows skipped by ON CONFLICT DO NOTHING aren't returned - fetch them so callers get every row
+                existing_ids = [issue_id for issue_id in rows_by_id if issue_id not in saved_by_id]
+                if existing_ids:
+                    cursor.execute("SELECT *, false AS inserted FROM issues WHERE issue_id = ANY(%s)", (existing_ids,))
+                    for row in cursor.fetchall():
+                        saved_by_id[row["issue_id"]] = dict(row)
+            conn.commit()
+
+        ISSUES_SAVED.inc(inserted, path="bulk")
+        logger.info(
+            f"Bulk saved {inserted} issue(s) via {'COPY' if use_copy else 'INSERT'} "
+            f"({len(rows) - inserted} already existed, on_conflict={on_conflict})"
+        )
+        return [saved_by_id[issue_id] for issue_id in rows_by_id if issue_id in saved_by_id]
+    except Exception as e:
+        logger.error(f"Error bulk saving issues: {e}")
+        raise
+
+
+def _file_issue_id(record: Dict[str, Any]) -> str:
+    """
+    Deterministic issue ID for imported records, so re-running an import is idempotent.
+    IMP- keeps them apart from live ISS- ids; 80 bits of the digest keep collisions
+    negligible at backfill sizes (a collision would silently drop a record with on_conflict="ignore").
+    """
+    digest = hashlib.sha1(
+        json.dumps([record.get("title"), record.get("description"), record.get("metadata")],
+                   sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"IMP-{digest[:20].upper()}"
+
+
+def _normalize_file_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce a raw CSV/JSONL record into an issue dict. Unknown columns are kept in metadata."""
+    issue = {}
+    metadata = record.get("metadata") or {}
+    if isinstance(metadata, str):
+        metadata = json.loads(metadata)
+    metadata = dict(metadata)
+
+    for key, value in record.items():
+        if key == "metadata":
+            continue
+        if key in ISSUE_INSERT_COLUMNS:
+            if value not in (None, ""):
+                issue[key] = value
+        elif value not in (None, ""):
+            metadata[key] = value
+
+    tags = issue.get("tags", [])
+    if isinstance(tags, str):
+        # CSV: JSON array or "a|b|c"
+        tags = json.loads(tags) if tags.startswith("[") else [t.strip() for t in tags.split("|") if t.strip()]
+    issue["tags"] = tags
+    issue["metadata"] = metadata
+
+    missing = [field for field in ("title", "description") if not issue.get(field)]
+    if missing:
+        raise ValueError(f"Record is missing required field(s) {missing}: {record}")
+
+    if not issue.get("issue_id"):
+        issue["issue_id"] = _file_issue_id(issue)
+    return issue
+
+
+def load_issues_from_file(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream issue dicts from a .csv (header row required) or .jsonl file without loading it into memory.
+    Records need at least title and description; other issue columns are optional and
+    any extra columns/keys are stored in metadata.
+    """
+    if path.endswith(".jsonl") or path.endswith(".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield _normalize_file_record(json.loads(line))
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_number}: {e}") from e
+    elif path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for line_number, record in enumerate(csv.DictReader(f), start=2):
+                try:
+                    yield _normalize_file_record(record)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_number}: {e}") from e
+    else:
+        raise ValueError(f"Unsupported file type (expected .csv or .jsonl): {path}")
+
+
+def _batched(items: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def save_issues_from_file(path: str, batch_size: int = 5000, on_conflict: str = "ignore") -> int:
+    """
+    Load issues from a CSV/JSONL export in batches (one transaction per batch).
+    
+    Returns:
+        Number of rows stored (or already present)
+    """
+    total = 0
+    inserted = 0
+    for batch in _batched(load_issues_from_file(path), batch_size):
+        saved = save_issues_bulk(batch, on_conflict=on_conflict)
+        total += len(saved)
+        inserted += sum(1 for row in saved if row.get("inserted"))
+        logger.info(f"Loaded {total} issue(s) from {path} ({inserted} new)")
+    return total
@@ -0,0 +1,258 @@
+"""
+Process-wide PostgreSQL connection pool.
+Connections are created lazily up to max_size, health-checked when they have
+been idle for a while and recycled once they exceed their idle/lifetime limits.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+import logging
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from .metrics import DB_POOL_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no connection becomes available within the wait timeout"""
+
+
+class PostgresConnectionPool:
+    """
+    Thread-safe, bounded pool of psycopg2 connections.
+
+    Unlike psycopg2's ThreadedConnectionPool this pool blocks (up to timeout)
+    when exhausted instead of raising, and records how long callers waited.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle: float = 300.0,
+        max_lifetime: float = 3600.0,
+        health_check_interval: float = 30.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()  # (conn, last_used) - most recently returned on the right
+        self._created_at: Dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+
+        self._stats = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "recycled_idle": 0,
+            "recycled_lifetime": 0,
+        }
+
+        for _ in range(min_size):
+            conn = self._new_connection()
+            self._idle.append((conn, time.monotonic()))
+
+    def _new_connection(self):
+        conn = self._connect()
+        self._created_at[id(conn)] = time.monotonic()
+        self._size += 1
+        self._stats["connections_created"] += 1
+        return conn
+
+    def _close_connection(self, conn) -> None:
+        self._created_at.pop(id(conn), None)
+        self._size -= 1
+        self._stats["connections_closed"] += 1
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+
+    def _is_expired(self, conn, last_used: float, now: float) -> Optional[str]:
+        """Return the recycle reason for a connection, or None if it can be reused"""
+        if conn.closed:
+            return "closed"
+        if self.max_lifetime and now - self._created_at.get(id(conn), now) > self.max_lifetime:
+            return "lifetime"
+        if self.max_idle and now - last_used > self.max_idle and self._size > self.min_size:
+            return "idle"
+        return None
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {e}")
+            self._stats["health_check_failures"] += 1
+            return False
+
+    def _recycle_idle(self, now: float) -> None:
+        """Close idle connections past their limits (oldest first). Caller holds the lock."""
+        kept = deque()
+        while self._idle:
+            conn, last_used = self._idle.popleft()
+            reason = self._is_expired(conn, last_used, now)
+            if reason:
+                if reason == "idle":
+                    self._stats["recycled_idle"] += 1
+                elif reason == "lifetime":
+                    self._stats["recycled_lifetime"] += 1
+                self._close_connection(conn)
+            else:
+                kept.append((conn, last_used))
+        self._idle = kept
+
+    def getconn(self):
+        """Borrow a connection, waiting up to self.timeout if the pool is exhausted"""
+        start = time.monotonic()
+        waited = False
+
+        while True:
+            conn = None
+            last_used = None
+            create = False
+
+            with self._cond:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+
+                self._recycle_idle(time.monotonic())
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                elif self._size < self.max_size:
+                    # Reserve the slot now, connect outside the lock
+                    self._size += 1
+                    create = True
+                else:
+                    waited = True
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if not self._idle and self._size >= self.max_size:
+                            self._stats["timeouts"] += 1
+                            raise PoolTimeoutError(
+                                f"Timed out after {self.timeout}s waiting for a database connection "
+                                f"(max_size={self.max_size})"
+                            )
+                    continue
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created_at[id(conn)] = time.monotonic()
+                    self._stats["connections_created"] += 1
+            elif (
+                self.health_check_interval is not None
+                and time.monotonic() - last_used > self.health_check_interval
+                and not self._is_healthy(conn)
+            ):
+                with self._cond:
+                    self._close_connection(conn)
+                    self._cond.notify()
+                continue
+
+            wait_time = time.monotonic() - start
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited:
+                    DB_POOL_WAIT_SECONDS.observe(wait_time)
+                    self._stats["waits"] += 1
+                    self._stats["wait_time_total"] += wait_time
+                    self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+            return conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        """Return a connection to the pool. Broken or discarded connections are closed."""
+        if not discard and not conn.closed:
+            try:
+                # Never hand out a connection with an open transaction
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception as e:
+                logger.warning(f"Discarding connection that failed to reset: {e}")
+                discard = True
+
+        with self._cond:
+            if discard or conn.closed or self._closed:
+                self._close_connection(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with-block.
+        Rolls back on error; connections broken at the protocol level are discarded.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool size and wait metrics"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+        checkouts = stats["checkouts"]
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["waits"] if stats["waits"] else 0.0
+        stats["wait_ratio"] = stats["waits"] / checkouts if checkouts else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Close all idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._close_connection(conn)
+            self._cond.notify_all()
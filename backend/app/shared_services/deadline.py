@@ -0,0 +1,71 @@
+"""
+End-to-end deadlines for conversation turns.
+
+A turn gets a deadline when the user's message is accepted (TURN_DEADLINE_SECONDS,
+default 60, 0 = none). It is kept in a contextvar, so every node and every LLM call
+of the turn - including tasks they start - sees the same deadline:
+
+    with deadline_scope(time.monotonic() + 30):
+        ...
+        remaining_time()  # seconds left, or None without a deadline
+
+call_llm_api gives each provider attempt the remaining time as its timeout and skips
+providers that can't plausibly answer in the time left.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar("turn_deadline", default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a turn's deadline has passed (or too little time is left to try)"""
+
+
+def turn_deadline_seconds() -> float:
+    return float(os.getenv("TURN_DEADLINE_SECONDS", "60"))
+
+
+def new_turn_deadline() -> Optional[float]:
+    """Absolute (time.monotonic) deadline for a turn starting now, or None if disabled"""
+    seconds = turn_deadline_seconds()
+    return time.monotonic() + seconds if seconds > 0 else None
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[Optional[float]]:
+    """Run the block under `deadline` (time.monotonic); an enclosing earlier deadline still applies"""
+    current = _deadline.get()
+    if deadline is None or (current is not None and current <= deadline):
+        yield current
+        return
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned async generator)
+            _deadline.set(current)
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds until the current deadline (may be negative), or None without a deadline"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(what: str = "turn") -> None:
+    """Raise DeadlineExceededError if the current deadline has passed"""
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError(f"Deadline exceeded before {what} ({-remaining:.1f}s over)")
@@ -0,0 +1,284 @@
+"""
+Deterministic fast-path router for the welcome agent.
+Obvious first turns ("hi", "bye", "I want to report a pothole") are routed locally
+instead of through an LLM call:
+
+1. Rules - a regex table. Some rules defer (emergencies, context-dependent replies
+   like "yes"), sending the turn straight to the LLM.
+2. Classifier - TF-IDF + multinomial logistic regression in pure Python, loaded
+   from JSON (see train_router.py). Used when its confidence >= the threshold.
+
+Anything else returns None and the welcome agent calls the LLM as before.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.najua_models import WelcomeHandoffResponse
+from app.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(_DIR, "fast_router_model.json")
+DEFAULT_EXAMPLES_PATH = os.path.join(_DIR, "fast_router_examples.jsonl")
+
+# Intents the router can answer; "other" (enquiries, emergencies, chit-chat) always goes to the LLM
+ROUTABLE_INTENTS = ("greeting", "goodbye", "report")
+
+GREETING_MESSAGE = (
+    "Hello! I'm Najua. I help citizens report non-emergency issues to the government - "
+    "things like roads, water, health, education or garbage collection. "
+    "What issue would you like to report?"
+)
+GOODBYE_MESSAGE = "Thank you for using Najua. Goodbye!"
+
+# (intent, pattern) - first match wins. intent None means "defer to the LLM".
+RULES: List[Tuple[Optional[str], "re.Pattern"]] = [
+    # Emergencies and crimes need the LLM's judgement (and an emergency-services answer), never a fast path
+    (None, re.compile(
+        r"\b(fire|burning|accident|bleeding|stabbed|shot|robbery|attack(ed)?|dying|dead|emergency|help me|moto|ajali"
+        r"|missing (child|person|girl|boy|daughter|son)|(child|person) (is )?missing|kidnap\w*|abduct\w*"
+        r"|rape[ds]?|raping|defile\w*|sexual(ly)? (assault|abuse)\w*|assault\w*|abus(e|ed|ing) (a |my |the )?(child|wife|woman)"
+        r"|gas leak\w*|leaking gas|explo(sion|ded|ding)|collapse[ds]?|drown\w*|electrocut\w*|live wire"
+        r"|murder\w*|killed|suicide|poison\w*|overdose|unconscious|injured|trapped|gun|weapon"
+        r"|mtoto amepotea|amepotea|ubakaji|amebakwa|mlipuko)\b",
+        re.I,
+    )),
+    # Enquiries about existing issues
+    (None, re.compile(r"\b(status|follow(ed)? up|update on|my (issue|report|complaint))\b", re.I)),
+    # Short replies only make sense with the previous assistant message
+    (None, re.compile(r"^\s*(yes|yeah|yep|no|nope|ok(ay)?|sure|ndio|hapana|sawa|maybe)\W*$", re.I)),
+    ("goodbye", re.compile(r"^\s*(bye|goodbye|good bye|kwaheri|exit|quit|asante( sana)?|thanks?( you)?,? (bye|that'?s all)|that'?s all,? thanks?)\W*$", re.I)),
+    ("greeting", re.compile(r"^\s*(hi|hey|hello|hallo|jambo|habari( yako| zako)?|mambo|niaje|sasa|good (morning|afternoon|evening))( najua| there)?\W*$", re.I)),
+    # Only intent with no subject yet ("I want to report an issue") - a report that names its subject
+    # goes to the classifier (or the LLM), which can still tell an out-of-scope issue apart
+    ("report", re.compile(
+        r"^\s*((hi|hello|habari),?\s*)?(i\s*(want|would like|need)\s*to\s*(report|complain|make a (report|complaint))"
+        r"|report|nataka kuripoti)(\s+(an?|some|one|another)\s+(issue|problem|complaint|matter)|\s+(shida|tatizo))?"
+        r"(,?\s*please)?\W*$",
+        re.I,
+    )),
+]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word unigrams + bigrams"""
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class TfidfLogisticModel:
+    """TF-IDF features + softmax regression, stored as plain JSON"""
+
+    def __init__(self, classes: List[str], idf: Dict[str, float],
+                 weights: Dict[str, Dict[str, float]], bias: Dict[str, float]):
+        self.classes = classes
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+
+    def features(self, text: str) -> Dict[str, float]:
+        counts: Dict[str, float] = {}
+        for token in tokenize(text):
+            if token in self.idf:
+                counts[token] = counts.get(token, 0.0) + 1.0
+        vector = {t: c * self.idf[t] for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {t: v / norm for t, v in vector.items()} if norm else {}
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        return self._softmax(self.features(text))
+
+    def _softmax(self, features: Dict[str, float]) -> Dict[str, float]:
+        scores = {
+            c: self.bias.get(c, 0.0) + sum(self.weights[c].get(t, 0.0) * v for t, v in features.items())
+            for c in self.classes
+        }
+        top = max(scores.values())
+        exp = {c: math.exp(s - top) for c, s in scores.items()}
+        total = sum(exp.values())
+        return {c: e / total for c, e in exp.items()}
+
+    @classmethod
+    def train(cls, examples: List[Dict[str, str]], epochs: int = 300,
+              learning_rate: float = 5.0, l2: float = 1e-4) -> "TfidfLogisticModel":
+        """Fit on [{"text", "intent"}] with batch gradient descent"""
+        classes = sorted({e["intent"] for e in examples})
+        document_frequency: Dict[str, int] = {}
+        for e in examples:
+            for token in set(tokenize(e["text"])):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        n = len(examples)
+        idf = {t: math.log((1 + n) / (1 + df)) + 1.0 for t, df in document_frequency.items()}
+
+        model = cls(classes, idf, {c: {} for c in classes}, {c: 0.0 for c in classes})
+        data = [(model.features(e["text"]), e["intent"]) for e in examples]
+        for _ in range(epochs):
+            grad_w: Dict[str, Dict[str, float]] = {c: {} for c in classes}
+            grad_b = {c: 0.0 for c in classes}
+            for features, label in data:
+                probs = model._softmax(features)
+                for c in classes:
+                    error = probs[c] - (1.0 if c == label else 0.0)
+                    grad_b[c] += error
+                    for t, v in features.items():
+                        grad_w[c][t] = grad_w[c].get(t, 0.0) + error * v
+            for c in classes:
+                model.bias[c] -= learning_rate * grad_b[c] / n
+                weights = model.weights[c]
+                for t in set(weights) | set(grad_w[c]):
+                    w = weights.get(t, 0.0)
+                    weights[t] = w - learning_rate * (grad_w[c].get(t, 0.0) / n + l2 * w)
+        return model
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": 1,
+            "classes": self.classes,
+            "idf": {t: round(v, 6) for t, v in self.idf.items()},
+            "weights": {c: {t: round(w, 6) for t, w in ws.items() if abs(w) >= 1e-4} for c, ws in self.weights.items()},
+            "bias": {c: round(b, 6) for c, b in self.bias.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TfidfLogisticModel":
+        return cls(data["classes"], data["idf"], data["weights"], data["bias"])
+
+    @classmethod
+    def load(cls, path: str) -> "TfidfLogisticModel":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, sort_keys=True)
+
+
+class FastRouterStats:
+    """Hit rate of the fast path and the LLM time it saved (estimated from fallback latency)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rule_hits = 0
+        self.model_hits = 0
+        self.fallbacks = 0
+        self.router_seconds = 0.0
+        self.llm_seconds = 0.0
+        self.llm_calls = 0
+
+    def record_route(self, tier: Optional[str], seconds: float) -> None:
+        with self._lock:
+            self.router_seconds += seconds
+            if tier == "rule":
+                self.rule_hits += 1
+            elif tier == "model":
+                self.model_hits += 1
+            else:
+                self.fallbacks += 1
+
+    def record_llm(self, seconds: float) -> None:
+        with self._lock:
+            self.llm_seconds += seconds
+            self.llm_calls += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.rule_hits + self.model_hits
+            total = hits + self.fallbacks
+            mean_llm = self.llm_seconds / self.llm_calls if self.llm_calls else None
+            return {
+                "decisions": total,
+                "rule_hits": self.rule_hits,
+                "model_hits": self.model_hits,
+                "fallbacks": self.fallbacks,
+                "hit_rate": hits / total if total else 0.0,
+                "mean_router_ms": self.router_seconds / total * 1000 if total else 0.0,
+                "mean_llm_ms": mean_llm * 1000 if mean_llm is not None else None,
+                "estimated_seconds_saved": hits * mean_llm - self.router_seconds if mean_llm is not None else None,
+            }
+
+
+class FastRouter:
+    """
+    Args:
+        model: Trained classifier, or None for rules only
+        threshold: Minimum classifier probability for a fast-path decision
+    """
+
+    def __init__(self, model: Optional[TfidfLogisticModel] = None, threshold: float = 0.8):
+        self.model = model
+        self.threshold = threshold
+        self.stats = FastRouterStats()
+
+    def classify(self, text: str) -> Tuple[Optional[str], Optional[str], float]:
+        """(intent, tier, confidence) - intent None means use the LLM"""
+        for intent, pattern in RULES:
+            if pattern.search(text):
+                return intent, "rule" if intent else None, 1.0
+        if self.model is None:
+            return None, None, 0.0
+        probs = self.model.predict_proba(text)
+        intent = max(probs, key=probs.get)
+        if intent in ROUTABLE_INTENTS and probs[intent] >= self.threshold:
+            return intent, "model", probs[intent]
+        return None, None, probs[intent]
+
+    def route(self, conversation_history: List[Dict[str, str]]) -> Optional[WelcomeHandoffResponse]:
+        """Handoff decision for the latest user message, or None to fall back to the LLM"""
+        start = time.perf_counter()
+        intent, tier, confidence = None, None, 0.0
+        text = ""
+        if conversation_history and conversation_history[-1].get("role") == "user":
+            text = conversation_history[-1].get("content") or ""
+            intent, tier, confidence = self.classify(text)
+        decision = _decision(intent, tier, confidence, text) if intent else None
+        self.stats.record_route(tier if decision else None, time.perf_counter() - start)
+        if decision:
+            logger.info(f"[FastRouter] {tier} -> {intent} ({confidence:.2f}) for {text[:60]!r}")
+        return decision
+
+
+def _decision(intent: str, tier: str, confidence: float, text: str) -> WelcomeHandoffResponse:
+    reasoning = f"Fast path ({tier}, confidence {confidence:.2f}): {intent}"
+    if intent == "report":
+        return WelcomeHandoffResponse(agent="issue_filler_agent", reasoning=reasoning, message_to_agent=text)
+    return WelcomeHandoffResponse(
+        agent="respond_to_user_agent",
+        reasoning=reasoning,
+        message_to_user=GREETING_MESSAGE if intent == "greeting" else GOODBYE_MESSAGE,
+        agent_after_human_response="welcome_agent",
+    )
+
+
+_router: Optional[FastRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_fast_router() -> Optional[FastRouter]:
+    """Process-wide router, or None when FAST_ROUTER_ENABLED=false"""
+    global _router
+    if os.getenv("FAST_ROUTER_ENABLED", "true").lower() != "true":
+        return None
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                path = os.getenv("FAST_ROUTER_MODEL_PATH", DEFAULT_MODEL_PATH)
+                model = None
+                try:
+                    model = TfidfLogisticModel.load(path)
+                except Exception as e:
+                    # Rules still work without the classifier
+                    logger.warning(f"[FastRouter] Could not load model from {path}, using rules only: {e}")
+                _router = FastRouter(model, threshold=float(os.getenv("FAST_ROUTER_THRESHOLD", "0.8")))
+    return _router
+
+
+def get_fast_router_stats() -> Dict[str, Any]:
+    router = get_fast_router()
+    return router.stats.snapshot() if router else {}
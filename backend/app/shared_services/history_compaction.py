@@ -0,0 +1,175 @@
+"""
+Conversation-history compaction.
+Agents get [rolling summary of older turns] + the most recent messages instead of
+the full conversation_history, keeping tokens per hop roughly flat as sessions grow.
+
+The summary lives in state["history_summary"] ({"text", "covered"}) and is extended
+incrementally: only messages not yet covered are ever sent to the summarizer.
+Issue fields are not summarized - current_issues stays the source of truth and is
+already rendered into the filler/reporting prompts.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from app.shared_services.llm import call_llm_api, acall_llm_api
+
+logger = logging.getLogger(__name__)
+
+# Token budget for the history part of each agent's request (summary + recent messages)
+DEFAULT_HISTORY_BUDGETS = {
+    "welcome_agent": 800,
+    "issue_filler_agent": 1500,
+    "issue_reporting_agent": 1000,
+}
+
+# After a fold, recent messages use at most this share of the budget, so folding
+# (one summarizer call) happens every few turns rather than on every hop
+RECENT_SHARE_AFTER_FOLD = 0.5
+
+# Always keep at least this many of the latest messages verbatim
+MIN_RECENT_MESSAGES = 2
+
+SUMMARY_MAX_TOKENS = 300
+
+SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a citizen and Najua, a Kenyan
+non-emergency issue reporting assistant.
+
+Update the existing summary with the new messages. Keep what matters for continuing the
+conversation: what the citizen wants, questions already asked and answered, decisions,
+tone/language preferences and anything the citizen refused to share.
+Do NOT restate issue fields (type, description, location, severity, date, time) - the
+system tracks those separately. Write plain prose, at most 150 words.
+Return only the updated summary.
+"""
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count (~4 characters per token) - good enough for budgeting"""
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+
+def messages_tokens(messages: List[Dict[str, str]]) -> int:
+    # +4 per message for role/formatting overhead
+    return sum(estimate_tokens(m.get("content")) + 4 for m in messages)
+
+
+def get_history_budget(agent: str) -> int:
+    """Per-agent budget, overridable with HISTORY_BUDGET_<AGENT> (e.g. HISTORY_BUDGET_WELCOME_AGENT)"""
+    default = DEFAULT_HISTORY_BUDGETS.get(agent, 1000)
+    return int(os.getenv(f"HISTORY_BUDGET_{agent.upper()}", str(default)))
+
+
+def _summary_message(summary_text: str) -> Dict[str, str]:
+    return {
+        "role": "system",
+        "content": (
+            "Summary of the earlier conversation (issue details in the issue status above take precedence):\n"
+            f"{summary_text}"
+        ),
+    }
+
+
+def _plan(history: List[Dict[str, str]], summary: Dict[str, Any], budget: int) -> Tuple[int, int]:
+    """
+    Decide what to fold. Returns (covered, fold_to): messages [covered:fold_to] need
+    folding into the summary (fold_to == covered means nothing to do).
+    """
+    covered = min(summary.get("covered", 0), len(history))
+    recent = history[covered:]
+    summary_tokens = estimate_tokens(summary.get("text"))
+    if summary_tokens + messages_tokens(recent) <= budget or len(recent) <= MIN_RECENT_MESSAGES:
+        return covered, covered
+
+    # Keep the newest messages that fit in the post-fold share of the budget
+    target = max(budget * RECENT_SHARE_AFTER_FOLD - SUMMARY_MAX_TOKENS, 0)
+    keep = 0
+    used = 0
+    for message in reversed(recent):
+        cost = messages_tokens([message])
+        if keep >= MIN_RECENT_MESSAGES and used + cost > target:
+            break
+        keep += 1
+        used += cost
+    return covered, len(history) - keep
+
+
+def _summarizer_messages(previous_summary: str, new_messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    transcript = "\n".join(f"{m.get('role', 'user')}: {m.get('content', '')}" for m in new_messages)
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": f"Existing summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"},
+    ]
+
+
+def _summarizer_settings() -> Dict[str, Any]:
+    return {
+        "model": os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini"),
+        "provider": os.getenv("HISTORY_SUMMARY_PROVIDER", "openai"),
+        "temperature": 0,
+        "max_tokens": SUMMARY_MAX_TOKENS,
+    }
+
+
+def _compacted(history: List[Dict[str, str]], summary: Dict[str, Any], agent: str) -> List[Dict[str, str]]:
+    recent = history[min(summary.get("covered", 0), len(history)):]
+    messages = ([_summary_message(summary["text"])] if summary.get("text") else []) + recent
+    logger.info(
+        f"[History] {agent}: {len(history)} message(s) -> {len(messages)} "
+        f"(~{messages_tokens(messages)} tokens, {summary.get('covered', 0)} summarized)"
+    )
+    return messages
+
+
+def _fold_request(state: Dict[str, Any], agent: str) -> Tuple[Dict[str, Any], Optional[List[Dict[str, str]]], int]:
+    """
+    -> (current summary, summarizer messages or None when nothing needs folding, fold_to).
+    Shared by compact_history and acompact_history - only the LLM call differs.
+    """
+    history = state.get("conversation_history", [])
+    summary = state.get("history_summary") or {"text": "", "covered": 0}
+    covered, fold_to = _plan(history, summary, get_history_budget(agent))
+    if fold_to <= covered:
+        return summary, None, fold_to
+    return summary, _summarizer_messages(summary.get("text", ""), history[covered:fold_to]), fold_to
+
+
+def _apply_fold(state: Dict[str, Any], agent: str, summary: Dict[str, Any], fold_to: int,
+                text: Optional[str]) -> List[Dict[str, str]]:
+    """Store the extended summary (text is None if nothing was folded) and build the agent's history"""
+    if text is not None:
+        summary = {"text": text.strip(), "covered": fold_to}
+        state["history_summary"] = summary
+    return _compacted(state.get("conversation_history", []), summary, agent)
+
+
+def compact_history(state: Dict[str, Any], agent: str) -> List[Dict[str, str]]:
+    """
+    History to send for `agent`: summary message (if any) + recent messages within the
+    agent's budget. Folds older messages into state["history_summary"] when needed.
+    """
+    summary, request, fold_to = _fold_request(state, agent)
+    text = None
+    if request is not None:
+        try:
+            text = call_llm_api(messages=request, **_summarizer_settings())
+        except Exception as e:
+            # Sending a longer history beats failing the turn
+            logger.warning(f"[History] Summarization failed, sending uncompacted history: {e}")
+    return _apply_fold(state, agent, summary, fold_to, text)
+
+
+async def acompact_history(state: Dict[str, Any], agent: str) -> List[Dict[str, str]]:
+    """Async compact_history"""
+    summary, request, fold_to = _fold_request(state, agent)
+    text = None
+    if request is not None:
+        try:
+            text = await acall_llm_api(messages=request, **_summarizer_settings())
+        except Exception as e:
+            logger.warning(f"[History] Summarization failed, sending uncompacted history: {e}")
+    return _apply_fold(state, agent, summary, fold_to, text)
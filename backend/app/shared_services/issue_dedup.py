@@ -0,0 +1,294 @@
+"""
+Near-duplicate detection for reported issues.
+Issues are fingerprinted with MinHash signatures over shingles of their type,
+normalized location and description, and bucketed with LSH so a new report can
+be matched against every open issue without scanning them.
+"""
+
+import os
+import re
+import asyncio
+import random
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
+import logging
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = _MERSENNE_PRIME
+
+# Words that carry no signal when comparing reports
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "at", "to", "for", "by", "near", "next",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "there", "has", "have",
+    "with", "from", "very", "so", "i", "we", "our", "my", "me", "please", "also", "just",
+}
+
+# Generic location words - "Kitengela road" and "Kitengela" are the same place for our purposes
+_LOCATION_NOISE = {"road", "rd", "street", "st", "avenue", "ave", "area", "estate", "town", "county", "along", "opposite", "behind"}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: Optional[str]) -> List[str]:
+    """Lowercase, strip punctuation and stopwords -> tokens"""
+    if not text:
+        return []
+    return [t for t in _WORD_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def normalize_location(location: Optional[str]) -> List[str]:
+    """Location tokens without generic words like 'road' or 'estate'"""
+    return [t for t in normalize_text(location) if t not in _LOCATION_NOISE]
+
+
+def _shingles(issue_type: Optional[str], location: Optional[str], description: Optional[str]) -> Set[str]:
+    """Word 2-grams of the description plus location and type tokens"""
+    shingles = set()
+    words = normalize_text(description)
+    if len(words) < 2:
+        shingles.update(words)
+    else:
+        shingles.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    shingles.update(f"loc:{t}" for t in normalize_location(location))
+    if issue_type:
+        shingles.add(f"type:{issue_type.lower()}")
+    return shingles
+
+
+def _location_similarity(a: List[str], b: List[str]) -> float:
+    """Overlap coefficient - a short location ("Kitengela") matches a longer one containing it"""
+    if not a or not b:
+        return 0.0
+    set_a, set_b = set(a), set(b)
+    return len(set_a & set_b) / min(len(set_a), len(set_b))
+
+
+class DuplicateMatch(BaseModel):
+    issue_id: str
+    similarity: float  # Estimated Jaccard similarity of the fingerprints
+    location_similarity: float
+
+
+class IssueDuplicateIndex:
+    """
+    In-memory MinHash/LSH index of issue fingerprints.
+    With bands * rows = num_perm, pairs above ~(1/bands)^(1/rows) similarity
+    land in a shared bucket with high probability.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.5,
+                 min_location_similarity: float = 0.5, seed: int = 1337):
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.min_location_similarity = min_location_similarity
+
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        self._lock = threading.Lock()
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [{} for _ in range(bands)]
+        # issue_id -> (signature, issue_type, location tokens)
+        self._entries: Dict[str, Tuple[Tuple[int, ...], Optional[str], List[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, issue_type: Optional[str], location: Optional[str],
+                  description: Optional[str]) -> Tuple[int, ...]:
+        """MinHash signature of an issue"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+            for s in _shingles(issue_type, location, description)
+        ]
+        if not hashes:
+            return tuple([_MAX_HASH] * self.num_perm)
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in self._perms
+        )
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, issue_id: str, issue_type: Optional[str], location: Optional[str],
+            description: Optional[str]) -> None:
+        """Add (or replace) an issue in the index"""
+        signature = self.signature(issue_type, location, description)
+        with self._lock:
+            self._remove_locked(issue_id)
+            self._entries[issue_id] = (signature, issue_type, normalize_location(location))
+            for band, key in self._band_keys(signature):
+                self._buckets[band].setdefault(key, set()).add(issue_id)
+
+    def remove(self, issue_id: str) -> None:
+        """Drop an issue (e.g. once it is resolved)"""
+        with self._lock:
+            self._remove_locked(issue_id)
+
+    def _remove_locked(self, issue_id: str) -> None:
+        entry = self._entries.pop(issue_id, None)
+        if entry is None:
+            return
+        for band, key in self._band_keys(entry[0]):
+            bucket = self._buckets[band].get(key)
+            if bucket:
+                bucket.discard(issue_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def find_duplicate(self, issue_type: Optional[str], location: Optional[str],
+                       description: Optional[str]) -> Optional[DuplicateMatch]:
+        """
+        Best existing match for a new report, or None.
+        A match needs the same issue type (when both are known), overlapping
+        locations and an estimated similarity at or above the threshold.
+        """
+        signature = self.signature(issue_type, location, description)
+        location_tokens = normalize_location(location)
+
+        with self._lock:
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates.update(self._buckets[band].get(key, ()))
+
+            best = None
+            for issue_id in candidates:
+                other_signature, other_type, other_location = self._entries[issue_id]
+                if issue_type and other_type and issue_type.lower() != other_type.lower():
+                    continue
+                location_similarity = _location_similarity(location_tokens, other_location)
+                if location_similarity < self.min_location_similarity:
+                    continue
+                similarity = sum(x == y for x, y in zip(signature, other_signature)) / self.num_perm
+                if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                    best = DuplicateMatch(
+                        issue_id=issue_id,
+                        similarity=similarity,
+                        location_similarity=location_similarity,
+                    )
+        return best
+
+    def add_issue_row(self, row: Dict[str, Any]) -> None:
+        """Add an issues-table row (category is the issue type, location lives in metadata)"""
+        self.add(row["issue_id"], *issue_row_fingerprint_fields(row))
+
+    def warm_from_db(self, statuses: Tuple[str, ...] = ("open", "in_progress")) -> int:
+        """Load every unresolved issue from the issues table. Returns the number indexed."""
+        from app.shared_services.db import iter_all_issues
+
+        count = 0
+        for status in statuses:
+            for row in iter_all_issues(status=status, columns=["issue_id", "category", "description", "metadata"]):
+                self.add_issue_row(row)
+                count += 1
+        logger.info(f"Duplicate index warmed with {count} issue(s)")
+        return count
+
+
+def issue_row_fingerprint_fields(row: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(issue_type, location, description) for an issues-table row"""
+    metadata = row.get("metadata") or {}
+    return row.get("category"), metadata.get("location"), row.get("description")
+
+
+# Process-wide index, warmed from the DB on first use (or at startup, see awarm_duplicate_index)
+_index: Optional[IssueDuplicateIndex] = None
+_index_lock = threading.Lock()
+_warm_retry_at = 0.0  # After a failed warm-up, don't hit the DB again before this time
+
+
+def get_duplicate_index() -> Optional[IssueDuplicateIndex]:
+    """
+    Get the process-wide duplicate index, or None when ISSUE_DEDUP_ENABLED=false or the
+    index could not be loaded yet. A failed warm-up is retried on a later call, at most
+    every ISSUE_DEDUP_RETRY_SECONDS (default 30) - until then reports are saved unchecked.
+    Similarity threshold is set with ISSUE_DEDUP_THRESHOLD (default 0.5).
+    """
+    global _index, _warm_retry_at
+    if os.getenv("ISSUE_DEDUP_ENABLED", "true").lower() != "true":
+        return None
+    if _index is None:
+        if time.time() < _warm_retry_at:
+            return None
+        with _index_lock:
+            if _index is None and time.time() >= _warm_retry_at:
+                index = IssueDuplicateIndex(threshold=float(os.getenv("ISSUE_DEDUP_THRESHOLD", "0.5")))
+                try:
+                    index.warm_from_db()
+                except Exception as e:
+                    retry_seconds = float(os.getenv("ISSUE_DEDUP_RETRY_SECONDS", "30"))
+                    _warm_retry_at = time.time() + retry_seconds
+                    logger.warning(
+                        f"Could not warm duplicate index from database, duplicate detection is off "
+                        f"(retrying in {retry_seconds:.0f}s): {e}"
+                    )
+                    return None
+                _index = index
+    return _index
+
+
+def find_duplicate_for_issue(issue: Dict[str, Any]) -> Optional[DuplicateMatch]:
+    """Check an issue dict (as passed to save_issue) against the process-wide index"""
+    index = get_duplicate_index()
+    if index is None:
+        return None
+    return index.find_duplicate(*issue_row_fingerprint_fields(issue))
+
+
+def index_saved_issue(row: Dict[str, Any]) -> None:
+    """Make a newly saved issue visible to later duplicate checks"""
+    index = get_duplicate_index()
+    if index is not None:
+        index.add_issue_row(row)
+
+
+def unindex_issue(issue_id: str) -> None:
+    """Stop matching new reports against an issue (e.g. once it is resolved or closed)"""
+    index = get_duplicate_index()
+    if index is not None:
+        index.remove(issue_id)
+
+
+# Async variants - warming scans the issues table with psycopg2 and lookups hash every
+# shingle, so both run in a worker thread instead of on the event loop.
+
+async def awarm_duplicate_index() -> None:
+    """Build the process-wide index before the first report (e.g. at server startup)"""
+    await asyncio.to_thread(get_duplicate_index)
+
+
+async def afind_duplicate_for_issue(issue: Dict[str, Any]) -> Optional[DuplicateMatch]:
+    return await asyncio.to_thread(find_duplicate_for_issue, issue)
+
+
+async def aindex_saved_issue(row: Dict[str, Any]) -> None:
+    await asyncio.to_thread(index_saved_issue, row)
+
+
+async def aunindex_issue(issue_id: str) -> None:
+    await asyncio.to_thread(unindex_issue, issue_id)
+
+
+def duplicate_report(issue: Dict[str, Any], match: DuplicateMatch) -> Dict[str, Any]:
+    """The record stored on the existing issue for a duplicate report"""
+    return {
+        "title": issue.get("title"),
+        "description": issue.get("description"),
+        "location": (issue.get("metadata") or {}).get("location"),
+        "similarity": round(match.similarity, 3),
+        "reported_at": datetime.now().isoformat(timespec="seconds"),
+    }
@@ -0,0 +1,240 @@
+"""
+Local extraction pre-pass for the issue filler agent.
+Fills issue_type (category keywords), issue_location (gazetteer of Kenyan counties,
+towns and estates) and issue_description from the user's messages before the LLM
+call, so the LLM only has to ask for what is still missing - and can be skipped
+entirely once every mandatory field is known.
+
+Keywords and place names are indexed in token tries; a scan is a single pass over
+the message with longest-match lookups (phrases are at most a few tokens long).
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.najua_models import IssueFillerResponse, NajuaState
+from app.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kenya_gazetteer.json")
+
+# issue_type -> keywords/phrases (lowercase; plurals are handled by normalization)
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "Infrastructure": [
+        "pothole", "road", "street light", "streetlight", "bridge", "drainage", "drain", "sewage", "sewer",
+        "water", "burst pipe", "pipe", "borehole", "electricity", "power", "transformer", "blackout",
+        "building", "construction", "flooding", "barabara", "maji", "stima",
+    ],
+    "Education": ["school", "teacher", "classroom", "pupil", "student", "textbook", "bursary", "shule", "mwalimu"],
+    "Health": ["hospital", "clinic", "dispensary", "health centre", "health center", "medicine", "drug", "nurse", "doctor", "hospitali"],
+    "Agriculture": ["farmer", "fertilizer", "fertiliser", "seed", "crop", "livestock", "cattle", "harvest", "irrigation", "mbolea", "shamba"],
+    "Environment": ["garbage", "rubbish", "trash", "waste", "dumping", "dumpsite", "pollution", "deforestation", "tree", "noise", "taka"],
+    "Transport": ["matatu", "bus", "bus stop", "stage", "traffic", "boda", "railway", "train", "parking"],
+    "Finance": ["tax", "bribe", "corruption", "fee", "levy", "pension", "payment", "hongo"],
+    "Social Welfare": ["orphan", "elderly", "disability", "disabled", "street children", "cash transfer", "inua jamii", "food relief"],
+}
+
+# Some place names are also ordinary words ("Engineer", "Karen", "Wote"); those only
+# count right after one of these
+LOCATIVE_CUES = {"in", "at", "near", "around", "from", "of", "on", "kwa", "huko", "hapa", "karibu", "na", "estate", "area"}
+
+# Leading report phrases that say nothing about the issue itself
+_INTENT_PREFIX = re.compile(
+    r"^\s*(hi|hello|habari)?[\s,]*(i\s*(want|would like|need|wish)\s*to\s*(report|complain about)|nataka kuripoti|report)\s*",
+    re.I,
+)
+
+MIN_DESCRIPTION_WORDS = 4
+
+
+def normalize_tokens(text: str) -> List[str]:
+    tokens = re.findall(r"[a-z0-9']+", text.lower().replace("-", " "))
+    # Cheap plural folding: "potholes" -> "pothole" (applied to index and text alike)
+    return [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t for t in tokens]
+
+
+class PhraseTrie:
+    """Token-level trie over phrases; find() returns non-overlapping longest matches"""
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+        self._max_len = 0
+
+    def add(self, phrase: str, value: Any) -> None:
+        tokens = normalize_tokens(phrase)
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node["\0"] = value
+        self._max_len = max(self._max_len, len(tokens))
+
+    def find(self, tokens: List[str]) -> List[Tuple[int, int, Any]]:
+        """[(start, end, value)] for the longest match at each position, left to right"""
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self._root
+            best = None
+            for j in range(i, min(i + self._max_len, len(tokens))):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if "\0" in node:
+                    best = (i, j + 1, node["\0"])
+            if best:
+                matches.append(best)
+                i = best[1]
+            else:
+                i += 1
+        return matches
+
+
+class IssueExtractor:
+    """Rule + gazetteer extraction of IssueFillerResponse fields"""
+
+    # Most specific place wins
+    KIND_RANK = {"estate": 3, "town": 2, "county": 1}
+
+    def __init__(self, places: List[Dict[str, Any]]):
+        self.categories = PhraseTrie()
+        for category, keywords in CATEGORY_KEYWORDS.items():
+            for keyword in keywords:
+                self.categories.add(keyword, category)
+        self.places = PhraseTrie()
+        for place in places:
+            for name in [place["name"]] + place.get("aliases", []):
+                self.places.add(name, place)
+        self.stats = {"runs": 0, "fields_filled": 0, "llm_skipped": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str = GAZETTEER_PATH) -> "IssueExtractor":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["places"])
+
+    def issue_type(self, tokens: List[str]) -> Optional[str]:
+        counts: Dict[str, int] = {}
+        for _, _, category in self.categories.find(tokens):
+            counts[category] = counts.get(category, 0) + 1
+        if not counts:
+            return None
+        ranked = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
+        # A tie is ambiguous - leave it to the LLM
+        if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+            return None
+        return ranked[0][0]
+
+    def location(self, tokens: List[str]) -> Optional[str]:
+        best = None
+        for start, _, place in self.places.find(tokens):
+            if place.get("needs_cue") and (start == 0 or tokens[start - 1] not in LOCATIVE_CUES):
+                continue
+            if best is None or self.KIND_RANK[place["kind"]] > self.KIND_RANK[best["kind"]]:
+                best = place
+        if best is None:
+            return None
+        if best["kind"] == "county":
+            return f"{best['name']} County"
+        return f"{best['name']}, {best['county']}"
+
+    def description(self, text: str, tokens: List[str]) -> Optional[str]:
+        if not self.categories.find(tokens):
+            return None
+        stripped = _INTENT_PREFIX.sub("", text).strip()
+        if len(stripped.split()) < MIN_DESCRIPTION_WORDS:
+            return None
+        return stripped[0].upper() + stripped[1:]
+
+    def extract(self, conversation_history: List[Dict[str, str]]) -> Dict[str, Tuple[str, int]]:
+        """
+        Fields found in the user's messages -> (value, index of the message it came from).
+        The latest message wins for each field.
+        """
+        fields: Dict[str, Tuple[str, int]] = {}
+        for index in range(len(conversation_history) - 1, -1, -1):
+            message = conversation_history[index]
+            if message.get("role") != "user" or not message.get("content"):
+                continue
+            text = message["content"]
+            tokens = normalize_tokens(text)
+            for field, value in (
+                ("issue_type", lambda: self.issue_type(tokens)),
+                ("issue_location", lambda: self.location(tokens)),
+                ("issue_description", lambda: self.description(text, tokens)),
+            ):
+                if field not in fields:
+                    found = value()
+                    if found:
+                        fields[field] = (found, index)
+        return fields
+
+    def record(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                self.stats[name] += count
+
+
+_extractor: Optional[IssueExtractor] = None
+_extractor_lock = threading.Lock()
+
+
+def get_issue_extractor() -> IssueExtractor:
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = IssueExtractor.from_file(os.getenv("ISSUE_GAZETTEER_PATH", GAZETTEER_PATH))
+    return _extractor
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and value.strip() == "")
+
+
+def prefill_issue(state: NajuaState) -> Tuple[Optional[IssueFillerResponse], List[str], bool]:
+    """
+    Fill missing fields of the current issue (or start one) from the conversation.
+    Only messages after the last save (state["issues_saved_at"]) are read, so issues
+    that were already reported don't leak into the next one. Fields already in state
+    are never overwritten.
+    Returns (issue or None if nothing is known yet, fields filled by this call,
+    whether all of those came from the user's latest message).
+    """
+    if os.getenv("ISSUE_EXTRACTION_ENABLED", "true").lower() != "true":
+        return None, [], False
+    extractor = get_issue_extractor()
+    history = (state.get("conversation_history") or [])[state.get("issues_saved_at") or 0:]
+    found = extractor.extract(history)
+    latest = max((i for i, m in enumerate(history) if m.get("role") == "user"), default=-1)
+
+    existing = (state.get("current_issues") or [None])[0]
+    if existing is not None and hasattr(existing, "model_dump"):
+        issue_dict = existing.model_dump()
+    else:
+        issue_dict = dict(existing or {})
+
+    filled = [field for field in found if _is_empty(issue_dict.get(field))]
+    for field in filled:
+        issue_dict[field] = found[field][0]
+    current_turn = all(found[field][1] == latest for field in filled)
+
+    extractor.record(runs=1, fields_filled=len(filled))
+    if not filled:
+        if existing is None:
+            return None, [], False
+        return (existing if isinstance(existing, IssueFillerResponse) else IssueFillerResponse(**issue_dict)), [], False
+
+    logger.info(f"[Extraction] Pre-filled {', '.join(filled)}")
+    issue = IssueFillerResponse(**issue_dict)
+    state["current_issues"] = [issue] + list(state.get("current_issues") or [])[1:]
+    return issue, filled, current_turn
+
+
+def get_extraction_stats() -> Dict[str, int]:
+    return dict(get_issue_extractor().stats)
@@ -1,12 +1,26 @@
-from openai import OpenAI
-from typing import List, Dict, Any, Optional
+from openai import OpenAI, AsyncOpenAI, APIConnectionError
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Callable, Iterator
+from collections import OrderedDict, deque
+from contextlib import aclosing, contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+import hashlib
+import re
+import threading
+import asyncio
+import time
 import os
 from dotenv import load_dotenv
 from pydantic import BaseModel
 import instructor
 from instructor import patch
 import json
+from functools import lru_cache
 from .logger_setup import setup_logger
+from .llm_cache import get_llm_cache, make_cache_key, should_use_cache, encode_cached_response, decode_cached_response
+from .tracing import span, traced, set_span_attributes, add_span_counts
+from .metrics import REGISTRY, LLM_CALLS, LLM_ATTEMPTS, LLM_ATTEMPT_SECONDS, LLM_TOKENS
+from .deadline import DeadlineExceededError, remaining_time
 
 load_dotenv()
 
@@ -21,6 +35,10 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 _clients_cache = {}
 
 
+class ProviderUnavailableError(RuntimeError):
+    """Raised when a provider is skipped because its circuit breaker is open"""
+
+
 def _get_openai_client():
     """Get or create OpenAI client"""
     if "openai" not in _clients_cache:
@@ -30,25 +48,50 @@ def _get_openai_client():
     return _clients_cache["openai"]
 
 
+def _get_async_openai_client():
+    """Get or create async OpenAI client"""
+    if "openai_async" not in _clients_cache:
+        if not OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY not set")
+        _clients_cache["openai_async"] = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _clients_cache["openai_async"]
+
+
+def _openrouter_client_kwargs() -> Dict[str, Any]:
+    return {
+        "api_key": OPENROUTER_API_KEY,
+        "base_url": "https://openrouter.ai/api/v1",
+        "default_headers": {
+            "HTTP-Referer": os.getenv("OPENROUTER_REFERRER", "https://kunani.ai"),
+            "X-Title": os.getenv("OPENROUTER_TITLE", "Kunani"),
+        },
+    }
+
+
 def _get_openrouter_client():
     """Get or create OpenRouter client"""
     if "openrouter" not in _clients_cache:
         if not OPENROUTER_API_KEY:
             raise ValueError("OPENROUTER_API_KEY not set")
         _clients_cache["openrouter"] = instructor.patch(
-            OpenAI(
-                api_key=OPENROUTER_API_KEY,
-                base_url="https://openrouter.ai/api/v1",
-                default_headers={
-                    "HTTP-Referer": os.getenv("OPENROUTER_REFERRER", "https://kunani.ai"),
-                    "X-Title": os.getenv("OPENROUTER_TITLE", "Kunani"),
-                }
-            ),
+            OpenAI(**_openrouter_client_kwargs()),
             mode=instructor.Mode.JSON
         )
     return _clients_cache["openrouter"]
 
 
+def _get_async_openrouter_client():
+    """Get or create async OpenRouter client"""
+    if "openrouter_async" not in _clients_cache:
+        if not OPENROUTER_API_KEY:
+            raise ValueError("OPENROUTER_API_KEY not set")
+        _clients_cache["openrouter_async"] = instructor.patch(
+            AsyncOpenAI(**_openrouter_client_kwargs()),
+            mode=instructor.Mode.JSON
+        )
+    return _clients_cache["openrouter_async"]
+
+
 def _get_gemini_client():
     """Get or create Gemini client"""
     if "gemini" not in _clients_cache:
@@ -63,6 +106,766 @@ def _get_gemini_client():
     return _clients_cache["gemini"]
 
 
+@lru_cache(maxsize=None)
+def get_schema_json(response_format: type) -> str:
+    """JSON schema of a response model, generated once per process (model_json_schema() is slow)"""
+    return json.dumps(response_format.model_json_schema(), ensure_ascii=False)
+
+
+def _schema_instruction(response_format: BaseModel) -> str:
+    return f"Respond in valid JSON matching this schema: {get_schema_json(response_format)}"
+
+
+def _has_schema(messages: List[Dict[str, str]], response_format: BaseModel) -> bool:
+    """True if the system prompt already embeds the schema (precompiled prompt templates do)"""
+    return bool(messages) and messages[0].get("role") == "system" and get_schema_json(response_format) in messages[0]["content"]
+
+
+def _messages_with_schema(messages: List[Dict[str, str]], response_format: BaseModel) -> List[Dict[str, str]]:
+    """
+    Messages with the schema instruction at the start of the system prompt (or as one).
+    Schema + static system prompt then form a byte-identical prefix across calls, which
+    is what provider prompt caching matches on. The caller's messages are never modified.
+    """
+    if _has_schema(messages, response_format):
+        return messages
+    schema_instruction = _schema_instruction(response_format)
+    if messages and messages[0].get("role") == "system":
+        return [{**messages[0], "content": f"{schema_instruction}\n\n{messages[0]['content']}"}] + list(messages[1:])
+    return [{"role": "system", "content": schema_instruction}] + list(messages)
+
+
+# --- Usage / prompt-cache reporting ---------------------------------------------
+
+class LLMUsageStats:
+    """Token usage per provider, including how many prompt tokens were served from cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers: Dict[str, Dict[str, int]] = {}
+
+    def record(self, provider: str, model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            totals = self._providers.setdefault(provider, {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+            })
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["completion_tokens"] += completion_tokens
+        scope = _usage_scope.get()
+        if scope is not None:
+            scope["calls"] += 1
+            scope["prompt_tokens"] += prompt_tokens
+            scope["cached_tokens"] += cached_tokens
+            scope["completion_tokens"] += completion_tokens
+        # Per-call token counts on the attempt's span
+        add_span_counts(prompt_tokens=prompt_tokens, cached_tokens=cached_tokens, completion_tokens=completion_tokens)
+        LLM_TOKENS.inc(prompt_tokens, provider=provider, type="prompt")
+        LLM_TOKENS.inc(cached_tokens, provider=provider, type="cached")
+        LLM_TOKENS.inc(completion_tokens, provider=provider, type="completion")
+        cached_share = cached_tokens / prompt_tokens if prompt_tokens else 0.0
+        logger.info(
+            f"[LLM] Usage {provider}/{model}: prompt={prompt_tokens} cached={cached_tokens} "
+            f"({cached_share:.0%}) completion={completion_tokens}"
+        )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {provider: dict(totals) for provider, totals in self._providers.items()}
+        for totals in result.values():
+            totals["cached_ratio"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+        return result
+
+
+llm_usage = LLMUsageStats()
+
+# Usage totals of the innermost track_llm_usage() block (shared with tasks started inside it)
+_usage_scope: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_usage_scope", default=None)
+
+
+@contextmanager
+def track_llm_usage() -> Iterator[Dict[str, int]]:
+    """Calls and prompt/cached/completion tokens of the LLM usage reported inside the block"""
+    totals = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+    token = _usage_scope.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage_scope.reset(token)
+
+
+def get_llm_usage_stats() -> Dict[str, Dict[str, Any]]:
+    """Prompt/cached/completion token totals per provider"""
+    return llm_usage.snapshot()
+
+
+def _record_openai_usage(provider: str, model: str, usage) -> None:
+    """Record usage from an OpenAI-compatible response (OpenAI, OpenRouter)"""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    llm_usage.record(
+        provider, model,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        cached_tokens=(getattr(details, "cached_tokens", 0) or 0) if details else 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+    )
+
+
+def _record_gemini_usage(model: str, usage_metadata) -> None:
+    if usage_metadata is None:
+        return
+    llm_usage.record(
+        "gemini", model,
+        prompt_tokens=getattr(usage_metadata, "prompt_token_count", 0) or 0,
+        cached_tokens=getattr(usage_metadata, "cached_content_token_count", 0) or 0,
+        completion_tokens=getattr(usage_metadata, "candidates_token_count", 0) or 0,
+    )
+
+
+# --- Gemini --------------------------------------------------------------------
+
+def _gemini_request(messages, response_format, temperature, max_tokens) -> Tuple[Optional[str], str, Dict[str, Any]]:
+    """
+    Split messages for Gemini -> (system_instruction, prompt, generation_config).
+    The leading system message (with the schema) becomes the system instruction - the
+    stable prefix that can be served from a context cache; the rest is flattened.
+    """
+    if response_format:
+        messages = _messages_with_schema(messages, response_format)
+    
+    system_instruction = None
+    if messages and messages[0]["role"] == "system":
+        system_instruction = messages[0]["content"]
+        messages = messages[1:]
+    
+    prompt_parts = []
+    for msg in messages:
+        if msg["role"] == "system":
+            prompt_parts.append(f"System: {msg['content']}")
+        elif msg["role"] == "user":
+            prompt_parts.append(f"User: {msg['content']}")
+        elif msg["role"] == "assistant":
+            prompt_parts.append(f"Assistant: {msg['content']}")
+    
+    full_prompt = "\n".join(prompt_parts)
+    generation_config = {
+        "temperature": temperature,
+        "max_output_tokens": max_tokens,
+    }
+    
+    if response_format:
+        generation_config["response_mime_type"] = "application/json"
+    
+    return system_instruction, full_prompt, generation_config
+
+
+class GeminiContextCache:
+    """
+    Explicit Gemini context caches for long system instructions, keyed by (model, prefix).
+    Prefixes below min_tokens (the API minimum) or rejected by the API are sent uncached.
+    Both the cache entries and the rejected keys are LRUs bounded by max_entries. Caches
+    are created outside the lock, within the attempt's timeout; a request that finds its
+    key being created by another thread uses the previous cache if it is still live, else
+    sends the prefix uncached. A transient failure (timeout, 429, 5xx) is retried by a
+    later request instead of marking the prefix unsupported.
+    Evicted caches are not deleted remotely - they expire with their TTL.
+    """
+
+    def __init__(self, ttl: float = 3600.0, min_tokens: int = 1024, max_entries: int = 64):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()  # key -> (CachedContent, expires_at)
+        self._unsupported: "OrderedDict[str, None]" = OrderedDict()
+        self._creating: set = set()
+
+    @staticmethod
+    def _key(model: str, system_instruction: str) -> str:
+        return hashlib.sha256(f"{model}\0{system_instruction}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _remember(entries: OrderedDict, key: str, value, max_entries: int) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
+
+    def _lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """-> (live cached content or None, whether this caller should create a new one)"""
+        now = time.time()
+        with self._lock:
+            if key in self._unsupported:
+                self._unsupported.move_to_end(key)
+                return None, False
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            # Recreate a little before expiry so a request never races the TTL
+            stale = entry is None or entry[1] - now < 60
+            create = stale and key not in self._creating
+            if create:
+                self._creating.add(key)
+            return (entry[0] if entry is not None else None), create
+
+    def _create(self, genai, model: str, system_instruction: str, timeout: Optional[float]):
+        """
+        CachedContent.create with a timeout. The SDK's create() takes no request options,
+        so the same request is sent through its cache client.
+        """
+        caching = genai.caching
+        request = caching.CachedContent._prepare_create_request(
+            model=model if model.startswith("models/") else f"models/{model}",
+            system_instruction=system_instruction,
+            ttl=timedelta(seconds=self.ttl),
+        )
+        # No timeout -> keep the client's default rather than passing None (which means wait forever)
+        options = {"timeout": timeout} if timeout else {}
+        response = caching.get_default_cache_client().create_cached_content(request, **options)
+        return caching.CachedContent._from_obj(response)
+
+    def get_model(self, model: str, system_instruction: Optional[str], timeout: Optional[float] = None):
+        """GenerativeModel using a context cache for the system instruction when possible"""
+        genai = _get_gemini_client()
+        if not system_instruction:
+            return genai.GenerativeModel(model)
+        if len(system_instruction) // 4 < self.min_tokens:
+            return genai.GenerativeModel(model, system_instruction=system_instruction)
+        
+        key = self._key(model, system_instruction)
+        cached, create = self._lookup(key)
+        if create:
+            try:
+                created = self._create(genai, model, system_instruction, timeout)
+            except Exception as e:
+                transient = _counts_against_circuit(e)
+                logger.warning(
+                    f"[LLM] Gemini context cache {'creation failed' if transient else 'unavailable'} for {model}, "
+                    f"sending prefix uncached: {e}"
+                )
+                with self._lock:
+                    self._creating.discard(key)
+                    if not transient:
+                        self._entries.pop(key, None)
+                        self._remember(self._unsupported, key, None, self.max_entries)
+                if not transient:
+                    cached = None
+            else:
+                with self._lock:
+                    self._creating.discard(key)
+                    self._remember(self._entries, key, (created, time.time() + self.ttl), self.max_entries)
+                logger.info(f"[LLM] Gemini context cache created for {model} ({len(system_instruction)} chars)")
+                cached = created
+        
+        if cached is None:
+            return genai.GenerativeModel(model, system_instruction=system_instruction)
+        # Passing the CachedContent itself (not its name) avoids a CachedContent.get per request
+        return genai.GenerativeModel.from_cached_content(cached_content=cached)
+
+
+_gemini_context_cache = GeminiContextCache(
+    ttl=float(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600")),
+    min_tokens=int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "1024")),
+    max_entries=int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "64")),
+)
+
+
+def _gemini_model(model: str, system_instruction: Optional[str], timeout: Optional[float] = None):
+    if os.getenv("GEMINI_CONTEXT_CACHE", "true").lower() == "true":
+        return _gemini_context_cache.get_model(model, system_instruction, timeout)
+    return _get_gemini_client().GenerativeModel(model, system_instruction=system_instruction)
+
+
+def _gemini_request_options(timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+    return {"timeout": timeout} if timeout else None
+
+
+def _call_gemini(messages, model, response_format, temperature, max_tokens, timeout=None):
+    system_instruction, full_prompt, generation_config = _gemini_request(messages, response_format, temperature, max_tokens)
+    gemini_model = _gemini_model(model, system_instruction, timeout)
+    response = gemini_model.generate_content(
+        full_prompt, generation_config=generation_config, request_options=_gemini_request_options(timeout)
+    )
+    _record_gemini_usage(model, getattr(response, "usage_metadata", None))
+    return _parse_content(response.text, response_format)
+
+
+async def _acall_gemini(messages, model, response_format, temperature, max_tokens, timeout=None):
+    system_instruction, full_prompt, generation_config = _gemini_request(messages, response_format, temperature, max_tokens)
+    # Creating a context cache is a blocking API call - keep it off the event loop
+    gemini_model = await asyncio.to_thread(_gemini_model, model, system_instruction, timeout)
+    response = await gemini_model.generate_content_async(
+        full_prompt, generation_config=generation_config, request_options=_gemini_request_options(timeout)
+    )
+    _record_gemini_usage(model, getattr(response, "usage_metadata", None))
+    return _parse_content(response.text, response_format)
+
+
+def _parse_content(content: str, response_format: Optional[BaseModel]) -> Any:
+    """Validate JSON content into response_format, or return the raw text"""
+    if response_format:
+        try:
+            # Models without a JSON mode may wrap the object in fences, reasoning or prose
+            json_data = json.loads(extract_json_object(content) or content)
+            result = response_format.model_validate(json_data)
+            logger.info(f"[LLM] Response received (structured format)")
+            return result
+        except (json.JSONDecodeError, Exception) as e:
+            logger.error(f"[LLM] Failed to parse structured response: {e}")
+            raise
+    else:
+        logger.info(f"[LLM] Response received: {len(content)} characters")
+        return content
+
+
+# --- OpenRouter / OpenAI ---------------------------------------------------------
+
+def _timeout_kwargs(timeout: Optional[float]) -> Dict[str, Any]:
+    # timeout=None would disable the client's default timeout - only pass a real one
+    return {"timeout": timeout} if timeout else {}
+
+
+def _call_openrouter(messages, model, response_format, temperature, max_tokens, timeout=None):
+    client = _get_openrouter_client()
+    
+    if response_format:
+        response = client.chat.completions.create(
+            model=model,
+            messages=_messages_with_schema(messages, response_format),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_model=response_format,
+            **_timeout_kwargs(timeout)
+        )
+        # instructor keeps the raw completion on the parsed model
+        raw = getattr(response, "_raw_response", None)
+        _record_openai_usage("openrouter", model, getattr(raw, "usage", None))
+        logger.info(f"[LLM] Response received (structured format via instructor)")
+        return response
+    else:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **_timeout_kwargs(timeout)
+        )
+        _record_openai_usage("openrouter", model, response.usage)
+        return _parse_content(response.choices[0].message.content, None)
+
+
+async def _acall_openrouter(messages, model, response_format, temperature, max_tokens, timeout=None):
+    client = _get_async_openrouter_client()
+    
+    if response_format:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=_messages_with_schema(messages, response_format),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_model=response_format,
+            **_timeout_kwargs(timeout)
+        )
+        raw = getattr(response, "_raw_response", None)
+        _record_openai_usage("openrouter", model, getattr(raw, "usage", None))
+        logger.info(f"[LLM] Response received (structured format via instructor)")
+        return response
+    else:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **_timeout_kwargs(timeout)
+        )
+        _record_openai_usage("openrouter", model, response.usage)
+        return _parse_content(response.choices[0].message.content, None)
+
+
+def _openai_request(messages, model, response_format, temperature, max_tokens) -> Dict[str, Any]:
+    """chat.completions.create kwargs for the OpenAI client (JSON mode for structured output)"""
+    if response_format:
+        return {
+            "model": model,
+            "messages": _messages_with_schema(messages, response_format),
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "response_format": {"type": "json_object"},
+        }
+    return {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+
+
+def _call_openai(messages, model, response_format, temperature, max_tokens, timeout=None):
+    client = _get_openai_client()
+    response = client.chat.completions.create(
+        **_openai_request(messages, model, response_format, temperature, max_tokens), **_timeout_kwargs(timeout)
+    )
+    _record_openai_usage("openai", model, response.usage)
+    return _parse_content(response.choices[0].message.content, response_format)
+
+
+async def _acall_openai(messages, model, response_format, temperature, max_tokens, timeout=None):
+    client = _get_async_openai_client()
+    response = await client.chat.completions.create(
+        **_openai_request(messages, model, response_format, temperature, max_tokens), **_timeout_kwargs(timeout)
+    )
+    _record_openai_usage("openai", model, response.usage)
+    return _parse_content(response.choices[0].message.content, response_format)
+
+
+# Provider name -> call implementation. Unknown providers use the OpenAI client.
+_PROVIDER_CALLS = {
+    "gemini": _call_gemini,
+    "openrouter": _call_openrouter,
+    "openai": _call_openai,
+}
+
+_ASYNC_PROVIDER_CALLS = {
+    "gemini": _acall_gemini,
+    "openrouter": _acall_openrouter,
+    "openai": _acall_openai,
+}
+
+# HTTP statuses (besides 5xx) that say the provider, not the request, is in trouble
+_TRANSIENT_STATUSES = {408, 409, 429}
+
+
+def _counts_against_circuit(error: BaseException) -> bool:
+    """
+    Transport errors, timeouts, 429 and 5xx count against a provider's health. A rejected
+    request (unknown model, bad parameters, auth) or an unusable response (validation)
+    doesn't - it says nothing about whether the provider can serve other requests.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, DeadlineExceededError):
+            return False  # The turn ran out of time, not the provider
+        if isinstance(error, (TimeoutError, ConnectionError, APIConnectionError)):
+            return True
+        # openai errors carry status_code; google.api_core errors carry the HTTP status as code
+        status = getattr(error, "status_code", None)
+        if status is None and isinstance(getattr(error, "code", None), int):
+            status = error.code
+        if isinstance(status, int):
+            return status >= 500 or status in _TRANSIENT_STATUSES
+        # instructor and the SDKs may wrap the underlying error
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class ProviderHealth:
+    """
+    Rolling health of one provider/model pair: outcomes and latencies over a time
+    window, plus a circuit breaker. Only errors that say the provider is in trouble
+    are counted (see _counts_against_circuit).
+    
+    closed    -> requests flow; opens when the windowed error rate reaches
+                 error_threshold (with at least min_requests samples)
+    open      -> requests are skipped until open_seconds have passed
+    half_open -> one probe request is let through; success closes the
+                 circuit, failure re-opens it
+    """
+    
+    def __init__(self, provider: str, model: str, window_seconds: float = 60.0, error_threshold: float = 0.5,
+                 min_requests: int = 3, open_seconds: float = 30.0):
+        self.provider = provider
+        self.model = model
+        self.name = f"{provider}:{model}"
+        self.window_seconds = window_seconds
+        self.error_threshold = error_threshold
+        self.min_requests = min_requests
+        self.open_seconds = open_seconds
+        
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.total_requests = 0
+        self.total_failures = 0
+        self._outcomes = deque()  # (timestamp, ok, latency)
+        self._lock = threading.Lock()
+    
+    def _trim(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+    
+    def _open(self, now: float) -> None:
+        self.state = "open"
+        self.opened_at = now
+        self.times_opened += 1
+        logger.warning(f"[LLM] Circuit opened for {self.name} (error rate {self.error_rate():.0%})")
+    
+    def available(self, now: Optional[float] = None) -> bool:
+        """Would a request be let through right now? (does not reserve the half-open probe)"""
+        now = now or time.monotonic()
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                return now - self.opened_at >= self.open_seconds
+            return not self.probe_in_flight
+    
+    def acquire(self, now: Optional[float] = None) -> bool:
+        """Claim permission to send a request; in half-open state only one probe is allowed"""
+        now = now or time.monotonic()
+        with self._lock:
+            if self.state == "open" and now - self.opened_at >= self.open_seconds:
+                self.state = "half_open"
+                self.probe_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+    
+    def record(self, ok: bool, latency: float, now: Optional[float] = None) -> None:
+        now = now or time.monotonic()
+        LLM_ATTEMPTS.inc(provider=self.provider, outcome="ok" if ok else "error")
+        if ok:
+            LLM_ATTEMPT_SECONDS.observe(latency, provider=self.provider)
+        with self._lock:
+            self.total_requests += 1
+            if not ok:
+                self.total_failures += 1
+            self._outcomes.append((now, ok, latency))
+            self._trim(now)
+            
+            if self.state == "half_open":
+                self.probe_in_flight = False
+                if ok:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                    logger.info(f"[LLM] Circuit closed for {self.name}")
+                else:
+                    self._open(now)
+            elif self.state == "closed" and not ok:
+                if len(self._outcomes) >= self.min_requests and self.error_rate() >= self.error_threshold:
+                    self._open(now)
+    
+    def record_error(self, error: BaseException, latency: float) -> None:
+        """Record a failed attempt - against the circuit only if the error is the provider's fault"""
+        if _counts_against_circuit(error):
+            self.record(False, latency)
+        else:
+            self.release(outcome="client_error")
+    
+    def release(self, outcome: str = "cancelled") -> None:
+        """Give back a half-open probe that finished without saying anything about health (e.g. cancelled)"""
+        LLM_ATTEMPTS.inc(provider=self.provider, outcome=outcome)
+        with self._lock:
+            self.probe_in_flight = False
+    
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok, _ in self._outcomes if not ok) / len(self._outcomes)
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile of successful calls in the window"""
+        latencies = sorted(latency for _, ok, latency in self._outcomes if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile))]
+    
+    def score(self) -> float:
+        """Health score in (0, 1] - higher is healthier. Providers with no recent data score 1."""
+        p50 = self.latency_percentile(0.5)
+        latency_factor = 1.0 / (1.0 + p50 / 10.0) if p50 is not None else 1.0
+        return (1.0 - self.error_rate()) * latency_factor
+    
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            return {
+                "state": self.state,
+                "score": round(self.score(), 4),
+                "error_rate": round(self.error_rate(), 4),
+                "window_requests": len(self._outcomes),
+                "latency_p50": self.latency_percentile(0.5),
+                "latency_p95": self.latency_percentile(0.95),
+                "times_opened": self.times_opened,
+                "total_requests": self.total_requests,
+                "total_failures": self.total_failures,
+            }
+
+
+class ProviderHealthRegistry:
+    """
+    Process-wide health per (provider, model), used to order and skip providers.
+    Keyed by model too: one model failing (e.g. a fallback given a model name the
+    provider doesn't serve) must not take down the provider's other models.
+    """
+    
+    def __init__(self):
+        self._providers: Dict[Tuple[str, str], ProviderHealth] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, provider: str, model: str) -> ProviderHealth:
+        key = (provider, model)
+        with self._lock:
+            if key not in self._providers:
+                self._providers[key] = ProviderHealth(
+                    provider, model,
+                    window_seconds=float(os.getenv("LLM_CB_WINDOW_SECONDS", "60")),
+                    error_threshold=float(os.getenv("LLM_CB_ERROR_THRESHOLD", "0.5")),
+                    min_requests=int(os.getenv("LLM_CB_MIN_REQUESTS", "3")),
+                    open_seconds=float(os.getenv("LLM_CB_OPEN_SECONDS", "30")),
+                )
+            return self._providers[key]
+    
+    def order(self, providers: List[str], model: str) -> List[str]:
+        """
+        The primary (first) provider stays first while its circuit lets requests through;
+        the rest are ordered by health score. Providers with open circuits are skipped.
+        If every circuit is open, all providers are returned (healthiest first) and each
+        attempt fails fast with ProviderUnavailableError instead of waiting on a timeout.
+        """
+        now = time.monotonic()
+        primary, fallbacks = providers[0], providers[1:]
+        ranked_fallbacks = sorted(fallbacks, key=lambda p: -self.get(p, model).score())
+        available = [p for p in [primary] + ranked_fallbacks if self.get(p, model).available(now)]
+        if available:
+            return available
+        return sorted(providers, key=lambda p: -self.get(p, model).score())
+    
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """provider -> model -> health snapshot"""
+        with self._lock:
+            providers = list(self._providers.values())
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for health in providers:
+            result.setdefault(health.provider, {})[health.model] = health.snapshot()
+        return result
+
+
+provider_health = ProviderHealthRegistry()
+
+REGISTRY.gauge(
+    "kunani_llm_circuit_open", "1 while a provider/model circuit breaker is open or half-open",
+    lambda: {
+        (provider, model): int(h["state"] != "closed")
+        for provider, models in provider_health.snapshot().items() for model, h in models.items()
+    },
+    ["provider", "model"],
+)
+
+
+def get_provider_health_metrics() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Per provider and model: circuit state, error rate, latency percentiles and health score"""
+    return provider_health.snapshot()
+
+
+def get_hedge_delay(provider: str, model: str) -> float:
+    """
+    How long to wait on a provider before hedging: its observed p95 latency for the model
+    once there are at least 20 recent samples, otherwise LLM_HEDGE_DELAY_SECONDS (default 4s).
+    """
+    default_delay = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "4"))
+    health = provider_health.get(provider, model)
+    if health.snapshot()["window_requests"] < 20:
+        return default_delay
+    p95 = health.latency_percentile(0.95)
+    return p95 if p95 is not None else default_delay
+
+
+def _attempt_timeout(provider: str, model: str) -> float:
+    """
+    Timeout for the next attempt on provider: LLM_ATTEMPT_TIMEOUT_SECONDS (default 60),
+    cut down to what is left of the turn's deadline. Raises DeadlineExceededError when
+    less time is left than the provider plausibly needs - its recent p50 latency, and at
+    least LLM_MIN_ATTEMPT_SECONDS (default 1) - so it isn't started only to be abandoned.
+    """
+    timeout = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "60"))
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    p50 = provider_health.get(provider, model).snapshot()["latency_p50"]
+    needed = max(float(os.getenv("LLM_MIN_ATTEMPT_SECONDS", "1")), p50 or 0.0)
+    if remaining < needed:
+        LLM_ATTEMPTS.inc(provider=provider, outcome="deadline_skipped")
+        raise DeadlineExceededError(f"{max(remaining, 0.0):.1f}s left of the turn deadline, {provider} needs ~{needed:.1f}s")
+    return min(timeout, remaining)
+
+
+def _attempt_timeout_error(provider: str, timeout: float) -> TimeoutError:
+    """DeadlineExceededError if the turn's deadline is what ran out, otherwise a plain timeout"""
+    remaining = remaining_time()
+    error = DeadlineExceededError if remaining is not None and remaining <= 0 else asyncio.TimeoutError
+    return error(f"No response from {provider} within {timeout:.1f}s")
+
+
+def _resolve_provider_and_model(model: Optional[str], provider: Optional[str]) -> Tuple[str, str]:
+    """Apply defaults: infer provider from the model name, default model per provider"""
+    if provider is None:
+        # Infer provider from model name if possible
+        if model and model.startswith("gemini"):
+            provider = "gemini"
+        elif model and "/" in model:  # OpenRouter format: "provider/model"
+            provider = "openrouter"
+        else:
+            provider = "openai"  # Default
+    
+    if model is None:
+        if provider == "gemini":
+            model = "gemini-pro"
+        else:
+            model = "gpt-4o-mini"  # Default OpenAI model
+    
+    return provider, model
+
+
+def _cache_lookup(provider, model, temperature, max_tokens, messages, response_format, cache):
+    """-> (response_cache or None, cache_key, cached result or None)"""
+    response_cache = get_llm_cache() if should_use_cache(temperature, cache) else None
+    if response_cache is None:
+        return None, None, None
+    
+    cache_key = make_cache_key(provider, model, temperature, max_tokens, messages, response_format)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        try:
+            result = decode_cached_response(cached, response_format)
+            logger.info(f"[LLM] Cache hit for {model} via {provider}")
+            LLM_CALLS.inc(outcome="cache_hit")
+            return response_cache, cache_key, result
+        except Exception as e:
+            # Stale entry (e.g. the schema changed) - drop it and call the provider
+            logger.warning(f"[LLM] Discarding cached response that failed validation: {e}")
+            response_cache.delete(cache_key)
+    return response_cache, cache_key, None
+
+
+def _providers_to_try(provider: str, model: str, fallback_providers: Optional[List[str]]) -> List[str]:
+    # Fallback providers: try in order if primary fails
+    if fallback_providers is None:
+        fallback_providers = ["openrouter", "openai", "gemini"]
+    providers = [provider] + [p for p in fallback_providers if p != provider]
+    # Skip providers with open circuits and try the healthiest fallbacks first
+    ordered = provider_health.order(providers, model)
+    if ordered != providers:
+        logger.info(f"[LLM] Provider order adjusted by health: {ordered}")
+    return ordered
+
+
+def _retry_cause(error: Optional[BaseException]) -> Optional[str]:
+    """Why the previous provider was given up on, for the next attempt's span"""
+    return f"{type(error).__name__}: {error}"[:200] if error is not None else None
+
+
+@traced("llm.call", kind="llm")
 def call_llm_api(
     messages: List[Dict[str, str]],
     model: Optional[str] = None,
@@ -70,7 +873,8 @@ def call_llm_api(
     response_format: Optional[BaseModel] = None,
     temperature: float = 0.3,
     max_tokens: int = 2000,
-    fallback_providers: Optional[List[str]] = None
+    fallback_providers: Optional[List[str]] = None,
+    cache: Optional[bool] = None
 ) -> Any:
     """
     Make a call to LLM API with structured outputs support.
@@ -87,153 +891,51 @@ def call_llm_api(
         response_format: Optional Pydantic model for structured output
         temperature: Temperature for response generation
         max_tokens: Maximum tokens in response
+        cache: Use the response cache (see llm_cache). Default (None) caches only
+            when temperature is 0; pass True to opt in at higher temperatures, False to bypass.
     
     Returns:
         If response_format provided: Pydantic model instance
         Otherwise: String content
     """
-    # Set defaults
-    if provider is None:
-        # Infer provider from model name if possible
-        if model and model.startswith("gemini"):
-            provider = "gemini"
-        elif model and "/" in model:  # OpenRouter format: "provider/model"
-            provider = "openrouter"
-        else:
-            provider = "openai"  # Default
+    provider, model = _resolve_provider_and_model(model, provider)
+    set_span_attributes(provider=provider, model=model)
     
-    if model is None:
-        if provider == "gemini":
-            model = "gemini-pro"
-        else:
-            model = "gpt-4o-mini"  # Default OpenAI model
+    # Response cache - keyed on the request, whichever provider ends up serving it
+    response_cache, cache_key, cached_result = _cache_lookup(
+        provider, model, temperature, max_tokens, messages, response_format, cache
+    )
+    if cached_result is not None:
+        set_span_attributes(cache_hit=True)
+        return cached_result
     
-    # Fallback providers: try in order if primary fails
-    if fallback_providers is None:
-        fallback_providers = ["openrouter", "openai", "gemini"]
-    
-    providers_to_try = [provider] + [p for p in fallback_providers if p != provider]
+    providers_to_try = _providers_to_try(provider, model, fallback_providers)
     
     last_error = None
-    for attempt_provider in providers_to_try:
+    for fallback_index, attempt_provider in enumerate(providers_to_try):
         try:
             logger.info(f"[LLM] Calling {model} with {len(messages)} message(s) via {attempt_provider}")
             
-            if attempt_provider == "gemini":
-            import google.generativeai as genai
-            import json
-            
-            gemini_client = _get_gemini_client()
-            gemini_model = gemini_client.GenerativeModel(model)
-            
-            prompt_parts = []
-            for msg in messages:
-                if msg["role"] == "system":
-                    prompt_parts.append(f"System: {msg['content']}")
-                elif msg["role"] == "user":
-                    prompt_parts.append(f"User: {msg['content']}")
-                elif msg["role"] == "assistant":
-                    prompt_parts.append(f"Assistant: {msg['content']}")
-            
-            full_prompt = "\n".join(prompt_parts)
-            generation_config = {
-                "temperature": temperature,
-                "max_output_tokens": max_tokens,
-            }
-            
-            if response_format:
-                schema_instruction = f"\n\nRespond in valid JSON matching this schema: {response_format.model_json_schema()}"
-                full_prompt += schema_instruction
-                generation_config["response_mime_type"] = "application/json"
-            
-            response = gemini_model.generate_content(full_prompt, generation_config=generation_config)
-            content = response.text
-            
-            if response_format:
+            with span("llm.attempt", kind="llm", provider=attempt_provider, model=model,
+                      fallback_index=fallback_index, retry_cause=_retry_cause(last_error)):
+                timeout = _attempt_timeout(attempt_provider, model)
+                set_span_attributes(timeout_s=round(timeout, 2))
+                health = provider_health.get(attempt_provider, model)
+                if not health.acquire():
+                    raise ProviderUnavailableError(f"Circuit open for {attempt_provider}")
+                start = time.monotonic()
                 try:
-                    json_data = json.loads(content)
-                    result = response_format.model_validate(json_data)
-                    logger.info(f"[LLM] Response received (structured format)")
-                    return result
-                except (json.JSONDecodeError, Exception) as e:
-                    logger.error(f"[LLM] Failed to parse structured response: {e}")
+                    provider_call = _PROVIDER_CALLS.get(attempt_provider, _call_openai)
+                    result = provider_call(messages, model, response_format, temperature, max_tokens, timeout)
+                except Exception as e:
+                    health.record_error(e, time.monotonic() - start)
                     raise
-            else:
-                logger.info(f"[LLM] Response received: {len(content)} characters")
-                return content
-        
-            if attempt_provider == "openrouter":
-            client = _get_openrouter_client()
-            
-            if response_format:
-                schema_instruction = f"\n\nRespond in valid JSON matching this schema: {response_format.model_json_schema()}"
-                messages_with_schema = messages.copy()
-                if messages_with_schema and messages_with_schema[0].get("role") == "system":
-                    messages_with_schema[0]["content"] += schema_instruction
-                else:
-                    messages_with_schema.insert(0, {"role": "system", "content": schema_instruction})
-                
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=messages_with_schema,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    response_model=response_format
-                )
-                logger.info(f"[LLM] Response received (structured format via instructor)")
-                return response
-            else:
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                content = response.choices[0].message.content
-                logger.info(f"[LLM] Response received: {len(content)} characters")
-                return content
-            else:
-                client = _get_openai_client()
-                
-                if response_format:
-                    schema_instruction = f"\n\nRespond in valid JSON matching this schema: {response_format.model_json_schema()}"
-                    messages_with_schema = messages.copy()
-                    if messages_with_schema and messages_with_schema[0].get("role") == "system":
-                        messages_with_schema[0]["content"] += schema_instruction
-                    else:
-                        messages_with_schema.insert(0, {"role": "system", "content": schema_instruction})
-                    
-                    response = client.chat.completions.create(
-                        model=model,
-                        messages=messages_with_schema,
-                        temperature=temperature,
-                        max_tokens=max_tokens,
-                        response_format={"type": "json_object"}
-                    )
-                    
-                    content = response.choices[0].message.content
-                    
-                    try:
-                        json_data = json.loads(content)
-                        result = response_format.model_validate(json_data)
-                        logger.info(f"[LLM] Response received (structured format)")
-                        return result
-                    except (json.JSONDecodeError, Exception) as e:
-                        logger.error(f"[LLM] Failed to parse structured response: {e}")
-                        raise
-                else:
-                    response = client.chat.completions.create(
-                        model=model,
-                        messages=messages,
-                        temperature=temperature,
-                        max_tokens=max_tokens
-                    )
-                    content = response.choices[0].message.content
-                    logger.info(f"[LLM] Response received: {len(content)} characters")
-                    return content
+                health.record(True, time.monotonic() - start)
             
-            # If we get here, the call was successful
-            break
+            LLM_CALLS.inc(outcome="fallback" if fallback_index else "ok")
+            if response_cache is not None:
+                response_cache.set(cache_key, encode_cached_response(result))
+            return result
             
         except Exception as e:
             last_error = e
@@ -241,8 +943,470 @@ def call_llm_api(
             if attempt_provider == providers_to_try[-1]:
                 # Last provider failed, raise the error
                 logger.error(f"[LLM] All providers failed. Last error: {e}", exc_info=True)
+                LLM_CALLS.inc(outcome="error")
                 raise
     
     # Should never reach here, but just in case
     if last_error:
         raise last_error
+
+
+async def _acall_provider(attempt_provider, messages, model, response_format, temperature, max_tokens,
+                          fallback_index: int = 0, retry_cause: Optional[str] = None, hedged: bool = False):
+    with span("llm.attempt", kind="llm", provider=attempt_provider, model=model,
+              fallback_index=fallback_index, retry_cause=retry_cause, hedged=hedged):
+        timeout = _attempt_timeout(attempt_provider, model)
+        set_span_attributes(timeout_s=round(timeout, 2))
+        health = provider_health.get(attempt_provider, model)
+        if not health.acquire():
+            raise ProviderUnavailableError(f"Circuit open for {attempt_provider}")
+        logger.info(f"[LLM] Calling {model} with {len(messages)} message(s) via {attempt_provider}")
+        start = time.monotonic()
+        provider_call = _ASYNC_PROVIDER_CALLS.get(attempt_provider, _acall_openai)
+        try:
+            # The client timeout bounds each network read; wait_for bounds the whole attempt
+            result = await asyncio.wait_for(
+                provider_call(messages, model, response_format, temperature, max_tokens, timeout), timeout
+            )
+        except asyncio.TimeoutError:
+            error = _attempt_timeout_error(attempt_provider, timeout)
+            health.record_error(error, time.monotonic() - start)
+            raise error from None
+        except asyncio.CancelledError:
+            # Lost a hedge race - says nothing about the provider's health
+            health.release()
+            raise
+        except Exception as e:
+            health.record_error(e, time.monotonic() - start)
+            raise
+        health.record(True, time.monotonic() - start)
+        return result
+
+
+async def _acall_hedged(providers_to_try, hedge_delay, messages, model, response_format, temperature, max_tokens):
+    """
+    Start the primary provider; if it hasn't answered after hedge_delay (or fails),
+    start the next one too. The first valid response wins and the others are cancelled.
+    """
+    tasks: Dict[asyncio.Task, str] = {}
+    next_index = 0
+    last_error = None
+    
+    def launch_next():
+        nonlocal next_index
+        attempt_provider = providers_to_try[next_index]
+        next_index += 1
+        # The task inherits the current span, so attempts nest under the call
+        task = asyncio.create_task(_acall_provider(
+            attempt_provider, messages, model, response_format, temperature, max_tokens,
+            fallback_index=next_index - 1, retry_cause=_retry_cause(last_error), hedged=next_index > 1,
+        ))
+        tasks[task] = attempt_provider
+    
+    launch_next()
+    try:
+        while tasks:
+            delay = None
+            if next_index < len(providers_to_try):
+                delay = hedge_delay if hedge_delay is not None else get_hedge_delay(providers_to_try[next_index - 1], model)
+            done, _ = await asyncio.wait(tasks.keys(), timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            
+            if not done:
+                logger.info(f"[LLM] No response after {delay:.2f}s, hedging with {providers_to_try[next_index]}")
+                launch_next()
+                continue
+            
+            for task in done:
+                attempt_provider = tasks.pop(task)
+                if task.exception() is None:
+                    logger.info(f"[LLM] Hedged call won by {attempt_provider}")
+                    set_span_attributes(served_by=attempt_provider)
+                    LLM_CALLS.inc(outcome="ok" if attempt_provider == providers_to_try[0] else "fallback")
+                    return task.result()
+                last_error = task.exception()
+                logger.warning(f"[LLM] Provider {attempt_provider} failed: {last_error}. Trying fallback...")
+                # Don't wait out the hedge delay after a failure
+                if next_index < len(providers_to_try):
+                    launch_next()
+    finally:
+        for task in tasks:
+            task.cancel()
+    
+    logger.error(f"[LLM] All providers failed. Last error: {last_error}")
+    LLM_CALLS.inc(outcome="error")
+    raise last_error
+
+
+@traced("llm.call", kind="llm")
+async def acall_llm_api(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    provider: Optional[str] = None,
+    response_format: Optional[BaseModel] = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    fallback_providers: Optional[List[str]] = None,
+    cache: Optional[bool] = None,
+    hedge: Optional[bool] = None,
+    hedge_delay: Optional[float] = None
+) -> Any:
+    """
+    Async version of call_llm_api, built on the async OpenAI/Gemini clients.
+    
+    Args:
+        Same as call_llm_api, plus:
+        hedge: Race the fallback providers instead of trying them one after another.
+            Default: LLM_HEDGE_ENABLED env var (false).
+        hedge_delay: Seconds to wait on a provider before starting the next one.
+            Default: the provider's observed p95 latency (see get_hedge_delay).
+    
+    Returns:
+        If response_format provided: Pydantic model instance
+        Otherwise: String content
+    """
+    provider, model = _resolve_provider_and_model(model, provider)
+    set_span_attributes(provider=provider, model=model)
+    
+    response_cache, cache_key, cached_result = _cache_lookup(
+        provider, model, temperature, max_tokens, messages, response_format, cache
+    )
+    if cached_result is not None:
+        set_span_attributes(cache_hit=True)
+        return cached_result
+    
+    if hedge is None:
+        hedge = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    
+    providers_to_try = _providers_to_try(provider, model, fallback_providers)
+    
+    if hedge and len(providers_to_try) > 1:
+        result = await _acall_hedged(
+            providers_to_try, hedge_delay, messages, model, response_format, temperature, max_tokens
+        )
+    else:
+        result = None
+        last_error = None
+        for fallback_index, attempt_provider in enumerate(providers_to_try):
+            try:
+                result = await _acall_provider(
+                    attempt_provider, messages, model, response_format, temperature, max_tokens,
+                    fallback_index=fallback_index, retry_cause=_retry_cause(last_error),
+                )
+                LLM_CALLS.inc(outcome="fallback" if fallback_index else "ok")
+                break
+            except Exception as e:
+                last_error = e
+                logger.warning(f"[LLM] Provider {attempt_provider} failed: {e}. Trying fallback...")
+                if attempt_provider == providers_to_try[-1]:
+                    logger.error(f"[LLM] All providers failed. Last error: {e}", exc_info=True)
+                    LLM_CALLS.inc(outcome="error")
+                    raise
+    
+    if response_cache is not None:
+        response_cache.set(cache_key, encode_cached_response(result))
+    return result
+
+
+def _json_closing_suffix(text: str) -> str:
+    """Characters needed to close the strings/objects/arrays left open in a JSON prefix"""
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    suffix = ""
+    if in_string:
+        # A dangling escape can't be closed - drop it by closing before it
+        suffix = '"' if not escaped else '\\"'
+    return suffix + "".join(reversed(stack))
+
+
+# Reasoning models on OpenRouter may inline their reasoning before the answer
+_THINK_BLOCK = re.compile(r"<think>.*?(</think>|$)", re.S)
+
+
+def _json_object_end(text: str, start: int) -> Optional[int]:
+    """Index just past the object opened at text[start] ("{"), or None if it isn't closed yet"""
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return None
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """
+    The first complete JSON object in model output, ignoring reasoning blocks, code
+    fences and any text around it. None if there is no complete object.
+    """
+    text = _THINK_BLOCK.sub("", text)
+    start = text.find("{")
+    while start >= 0:
+        end = _json_object_end(text, start)
+        if end is None:
+            return None
+        candidate = text[start:end]
+        try:
+            json.loads(candidate)
+            return candidate
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+    return None
+
+
+def parse_partial_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Best-effort parse of an incomplete JSON object, e.g. a streamed response so far.
+    Open strings and containers are closed; a trailing incomplete key or value is dropped.
+    Reasoning blocks and text after a complete object (e.g. a closing code fence) are ignored.
+    Returns None if nothing usable has arrived yet.
+    """
+    complete = extract_json_object(text)
+    if complete is not None:
+        parsed = json.loads(complete)
+        return parsed if isinstance(parsed, dict) else None
+    text = _THINK_BLOCK.sub("", text)
+    start = text.find("{")
+    if start < 0:
+        return None
+    candidate = text[start:].rstrip()
+    for _ in range(16):
+        try:
+            parsed = json.loads(candidate + _json_closing_suffix(candidate))
+            return parsed if isinstance(parsed, dict) else None
+        except json.JSONDecodeError:
+            # Cut back to the last separator/opening and retry
+            cut = max(candidate.rfind(","), candidate.rfind("{"), candidate.rfind("["))
+            if cut < 0:
+                return None
+            candidate = candidate[:cut] if candidate[cut] == "," else candidate[:cut + 1]
+    return None
+
+
+def _partial_model(response_format: BaseModel, data: Dict[str, Any]) -> BaseModel:
+    """Build a (possibly incomplete) model instance from partial data without failing validation"""
+    try:
+        return response_format.model_validate(data)
+    except Exception:
+        return response_format.model_construct(**{k: v for k, v in data.items() if k in response_format.model_fields})
+
+
+async def _astream_text(attempt_provider, messages, model, response_format, temperature, max_tokens,
+                        timeout=None) -> AsyncIterator[str]:
+    """Raw text chunks from a provider's streaming API"""
+    if attempt_provider == "gemini":
+        system_instruction, full_prompt, generation_config = _gemini_request(messages, response_format, temperature, max_tokens)
+        gemini_model = await asyncio.to_thread(_gemini_model, model, system_instruction, timeout)
+        response = await gemini_model.generate_content_async(
+            full_prompt, generation_config=generation_config, stream=True,
+            request_options=_gemini_request_options(timeout),
+        )
+        usage_metadata = None
+        async for chunk in response:
+            usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+            if chunk.text:
+                yield chunk.text
+        _record_gemini_usage(model, usage_metadata)
+        return
+    
+    if attempt_provider == "openrouter":
+        # The instructor patch passes through untouched when no response_model is given
+        client = _get_async_openrouter_client()
+        request = {
+            "model": model,
+            "messages": _messages_with_schema(messages, response_format) if response_format else messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+    else:
+        client = _get_async_openai_client()
+        request = _openai_request(messages, model, response_format, temperature, max_tokens)
+    
+    # include_usage adds a final chunk with token usage (incl. cached prompt tokens)
+    stream = await client.chat.completions.create(
+        stream=True, stream_options={"include_usage": True}, **request, **_timeout_kwargs(timeout)
+    )
+    usage = None
+    async for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+    _record_openai_usage(attempt_provider, model, usage)
+
+
+async def _bounded_stream(chunks: AsyncIterator[str], attempt_provider: str, timeout: float) -> AsyncIterator[str]:
+    """The chunks of one streaming attempt, with the whole attempt (not just each read) bounded by timeout"""
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - time.monotonic()))
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise _attempt_timeout_error(attempt_provider, timeout) from None
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+
+@traced("llm.call", kind="llm")
+async def astream_llm_api(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    provider: Optional[str] = None,
+    response_format: Optional[BaseModel] = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    fallback_providers: Optional[List[str]] = None,
+    cache: Optional[bool] = None
+) -> AsyncIterator[Any]:
+    """
+    Streaming version of acall_llm_api.
+    
+    Yields:
+        With response_format: partial model instances as fields arrive (fields not yet
+        received are missing/None); the last item is the fully validated model.
+        Otherwise: text chunks.
+    
+    Fallback providers are only tried if a provider fails before producing any output.
+    """
+    provider, model = _resolve_provider_and_model(model, provider)
+    set_span_attributes(provider=provider, model=model, stream=True)
+    
+    response_cache, cache_key, cached_result = _cache_lookup(
+        provider, model, temperature, max_tokens, messages, response_format, cache
+    )
+    if cached_result is not None:
+        set_span_attributes(cache_hit=True)
+        yield cached_result
+        return
+    
+    providers_to_try = _providers_to_try(provider, model, fallback_providers)
+    
+    last_error = None
+    for fallback_index, attempt_provider in enumerate(providers_to_try):
+        try:
+            timeout = _attempt_timeout(attempt_provider, model)
+        except DeadlineExceededError as e:
+            logger.warning(f"[LLM] Skipping {attempt_provider}: {e}")
+            last_error = e
+            continue
+        health = provider_health.get(attempt_provider, model)
+        if not health.acquire():
+            logger.warning(f"[LLM] Circuit open for {attempt_provider}, skipping")
+            last_error = ProviderUnavailableError(f"Circuit open for {attempt_provider}")
+            continue
+        
+        logger.info(f"[LLM] Streaming {model} with {len(messages)} message(s) via {attempt_provider}")
+        start = time.monotonic()
+        buffer = ""
+        last_partial = None
+        recorded = False
+        try:
+            with span("llm.attempt", kind="llm", provider=attempt_provider, model=model,
+                      fallback_index=fallback_index, retry_cause=_retry_cause(last_error),
+                      timeout_s=round(timeout, 2)) as attempt_span:
+                chunks = _astream_text(
+                    attempt_provider, messages, model, response_format, temperature, max_tokens, timeout
+                )
+                async for text in _bounded_stream(chunks, attempt_provider, timeout):
+                    if not buffer and attempt_span:
+                        attempt_span.set(first_token_ms=round((time.monotonic() - start) * 1000, 1))
+                    buffer += text
+                    if response_format is None:
+                        yield text
+                        continue
+                    partial = parse_partial_json(buffer)
+                    if partial is not None and partial != last_partial:
+                        last_partial = partial
+                        yield _partial_model(response_format, partial)
+                
+                result = _parse_content(buffer, response_format)
+            health.record(True, time.monotonic() - start)
+            recorded = True
+        except Exception as e:
+            health.record_error(e, time.monotonic() - start)
+            recorded = True
+            if buffer or attempt_provider == providers_to_try[-1]:
+                # Output already reached the caller (or nothing left to try) - can't transparently retry
+                logger.error(f"[LLM] Streaming failed via {attempt_provider}: {e}", exc_info=True)
+                LLM_CALLS.inc(outcome="error")
+                raise
+            logger.warning(f"[LLM] Provider {attempt_provider} failed: {e}. Trying fallback...")
+            last_error = e
+            continue
+        finally:
+            # Cancelled, or closed while suspended at a yield (GeneratorExit when the consumer
+            # stops reading) - give a half-open probe back so the circuit isn't stuck
+            if not recorded:
+                health.release()
+        
+        LLM_CALLS.inc(outcome="fallback" if fallback_index else "ok")
+        if response_cache is not None:
+            response_cache.set(cache_key, encode_cached_response(result))
+        if response_format is not None:
+            yield result
+        return
+    
+    LLM_CALLS.inc(outcome="error")
+    if isinstance(last_error, DeadlineExceededError):
+        raise last_error
+    raise ProviderUnavailableError(f"No provider available for {model} (tried {providers_to_try})")
+
+
+async def astream_llm_field(
+    messages: List[Dict[str, str]],
+    on_delta: Callable[[str], Any],
+    field: str = "message_to_user",
+    emit_when: Optional[Callable[[BaseModel], bool]] = None,
+    **kwargs
+) -> BaseModel:
+    """
+    Stream a structured response, calling on_delta with each new piece of one text
+    field (by default message_to_user) as it is generated. Returns the validated model.
+    emit_when can hold text back until the partial response shows it will be kept
+    (e.g. only once the handoff agent is known).
+    kwargs are passed to astream_llm_api and must include response_format.
+    """
+    emitted = ""
+    result = None
+    # aclosing: if on_delta raises (or the turn is cancelled), the stream is closed right away
+    async with aclosing(astream_llm_api(messages, **kwargs)) as partials:
+        async for partial in partials:
+            result = partial
+            if emit_when is not None and not emit_when(partial):
+                continue
+            text = getattr(partial, field, None)
+            if isinstance(text, str) and text.startswith(emitted) and len(text) > len(emitted):
+                on_delta(text[len(emitted):])
+                emitted = text
+    return result
@@ -0,0 +1,341 @@
+"""
+Response cache for call_llm_api.
+Identical requests (provider, model, sampling params, normalized messages and
+response schema) are answered from an in-memory LRU or an on-disk SQLite cache.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import logging
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class LLMCache(ABC):
+    """
+    Base class for response cache backends. Values are JSON strings.
+    get/set hold the backend's lock around _get/_set, so the hit/miss/eviction
+    counters are updated under the same lock as the entries.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._set(key, value)
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        """Look up key (called with self._lock held)"""
+
+    @abstractmethod
+    def _set(self, key: str, value: str) -> None:
+        """Store value (called with self._lock held)"""
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        lookups = hits + misses
+        return {
+            "backend": type(self).__name__,
+            "entries": len(self),
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+class InMemoryLLMCache(LLMCache):
+    """Process-local LRU cache with optional TTL"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1000):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, created_at)
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, created_at = entry
+        if self._expired(created_at, time.time()):
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: str) -> None:
+        self._entries[key] = (value, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteLLMCache(LLMCache):
+    """
+    On-disk cache shared across restarts (and processes on the same host).
+    Hits don't write: accessed_at updates are buffered and flushed in one transaction
+    every touch_batch hits (or touch_interval seconds). The size is checked every
+    max_entries/20 sets and, when over the limit, trimmed to 90% - so the table may
+    briefly exceed max_entries by a few percent.
+    """
+
+    def __init__(self, path: str = "cache/llm_cache.sqlite", ttl: Optional[float] = None,
+                 max_entries: int = 10000, touch_batch: int = 256, touch_interval: float = 10.0):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self.touch_batch = touch_batch
+        self.touch_interval = touch_interval
+        self._touched: Dict[str, float] = {}  # key -> accessed_at not yet written
+        self._last_flush = time.time()
+        self._trim_every = max(1, max_entries // 20)
+        self._sets_since_trim = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache(accessed_at)")
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if self._expired(created_at, now):
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._touched.pop(key, None)
+            self.evictions += 1
+            return None
+        self._touched[key] = now
+        if len(self._touched) >= self.touch_batch or now - self._last_flush >= self.touch_interval:
+            self._flush_touched()
+        return value
+
+    def _flush_touched(self) -> None:
+        """Write buffered accessed_at updates in one transaction"""
+        self._last_flush = time.time()
+        if not self._touched:
+            return
+        touched = [(accessed_at, key) for key, accessed_at in self._touched.items()]
+        self._touched.clear()
+        # The connection is in autocommit mode - without BEGIN every row would be its own transaction
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", touched)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _set(self, key: str, value: str) -> None:
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, now, now)
+        )
+        self._touched.pop(key, None)
+        self._sets_since_trim += 1
+        if self._sets_since_trim >= self._trim_every:
+            self._sets_since_trim = 0
+            self._trim()
+
+    def _trim(self) -> None:
+        """Evict least recently used rows down to 90% of max_entries, if over the limit"""
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Recency must be current before picking victims
+        self._flush_touched()
+        cursor = self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+            (count - int(self.max_entries * 0.9),)
+        )
+        self.evictions += max(cursor.rowcount, 0)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._touched.pop(key, None)
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+def _normalize_content(content: Any) -> Any:
+    """Collapse whitespace so trivially different prompts share an entry"""
+    if isinstance(content, str):
+        return _WHITESPACE_RE.sub(" ", content).strip()
+    return content
+
+
+@lru_cache(maxsize=None)
+def _schema_for_key(response_format: type) -> Dict[str, Any]:
+    return response_format.model_json_schema()
+
+
+def make_cache_key(provider: str, model: str, temperature: float, max_tokens: int,
+                   messages: List[Dict[str, Any]], response_format: Optional[type] = None) -> str:
+    """Stable hash of everything that determines the response"""
+    payload = {
+        "provider": provider,
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "messages": [
+            {"role": msg.get("role"), "content": _normalize_content(msg.get("content"))}
+            for msg in messages
+        ],
+        "schema": _schema_for_key(response_format) if response_format else None,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def encode_cached_response(result: Any) -> str:
+    if isinstance(result, BaseModel):
+        return json.dumps({"type": "structured", "data": result.model_dump(mode="json")})
+    return json.dumps({"type": "text", "data": result})
+
+
+def decode_cached_response(value: str, response_format: Optional[type] = None) -> Any:
+    """Rebuild a cached response - structured results are revalidated into the Pydantic model"""
+    entry = json.loads(value)
+    if response_format is not None:
+        if entry["type"] != "structured":
+            raise ValueError("Cached response is not structured")
+        return response_format.model_validate(entry["data"])
+    return entry["data"]
+
+
+def should_use_cache(temperature: float, cache: Optional[bool]) -> bool:
+    """
+    Explicit True/False wins. Otherwise only deterministic (temperature 0) calls are
+    cached, unless LLM_CACHE_NONZERO_TEMPERATURE=true.
+    """
+    if cache is not None:
+        return cache
+    if temperature <= 0:
+        return True
+    return os.getenv("LLM_CACHE_NONZERO_TEMPERATURE", "false").lower() == "true"
+
+
+_cache: Optional[LLMCache] = None
+_cache_configured = False
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Get the process-wide response cache, configured from the environment:
+        LLM_CACHE_BACKEND: "memory" (default), "sqlite" or "none"
+        LLM_CACHE_TTL: seconds (default 3600, 0 = no expiry)
+        LLM_CACHE_MAX_ENTRIES: size limit before LRU eviction
+        LLM_CACHE_PATH: SQLite file (default cache/llm_cache.sqlite)
+    """
+    global _cache, _cache_configured
+    if not _cache_configured:
+        with _cache_lock:
+            if not _cache_configured:
+                backend = os.getenv("LLM_CACHE_BACKEND", "memory").lower()
+                ttl = float(os.getenv("LLM_CACHE_TTL", "3600")) or None
+                if backend == "memory":
+                    _cache = InMemoryLLMCache(ttl=ttl, max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")))
+                elif backend == "sqlite":
+                    _cache = SQLiteLLMCache(
+                        path=os.getenv("LLM_CACHE_PATH", "cache/llm_cache.sqlite"),
+                        ttl=ttl,
+                        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")),
+                    )
+                elif backend != "none":
+                    logger.warning(f"Unknown LLM_CACHE_BACKEND '{backend}', response cache disabled")
+                _cache_configured = True
+    return _cache
+
+
+def set_llm_cache(cache: Optional[LLMCache]) -> None:
+    """Replace the process-wide cache (None disables caching)"""
+    global _cache, _cache_configured
+    with _cache_lock:
+        _cache = cache
+        _cache_configured = True
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the process-wide cache"""
+    cache = get_llm_cache()
+    return cache.stats() if cache is not None else {"backend": None}
@@ -1,37 +1,156 @@
+import atexit
+import copy
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
+from typing import Optional
 
-def setup_logger(name: str = "kunani"):
-    """Setup logger with file and console handlers"""
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# One background listener per process writes for every logger set up in "queue" mode
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_queue: Optional[queue.SimpleQueue] = None
+_listener_lock = threading.Lock()
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """Rotates at the time boundary (default midnight) and whenever the file exceeds max_bytes"""
+
+    def __init__(self, filename: str, max_bytes: int = 0, when: str = "midnight", backup_count: int = 0, **kwargs):
+        super().__init__(filename, when=when, backupCount=backup_count, **kwargs)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if super().shouldRollover(record):
+            return 1
+        if self.max_bytes > 0 and self.stream is not None:
+            self.stream.seek(0, 2)
+            return int(self.stream.tell() >= self.max_bytes)
+        return 0
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Several size rollovers in one period: kunani.log.2025-01-01, .2025-01-01.1, ...
+        name = super().rotation_filename(default_name)
+        candidate, n = name, 0
+        while os.path.exists(candidate):
+            n += 1
+            candidate = f"{name}.{n}"
+        return candidate
+
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting (timestamp, layout, traceback) to the listener
+    thread. Only the message itself is merged here, so later changes to the arguments
+    can't alter what gets logged.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _level(name: str, default: str) -> int:
+    return getattr(logging, os.getenv(name, default).upper(), getattr(logging, default))
+
+
+def _file_handler(log_dir: str) -> logging.Handler:
+    os.makedirs(log_dir, exist_ok=True)
+    return SizeAndTimeRotatingFileHandler(
+        os.path.join(log_dir, "kunani.log"),
+        max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        when=os.getenv("LOG_ROTATE_WHEN", "midnight"),
+        backup_count=int(os.getenv("LOG_BACKUP_COUNT", "14")),
+        encoding="utf-8",
+    )
+
+
+def _start_listener(handlers) -> queue.SimpleQueue:
+    global _listener, _listener_queue
+    with _listener_lock:
+        if _listener is None:
+            _listener_queue = queue.SimpleQueue()
+            _listener = logging.handlers.QueueListener(_listener_queue, *handlers, respect_handler_level=True)
+            _listener.start()
+            # Flush what is still queued on exit
+            atexit.register(stop_log_listener)
+    return _listener_queue
+
+
+def stop_log_listener() -> None:
+    """Stop the background writer after flushing queued records"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def setup_logger(name: str = "kunani", mode: Optional[str] = None, log_dir: Optional[str] = None):
+    """
+    Setup logger with file and console handlers.
+    LOG_MODE=queue (default) hands records to a background thread so file and console
+    writes stay off the request path; LOG_MODE=sync writes inline.
+    LOG_FILE_LEVEL / LOG_CONSOLE_LEVEL gate records before any formatting is done.
+    """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)  # Set root logger to DEBUG to capture all levels
-    
+
     # Avoid duplicate handlers
     if logger.handlers:
         return logger
-    
-    # Create logs directory if it doesn't exist
-    os.makedirs("logs", exist_ok=True)
-    
-    # File handler - set to DEBUG to capture all logs
-    log_file = f"logs/kunani_{datetime.now().strftime('%Y-%m-%d')}.log"
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    
+
+    mode = (mode or os.getenv("LOG_MODE", "queue")).lower()
+    file_level = _level("LOG_FILE_LEVEL", "DEBUG")
+    console_level = _level("LOG_CONSOLE_LEVEL", "INFO")
+    # Records below both handler levels are dropped by the logger itself - no formatting, no queueing
+    logger.setLevel(min(file_level, console_level))
+
+    if mode == "queue" and _listener is not None:
+        # Every queue-mode logger shares the process-wide listener and its output
+        logger.addHandler(DeferredFormatQueueHandler(_listener_queue))
+        logger.propagate = False
+        return logger
+
+    # File handler - rotated by size and time instead of one file per start date
+    file_handler = _file_handler(log_dir or os.getenv("LOG_DIR", "logs"))
+    file_handler.setLevel(file_level)
+
     # Console handler - keep at INFO for cleaner console output
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    
+    console_handler.setLevel(console_level)
+
     # Formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    formatter = logging.Formatter(LOG_FORMAT)
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+
+    if mode == "queue":
+        logger.addHandler(DeferredFormatQueueHandler(_start_listener([file_handler, console_handler])))
+    else:
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
+
+    # Records are handled here; don't pass them on to root handlers as well
+    logger.propagate = False
     return logger
 
+
+_diagnostics_logger = logging.getLogger("kunani.diagnostics")
+
+
+def print_diagnostic(label: str, model) -> None:
+    """
+    Full JSON dump of an agent response, for debugging.
+    AGENT_DIAGNOSTICS=print (default) prints it as before, "log" sends it through the
+    logger at DEBUG (serialized only if DEBUG is enabled), "off" drops it.
+    """
+    mode = os.getenv("AGENT_DIAGNOSTICS", "print").lower()
+    if mode == "print":
+        print(f"{label}: data {model.model_dump_json()}")
+    elif mode == "log" and _diagnostics_logger.isEnabledFor(logging.DEBUG):
+        # Child of "kunani" - handled by its (queued) handlers
+        _diagnostics_logger.debug("%s: data %s", label, model.model_dump_json())
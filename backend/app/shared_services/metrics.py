@@ -0,0 +1,330 @@
+"""
+Always-on runtime metrics in the Prometheus text format.
+
+Counters and histograms are aggregated per thread: each thread updates its own dict
+without taking a lock (the event loop thread does almost all the work), and a scrape
+sums the per-thread values. Gauges are read from the existing stats snapshots at
+scrape time, so they cost nothing on the hot path.
+
+    TURNS.inc(status="ok")
+    LLM_ATTEMPT_SECONDS.observe(0.8, provider="openrouter")
+
+    @timed(DB_QUERY_SECONDS, op="save_issue")
+    def save_issue(...): ...
+
+render_metrics() produces the scrape body: GET /metrics on server.py, or
+start_metrics_server(port) for processes without an HTTP server (METRICS_PORT in main.py).
+"""
+
+import bisect
+import functools
+import inspect
+import http.server
+import threading
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Seconds - covers fast local steps (ms) up to slow LLM calls (tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _PerThread:
+    """One dict per thread; only the owning thread writes to it"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, ...], Any]] = []
+        self._lock = threading.Lock()
+
+    def shard(self) -> Dict[Tuple[str, ...], Any]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            # Kept after the thread exits, so its counts aren't lost
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def shards(self) -> List[Dict[Tuple[str, ...], Any]]:
+        with self._lock:
+            return [dict(s) for s in self._shards]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = _PerThread()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(map(labels.get, self.labelnames)) if labels else ()
+        shard = self._values.shard()
+        shard[key] = shard.get(key, 0) + amount
+
+    def totals(self) -> Dict[Tuple[str, ...], float]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for shard in self._values.shards():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.totals().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = _PerThread()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(map(labels.get, self.labelnames)) if labels else ()
+        shard = self._values.shard()
+        entry = shard.get(key)
+        if entry is None:
+            # [count per bucket (+Inf last), sum, count]
+            entry = shard[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager observing the elapsed time of the block"""
+        return _Timer(self, labels)
+
+    def totals(self) -> Dict[Tuple[str, ...], list]:
+        totals: Dict[Tuple[str, ...], list] = {}
+        for shard in self._values.shards():
+            for key, (counts, total, count) in shard.items():
+                merged = totals.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.totals().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class GaugeFamily:
+    """Gauges read at scrape time: collect() returns {label values: value} or a single number"""
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Any], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        try:
+            values = self.collect()
+        except Exception as e:
+            logger.warning(f"[Metrics] Collecting {self.name} failed: {e}")
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric; registering the same name again returns the existing one"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, collect: Callable[[], Any],
+              labelnames: Sequence[str] = ()) -> GaugeFamily:
+        """Gauges are replaced on re-registration (e.g. a new SessionManager)"""
+        gauge = GaugeFamily(name, documentation, collect, labelnames)
+        with self._lock:
+            self._metrics[name] = gauge
+        return gauge
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def render_metrics() -> str:
+    """Scrape body in the Prometheus text exposition format"""
+    return REGISTRY.render()
+
+
+def timed(histogram: Histogram, **labels) -> Callable:
+    """Decorator: observe each call's duration (sync or async function)"""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start, **labels)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+
+    return decorator
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would drown the log
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> http.server.ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread"""
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"[Metrics] Serving http://{host}:{port}/metrics")
+    return server
+
+
+# --- Runtime metrics -----------------------------------------------------------
+
+TURNS = REGISTRY.counter("kunani_turns_total", "Conversation turns run through the graph", ["status"])
+TURN_SECONDS = REGISTRY.histogram("kunani_turn_duration_seconds", "Wall time of a conversation turn")
+TURN_HOPS = REGISTRY.histogram(
+    "kunani_turn_hops", "Graph nodes run per turn", buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 25)
+)
+TURN_GUARD_TRIPS = REGISTRY.counter(
+    "kunani_turn_guard_trips_total",
+    "Turns ended early by the turn budget, by reason (hops, tokens, cycle) and the node that hit it",
+    ["reason", "node"],
+)
+NODE_SECONDS = REGISTRY.histogram("kunani_node_duration_seconds", "Wall time per graph node run", ["node"])
+
+LLM_CALLS = REGISTRY.counter(
+    "kunani_llm_calls_total",
+    "LLM calls by outcome: ok (first provider), fallback (served by a later provider), cache_hit, error",
+    ["outcome"],
+)
+LLM_ATTEMPTS = REGISTRY.counter(
+    "kunani_llm_attempts_total",
+    "Provider attempts by outcome: ok, error (transport, timeout, 429, 5xx - counted against the circuit), "
+    "client_error (request rejected or response unusable), cancelled, deadline_skipped",
+    ["provider", "outcome"],
+)
+LLM_ATTEMPT_SECONDS = REGISTRY.histogram(
+    "kunani_llm_attempt_duration_seconds", "Latency of completed provider attempts", ["provider"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "kunani_llm_tokens_total", "Tokens by provider and type (prompt, cached, completion)", ["provider", "type"]
+)
+
+FILLER_HANDOFFS = REGISTRY.counter(
+    "kunani_issue_filler_handoffs_total",
+    "issue_filler_agent handoff decisions; decision=overridden when validation rejected a reporting handoff",
+    ["decision"],
+)
+
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "kunani_scheduler_wait_seconds", "Time a turn waited in the session scheduler before starting"
+)
+
+DB_QUERY_SECONDS = REGISTRY.histogram("kunani_db_query_duration_seconds", "Issue repository call latency", ["op"])
+DB_POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "kunani_db_pool_wait_seconds", "Time spent waiting for a pooled database connection (waits only)"
+)
+ISSUES_SAVED = REGISTRY.counter("kunani_issues_saved_total", "Issues written to the database", ["path"])
@@ -0,0 +1,302 @@
+"""
+Per-session conversation state for the server.
+Turns are run by a SessionScheduler: strictly in order and one at a time per
+session, different sessions concurrently (round-robin) on the same compiled graph.
+Each turn works on a copy of the session's state, which is replaced only when the
+turn succeeds - a failed turn leaves the session as it was.
+
+Backpressure: a full session queue raises SessionBusyError, too many sessions raises
+ServerBusyError, and at most max_concurrent_turns graph runs are in flight.
+drain() stops accepting messages and lets queued turns finish.
+
+Session ids are issued by create(); messages for any other id raise
+SessionNotFoundError. Checkpoint threads are namespaced (THREAD_PREFIX), so a
+session can only ever resume a thread the server itself created - never the
+CLI's or another process's.
+"""
+
+import asyncio
+import os
+import re
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.graph.najua_graph import astream_turn, new_conversation_state
+from app.graph.registry import get_compiled_graph, warm_up_graphs
+from app.models.najua_models import NajuaState
+from app.shared_services.logger_setup import setup_logger
+from app.shared_services.session_scheduler import SessionScheduler, SessionBusyError
+from app.shared_services.deadline import new_turn_deadline
+from app.shared_services.issue_dedup import awarm_duplicate_index
+from app.shared_services.tracing import span
+from app.shared_services.metrics import REGISTRY
+
+logger = setup_logger()
+
+# Receives the turn's events ({"type": "message_delta" | "message", ...}) as they happen
+EventSink = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class ServerBusyError(RuntimeError):
+    """Raised when no new sessions or messages are accepted (session limit reached or draining)"""
+
+
+class SessionNotFoundError(KeyError):
+    """Raised for an unknown session id"""
+
+
+THREAD_PREFIX = "server:"
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")  # uuid4().hex, as issued by create()
+
+
+def last_assistant_message(state: NajuaState) -> str:
+    history = state.get("conversation_history") or []
+    if history and history[-1].get("role") == "assistant":
+        return history[-1].get("content", "")
+    return ""
+
+
+def _turn_state(state: NajuaState, message: str) -> NajuaState:
+    """Copy of the state for one turn, with the user's message added. Nodes mutate these lists in place."""
+    return {
+        **state,
+        "conversation_history": list(state.get("conversation_history") or []) + [{"role": "user", "content": message}],
+        "current_issues": list(state.get("current_issues") or []),
+        "reported_issues": list(state.get("reported_issues") or []),
+    }
+
+
+class Session:
+    def __init__(self, session_id: str, state: NajuaState):
+        self.session_id = session_id
+        self.state = state
+        self.created_at = time.time()
+        self.last_active = time.time()
+        self.turns = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "messages": len(self.state.get("conversation_history") or []),
+            "turns": self.turns,
+            "current_node": self.state.get("current_node"),
+            "current_issues": [
+                i.model_dump() if hasattr(i, "model_dump") else i for i in self.state.get("current_issues") or []
+            ],
+            "reported_issues": self.state.get("reported_issues") or [],
+            "idle_seconds": round(time.time() - self.last_active, 1),
+        }
+
+
+class SessionManager:
+    """
+    Args:
+        persist: Use the checkpointed graph (state survives restarts; thread_id = THREAD_PREFIX + session id)
+        queue_size: Messages that may wait per session before SessionBusyError
+        max_sessions: Live sessions before ServerBusyError
+        max_concurrent_turns: Graph runs in flight across all sessions
+        idle_timeout: Seconds after which an idle session is evicted (0 = never)
+    """
+
+    def __init__(self, persist: bool = False, queue_size: int = 4, max_sessions: int = 1000,
+                 max_concurrent_turns: int = 32, idle_timeout: float = 1800.0):
+        self.persist = persist
+        self.queue_size = queue_size
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[str, Session] = {}
+        self.draining = False
+        self.scheduler = SessionScheduler(workers=max_concurrent_turns, max_queue_per_session=queue_size)
+        self._create_lock = asyncio.Lock()
+        self._janitor: Optional[asyncio.Task] = None
+        self._graph = None
+        self._checkpointer = None
+        self.stats = {"turns": 0, "errors": 0, "rejected": 0, "evicted": 0}
+
+    @classmethod
+    def from_env(cls) -> "SessionManager":
+        return cls(
+            persist=os.getenv("CHECKPOINT_ENABLED", "false").lower() == "true",
+            queue_size=int(os.getenv("SESSION_QUEUE_SIZE", "4")),
+            max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "1000")),
+            max_concurrent_turns=int(os.getenv("SESSION_MAX_CONCURRENT_TURNS", "32")),
+            idle_timeout=float(os.getenv("SESSION_IDLE_SECONDS", "1800")),
+        )
+
+    async def start(self) -> None:
+        """Compile the graph (and set up checkpoint tables) and warm the duplicate index before the first request"""
+        if self.persist:
+            from app.shared_services.checkpointer import get_checkpointer
+            self._checkpointer = get_checkpointer()
+            await self._checkpointer.setup()
+            warm_up_graphs(["najua_persistent"])
+            self._graph = get_compiled_graph("najua_persistent")
+        else:
+            warm_up_graphs(["najua"])
+            self._graph = get_compiled_graph("najua")
+        # The first report would otherwise load the duplicate index from the issues table
+        await awarm_duplicate_index()
+        self.scheduler.start()
+        if self.idle_timeout:
+            self._janitor = asyncio.create_task(self._evict_idle())
+        self._register_metrics()
+        logger.info(f"[Sessions] Started (persist={self.persist}, max_concurrent_turns={self.scheduler.workers})")
+
+    def _register_metrics(self) -> None:
+        """Gauges read from this manager at scrape time"""
+        REGISTRY.gauge("kunani_sessions", "Live conversation sessions", lambda: len(self.sessions))
+        REGISTRY.gauge(
+            "kunani_scheduler_jobs", "Turns in the session scheduler by state (queued, running)",
+            lambda: {state: self.scheduler.snapshot()[key] for state, key in (("queued", "queued_jobs"), ("running", "running"))},
+            ["state"],
+        )
+
+    @staticmethod
+    def _thread_id(session_id: str) -> str:
+        return f"{THREAD_PREFIX}{session_id}"
+
+    def _config(self, session_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": self._thread_id(session_id)}}
+
+    def _check_capacity(self) -> None:
+        if self.draining:
+            raise ServerBusyError("Server is shutting down")
+        if len(self.sessions) >= self.max_sessions:
+            self.stats["rejected"] += 1
+            raise ServerBusyError(f"Session limit reached ({self.max_sessions})")
+
+    async def create(self) -> Session:
+        """Start a new session with a server-issued id"""
+        async with self._create_lock:
+            self._check_capacity()
+            session = Session(uuid.uuid4().hex, new_conversation_state())
+            self.sessions[session.session_id] = session
+            return session
+
+    async def resolve(self, session_id: str) -> Session:
+        """
+        Live session for an id issued by create(). With persistence, a session from before
+        a restart is resumed from its checkpoint thread; any other id raises SessionNotFoundError.
+        """
+        if session_id in self.sessions:
+            return self.sessions[session_id]
+        if not self.persist or not _SESSION_ID.match(session_id):
+            raise SessionNotFoundError(session_id)
+        async with self._create_lock:
+            if session_id in self.sessions:
+                return self.sessions[session_id]
+            snapshot = await self._graph.aget_state(self._config(session_id))
+            if not snapshot.values:
+                raise SessionNotFoundError(session_id)
+            self._check_capacity()
+            state = snapshot.values
+            logger.info(f"[Sessions] Resumed {session_id} ({len(state.get('conversation_history', []))} messages)")
+            session = Session(session_id, state)
+            self.sessions[session_id] = session
+            return session
+
+    def get(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise SessionNotFoundError(session_id)
+        return session
+
+    def summary(self, session_id: str) -> Dict[str, Any]:
+        return {**self.get(session_id).summary(), "queued": self.scheduler.queue_depth(session_id)}
+
+    async def submit(self, session_id: str, message: str,
+                     sink: Optional[EventSink] = None) -> "asyncio.Future[NajuaState]":
+        """
+        Queue a user message. Returns a future resolved with the state after the turn.
+        Raises SessionNotFoundError for ids not issued by create(), and
+        SessionBusyError/ServerBusyError instead of queueing without bound.
+        The turn's deadline starts now, so time spent queued counts against it.
+        """
+        if self.draining:
+            self.stats["rejected"] += 1
+            raise ServerBusyError("Server is shutting down")
+        session = await self.resolve(session_id)
+        deadline = new_turn_deadline()
+        try:
+            future = await self.scheduler.submit(
+                session.session_id, lambda: self._run_turn(session, message, sink, deadline)
+            )
+        except SessionBusyError:
+            self.stats["rejected"] += 1
+            raise
+        session.last_active = time.time()
+        return future
+
+    async def _run_turn(self, session: Session, message: str, sink: Optional[EventSink],
+                        deadline: Optional[float] = None) -> NajuaState:
+        try:
+            return await self._stream_turn(session, message, sink, deadline)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"[Sessions] Turn failed for {session.session_id}: {e}", exc_info=True)
+            raise
+        finally:
+            session.last_active = time.time()
+
+    async def _stream_turn(self, session: Session, message: str, sink: Optional[EventSink],
+                           deadline: Optional[float] = None) -> NajuaState:
+        config = self._config(session.session_id)
+        result = None
+        # All checkpoint writes of the turn are committed together (see main.py)
+        batch = self._checkpointer.batch(self._thread_id(session.session_id)) if self.persist else nullcontext()
+        # Root span of the turn - node, LLM and DB spans nest under it
+        with span("turn", kind="turn", session_id=session.session_id, turn=session.turns + 1) as turn_span:
+            async with batch:
+                async for event in astream_turn(self._graph, _turn_state(session.state, message), config,
+                                                durability="exit" if self.persist else None, deadline=deadline):
+                    if event["type"] == "final":
+                        result = event["state"]
+                    elif sink is not None:
+                        try:
+                            await sink(event)
+                        except Exception as e:
+                            # The client went away - finish the turn so the session state stays consistent
+                            logger.warning(f"[Sessions] Dropping event sink for {session.session_id}: {e}")
+                            sink = None
+            if turn_span:
+                turn_span.set(final_node=result.get("current_node"))
+        session.state = result
+        session.turns += 1
+        self.stats["turns"] += 1
+        return result
+
+    async def close_session(self, session_id: str) -> None:
+        """Forget a session; its queued turns are dropped (a running turn finishes)"""
+        self.sessions.pop(session_id, None)
+        self.scheduler.cancel_session(session_id)
+
+    async def _evict_idle(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 60))
+            now = time.time()
+            for session_id, session in list(self.sessions.items()):
+                if self.scheduler.is_idle(session_id) and now - session.last_active > self.idle_timeout:
+                    await self.close_session(session_id)
+                    self.stats["evicted"] += 1
+                    logger.info(f"[Sessions] Evicted idle session {session_id}")
+
+    async def drain(self, timeout: float = 30.0) -> None:
+        """Stop accepting messages, finish queued turns (up to timeout), then stop all workers"""
+        self.draining = True
+        if self._janitor:
+            self._janitor.cancel()
+        if self.scheduler.pending():
+            logger.info(f"[Sessions] Draining {self.scheduler.pending()} turn(s)")
+        await self.scheduler.drain(timeout)
+        self.sessions.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "sessions": len(self.sessions),
+            "draining": self.draining,
+            "persist": self.persist,
+            "scheduler": self.scheduler.snapshot(),
+        }
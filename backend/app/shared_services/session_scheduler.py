@@ -0,0 +1,165 @@
+"""
+Session scheduler: ordered, exclusive execution per session, sessions in parallel.
+
+Jobs are queued per session key. A fixed pool of worker tasks takes sessions from a
+round-robin ready ring, runs ONE job of that session, then puts the session back at
+the end of the ring if it still has work. So:
+
+- a session never has two jobs running at once, and its jobs run in submit order
+  (graph nodes mutate the session's state in place - this is what makes that safe)
+- a session with a deep backlog gets one turn per cycle, like everyone else, so a
+  flood from one user delays mostly that user
+
+snapshot() reports queue depths and how long jobs waited before starting.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.shared_services.logger_setup import setup_logger
+from app.shared_services.metrics import SCHEDULER_WAIT_SECONDS
+
+logger = setup_logger()
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class SessionBusyError(RuntimeError):
+    """Raised when a session's queue is full"""
+
+
+class SessionScheduler:
+    """
+    Args:
+        workers: Jobs running at once across all sessions
+        max_queue_per_session: Jobs that may wait per session before SessionBusyError
+        wait_samples: Recent wait times kept for the percentiles in snapshot()
+    """
+
+    def __init__(self, workers: int = 32, max_queue_per_session: int = 4, wait_samples: int = 1000):
+        self.workers = workers
+        self.max_queue_per_session = max_queue_per_session
+        self._queues: Dict[str, Deque[Tuple[Job, asyncio.Future, float]]] = {}
+        self._ready: Deque[str] = deque()
+        self._running: Dict[str, float] = {}  # session -> start time of its running job
+        self._wakeup = asyncio.Condition()
+        self._tasks: list = []
+        self._waits: Deque[float] = deque(maxlen=wait_samples)
+        self._max_wait = 0.0
+        self._max_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def submit(self, key: str, job: Job) -> "asyncio.Future[Any]":
+        """Queue job for session `key`; the returned future gets its result"""
+        queue = self._queues.setdefault(key, deque())
+        if len(queue) >= self.max_queue_per_session:
+            self.rejected += 1
+            raise SessionBusyError(f"Session {key} already has {len(queue)} message(s) waiting")
+        future = asyncio.get_running_loop().create_future()
+        queue.append((job, future, time.perf_counter()))
+        self._max_depth = max(self._max_depth, len(queue))
+        async with self._wakeup:
+            # A running session is re-queued by its worker when the job finishes
+            if key not in self._running and key not in self._ready:
+                self._ready.append(key)
+                self._wakeup.notify()
+        return future
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: bool(self._ready))
+                key = self._ready.popleft()
+                job, future, enqueued_at = self._queues[key].popleft()
+                self._running[key] = time.perf_counter()
+
+            wait = self._running[key] - enqueued_at
+            self._waits.append(wait)
+            self._max_wait = max(self._max_wait, wait)
+            SCHEDULER_WAIT_SECONDS.observe(wait)
+            try:
+                if not future.cancelled():
+                    result = await job()
+                    if not future.done():
+                        future.set_result(result)
+                self.completed += 1
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                async with self._wakeup:
+                    self._running.pop(key, None)
+                    if self._queues.get(key):
+                        self._ready.append(key)
+                        self._wakeup.notify()
+                    elif key in self._queues:
+                        del self._queues[key]
+
+    def queue_depth(self, key: str) -> int:
+        return len(self._queues.get(key) or ())
+
+    def is_idle(self, key: str) -> bool:
+        return key not in self._running and not self._queues.get(key)
+
+    def cancel_session(self, key: str) -> int:
+        """Drop a session's queued (not running) jobs; returns how many were dropped"""
+        queue = self._queues.pop(key, None) or deque()
+        for _, future, _ in queue:
+            future.cancel()
+        if key in self._ready:
+            self._ready.remove(key)
+        return len(queue)
+
+    def pending(self) -> int:
+        return sum(len(q) for q in self._queues.values()) + len(self._running)
+
+    async def drain(self, timeout: float = 30.0) -> None:
+        """Wait for queued and running jobs (up to timeout), then stop the workers"""
+        deadline = time.monotonic() + timeout
+        while self.pending() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.pending():
+            logger.warning(f"[Scheduler] Drain timed out with {self.pending()} job(s) left, cancelling")
+            for key in list(self._queues):
+                self.cancel_session(key)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def snapshot(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def pct(p: float) -> Optional[float]:
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 1) if waits else None
+
+        depths = sorted(((k, len(q)) for k, q in self._queues.items() if q), key=lambda kv: kv[1], reverse=True)
+        return {
+            "workers": self.workers,
+            "running": len(self._running),
+            "ready_sessions": len(self._ready),
+            "queued_jobs": sum(d for _, d in depths),
+            "backlogged_sessions": len(depths),
+            "deepest_queues": dict(depths[:5]),
+            "max_queue_depth": self._max_depth,
+            "wait_ms_p50": pct(0.50),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_p99": pct(0.99),
+            "wait_ms_max": round(self._max_wait * 1000, 1),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,346 @@
+"""
+Lightweight tracing: nested timing spans for turns, graph nodes, LLM calls/attempts and DB calls.
+
+    with span("llm.attempt", kind="llm", provider="openai") as s:
+        ...
+        s.set(prompt_tokens=812)
+
+    @traced("db.save_issue", kind="db")
+    def save_issue(...): ...
+
+The current span is kept in a contextvar, so nesting follows the code across awaits
+and into tasks created inside a span (hedged LLM attempts, LangGraph nodes).
+Finished spans are handed to a background thread and exported in batches:
+
+    TRACE_EXPORT=jsonl  -> one JSON object per span in TRACE_FILE (default logs/traces.jsonl)
+    TRACE_EXPORT=otlp   -> OTLP/HTTP JSON to OTEL_EXPORTER_OTLP_ENDPOINT (default http://localhost:4318)
+    TRACE_EXPORT=jsonl,otlp for both; off (default) records nothing.
+
+trace_report.py prints per-agent latency breakdowns from the JSONL file.
+"""
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .logger_setup import setup_logger
+
+logger = setup_logger()
+
+DEFAULT_TRACE_FILE = os.path.join("logs", "traces.jsonl")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("kunani_current_span", default=None)
+
+
+class Span:
+    """One timed operation. Attributes are plain JSON values (str/int/float/bool)."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "attributes",
+                 "start_time", "_start", "duration", "status", "error")
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, **counts) -> None:
+        """Add to numeric attributes (e.g. token counts over several usage reports)"""
+        for key, value in counts.items():
+            self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def fail(self, error: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"[:500]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+# --- Exporters -----------------------------------------------------------------
+
+class JsonlSpanExporter:
+    """Appends one JSON object per span to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s, default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpSpanExporter:
+    """Posts spans as OTLP/HTTP JSON (/v1/traces), accepted by the OpenTelemetry Collector, Jaeger, Tempo, ..."""
+
+    def __init__(self, endpoint: str, service_name: str = "kunani", timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + ("" if endpoint.rstrip("/").endswith("/v1/traces") else "/v1/traces")
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def _span(self, s: Dict[str, Any]) -> Dict[str, Any]:
+        start_ns = int(s["start"] * 1e9)
+        attributes = {**s["attributes"], "kunani.kind": s["kind"]}
+        otlp = {
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "name": s["name"],
+            "kind": 3 if s["kind"] in ("llm", "db") else 1,  # CLIENT / INTERNAL
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(s["duration_ms"] * 1e6)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None],
+            "status": {"code": 2, "message": s["error"] or ""} if s["status"] == "error" else {"code": 1},
+        }
+        if s["parent_id"]:
+            otlp["parentSpanId"] = s["parent_id"]
+        return otlp
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        body = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "kunani"}, "spans": [self._span(s) for s in spans]}],
+        }]}
+        request = urllib.request.Request(
+            self.url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class SpanProcessor:
+    """Exports finished spans in batches from a background thread, off the request path"""
+
+    def __init__(self, exporters: List[Any], batch_size: int = 256, interval: float = 1.0):
+        self.exporters = exporters
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self.failures = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item.to_dict())
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: List[Dict[str, Any]]) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(batch)
+            except Exception as e:
+                self.failures += 1
+                self.dropped += len(batch)
+                # A missing collector shouldn't flood the log
+                if self.failures == 1 or self.failures % 100 == 0:
+                    logger.warning(f"[Tracing] {type(exporter).__name__} failed ({self.failures} time(s)): {e}")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Export what is still queued, then stop the thread"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+_processor: Optional[SpanProcessor] = None
+_processor_lock = threading.Lock()
+_configured = False
+
+
+def _exporters_from_env() -> List[Any]:
+    exporters = []
+    for name in os.getenv("TRACE_EXPORT", "off").lower().split(","):
+        name = name.strip()
+        if name == "jsonl":
+            exporters.append(JsonlSpanExporter(os.getenv("TRACE_FILE", DEFAULT_TRACE_FILE)))
+        elif name == "otlp":
+            exporters.append(OtlpHttpSpanExporter(
+                os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"),
+                service_name=os.getenv("OTEL_SERVICE_NAME", "kunani"),
+            ))
+        elif name not in ("", "off", "none"):
+            logger.warning(f"[Tracing] Unknown TRACE_EXPORT target '{name}', ignoring")
+    return exporters
+
+
+def configure_tracing(exporters: Optional[List[Any]] = None) -> Optional[SpanProcessor]:
+    """
+    Set where spans go (default: from TRACE_EXPORT). Called lazily on the first span;
+    call it explicitly to export somewhere else. An empty list turns tracing off.
+    """
+    global _processor, _configured
+    with _processor_lock:
+        if _processor is not None:
+            _processor.shutdown()
+        if exporters is None:
+            exporters = _exporters_from_env()
+        _processor = SpanProcessor(exporters) if exporters else None
+        if _processor is not None and not _configured:
+            atexit.register(shutdown_tracing)
+        _configured = True
+        if _processor is not None:
+            logger.info(f"[Tracing] Exporting spans to {', '.join(type(e).__name__ for e in exporters)}")
+    return _processor
+
+
+def shutdown_tracing() -> None:
+    """Flush queued spans and stop the exporter thread"""
+    global _processor
+    with _processor_lock:
+        if _processor is not None:
+            _processor.shutdown()
+            _processor = None
+
+
+def tracing_enabled() -> bool:
+    if not _configured:
+        configure_tracing()
+    return _processor is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_span_attributes(**attributes) -> None:
+    """Set attributes on the current span, if there is one"""
+    s = _current_span.get()
+    if s is not None:
+        s.set(**attributes)
+
+
+def add_span_counts(**counts) -> None:
+    """Add to numeric attributes of the current span, if there is one"""
+    s = _current_span.get()
+    if s is not None:
+        s.add(**counts)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time the enclosed block as a child of the current span. Yields None when tracing
+    is off, so callers that set attributes should use `if s:` or set_span_attributes().
+    """
+    if not tracing_enabled():
+        yield None
+        return
+    parent = _current_span.get()
+    s = Span(name, kind, parent, attributes)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        if isinstance(e, GeneratorExit):
+            s.status = "cancelled"
+        elif isinstance(e, Exception):
+            s.fail(e)
+        else:
+            s.status = "cancelled"
+        raise
+    finally:
+        s.duration = time.perf_counter() - s._start
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned async generator)
+            _current_span.set(parent)
+        processor = _processor
+        if processor is not None:
+            processor.submit(s)
+
+
+def traced(name: Optional[str] = None, kind: str = "internal") -> Callable:
+    """Decorator: run each call of a sync or async function (or async generator) inside a span"""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def async_gen_wrapper(*args, **kwargs):
+                # The span stays open until the generator is exhausted or closed
+                with span(span_name, kind=kind):
+                    inner = func(*args, **kwargs)
+                    try:
+                        async for item in inner:
+                            yield item
+                    finally:
+                        # Closing the wrapper closes the wrapped generator now, not whenever it is collected
+                        await inner.aclose()
+            return async_gen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind=kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind=kind):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
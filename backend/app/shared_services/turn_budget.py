@@ -0,0 +1,107 @@
+"""
+Per-turn hop budget and loop guard for the agent graph.
+
+Agents hand off to each other within one turn (welcome -> filler -> reporting -> ...).
+Each node records its hop in the state; when the turn has used up its budget the
+node's handoff is rewritten to respond_to_user_agent, so the graph ends and the user
+gets a reply instead of an unbounded chain of LLM calls:
+
+    TURN_MAX_HOPS           nodes run in one turn (default 8)
+    TURN_MAX_LLM_TOKENS     prompt + completion tokens in one turn (default 30000, 0 = no limit)
+    TURN_MAX_PAIR_REPEATS   times the same (node, handoff) pair may occur in one turn (default 2)
+
+The counters live in NajuaState (turn_hops, turn_llm_tokens, turn_path) and are reset
+at the start of every turn (see astream_turn).
+"""
+
+import os
+from typing import Any, Dict, Optional, get_args
+
+from app.models.najua_models import NajuaState
+from app.shared_services.logger_setup import setup_logger
+from app.shared_services.metrics import TURN_GUARD_TRIPS
+from app.shared_services.tracing import set_span_attributes
+
+logger = setup_logger()
+
+ENTRY_AGENTS = ("welcome_agent", "issue_filler_agent", "issue_reporting_agent")
+
+BUDGET_EXHAUSTED_MESSAGE = (
+    "I'm sorry, I couldn't finish that just now. Could you tell me a bit more about what you need?"
+)
+
+
+def new_turn_budget() -> Dict[str, Any]:
+    """State fields that start every turn from zero"""
+    return {"turn_hops": 0, "turn_llm_tokens": 0, "turn_path": []}
+
+
+def _limit(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def max_turn_hops() -> int:
+    return _limit("TURN_MAX_HOPS", 8)
+
+
+def budget_exhausted(state: NajuaState, node: str, handoff: str) -> Optional[str]:
+    """Why the turn must stop before `node` hands off to `handoff` (None while within budget)"""
+    max_hops = max_turn_hops()
+    if max_hops and state.get("turn_hops", 0) >= max_hops:
+        return "hops"
+    max_tokens = _limit("TURN_MAX_LLM_TOKENS", 30000)
+    if max_tokens and state.get("turn_llm_tokens", 0) >= max_tokens:
+        return "tokens"
+    max_repeats = _limit("TURN_MAX_PAIR_REPEATS", 2)
+    if max_repeats and (state.get("turn_path") or []).count(f"{node}->{handoff}") > max_repeats:
+        return "cycle"
+    return None
+
+
+def _resume_agent(handoff_decision, node: str) -> str:
+    """Agent to continue with after the user replies - the intended target, if that model allows it"""
+    field = type(handoff_decision).model_fields.get("agent_after_human_response")
+    allowed = get_args(field.annotation) if field is not None else ()
+    for candidate in (handoff_decision.agent, node):
+        if candidate in ENTRY_AGENTS and candidate in allowed:
+            return candidate
+    return "welcome_agent"
+
+
+def guard_hop(state: NajuaState, node: str, usage: Dict[str, int]) -> None:
+    """
+    Record the hop `node` just made (its handoff is in state["handoff_decision"]) and
+    the LLM usage of the hop. If the turn is over budget and the handoff would run
+    another agent, end the turn with a reply to the user instead.
+    """
+    handoff_decision = state.get("handoff_decision")
+    if handoff_decision is None:
+        return
+    handoff = handoff_decision.agent
+    state["turn_hops"] = state.get("turn_hops", 0) + 1
+    state["turn_llm_tokens"] = (
+        state.get("turn_llm_tokens", 0) + usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    )
+    state["turn_path"] = (state.get("turn_path") or []) + [f"{node}->{handoff}"]
+
+    if handoff not in ENTRY_AGENTS:
+        return  # The turn ends here anyway
+    reason = budget_exhausted(state, node, handoff)
+    if reason is None:
+        return
+
+    TURN_GUARD_TRIPS.inc(reason=reason, node=node)
+    set_span_attributes(turn_guard=reason)
+    logger.warning(
+        f"[TurnBudget] {reason} budget exhausted at {node} -> {handoff} "
+        f"(hops={state['turn_hops']}, tokens={state['turn_llm_tokens']}, path={state['turn_path']}); "
+        f"responding to the user"
+    )
+    state["handoff_decision"] = handoff_decision.model_copy(update={
+        "agent": "respond_to_user_agent",
+        "agent_after_human_response": _resume_agent(handoff_decision, node),
+        "reasoning": f"{handoff_decision.reasoning} [turn stopped: {reason} budget exhausted]",
+    })
+    # The node only posts message_to_user; make sure the turn doesn't end silently
+    if not handoff_decision.message_to_user:
+        state["conversation_history"].append({"role": "assistant", "content": BUDGET_EXHAUSTED_MESSAGE})
@@ -1,4 +1,3 @@
-from .db_tools import get_db_tools
-
-__all__ = ["get_db_tools"]
+from .db_tools import get_db_tools, get_async_db_tools
 
+__all__ = ["get_db_tools", "get_async_db_tools"]
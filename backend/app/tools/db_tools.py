@@ -7,7 +7,17 @@ from pydantic import BaseModel, Field
 import uuid
 from datetime import datetime
 
-from app.shared_services.db import save_issue, get_issue, get_all_issues, update_issue_status
+from app.shared_services.db import (
+    save_issue, save_issues_bulk, get_issue, get_issues_page, search_issues,
+    update_issue_status, attach_report_to_issue
+)
+from app.shared_services.async_db import (
+    asave_issue, aget_issue, aget_issues_page, aupdate_issue_status, aattach_report_to_issue
+)
+from app.shared_services.issue_dedup import (
+    find_duplicate_for_issue, index_saved_issue, unindex_issue, duplicate_report,
+    afind_duplicate_for_issue, aindex_saved_issue, aunindex_issue,
+)
 
 
 class SaveIssueInput(BaseModel):
@@ -18,7 +28,12 @@ class SaveIssueInput(BaseModel):
     priority: str = Field(default="medium", description="Priority: low, medium, high, critical")
     category: Optional[str] = Field(None, description="Category of the issue")
     tags: List[str] = Field(default_factory=list, description="List of tags")
-    metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata, e.g. {\"location\": \"Kitengela, Namanga Road\"}")
+
+
+class SaveIssuesBulkInput(BaseModel):
+    """Input for saving several issues at once"""
+    issues: List[SaveIssueInput] = Field(..., description="The issues to save")
 
 
 class GetIssueInput(BaseModel):
@@ -30,6 +45,20 @@ class GetIssuesInput(BaseModel):
     """Input for getting multiple issues"""
     limit: int = Field(default=50, description="Maximum number of issues to return")
     status: Optional[str] = Field(None, description="Filter by status: open, in_progress, resolved, closed")
+    cursor: Optional[str] = Field(None, description="next_cursor from a previous call, to fetch the next page")
+    summary: bool = Field(default=False, description="Return summary rows only (no description/metadata)")
+
+
+class SearchIssuesInput(BaseModel):
+    """Input for searching issues"""
+    query: Optional[str] = Field(None, description="Free-text search over issue titles and descriptions")
+    location: Optional[str] = Field(None, description="Location to match (fuzzy), e.g. 'Kitengela'")
+    category: Optional[str] = Field(None, description="Category to match (fuzzy), e.g. 'Infrastructure'")
+    status: Optional[str] = Field(None, description="Filter by status: open, in_progress, resolved, closed")
+    priority: Optional[str] = Field(None, description="Filter by priority: low, medium, high, critical")
+    tags: Optional[List[str]] = Field(None, description="Only issues that have all of these tags")
+    limit: int = Field(default=10, description="Maximum number of results to return")
+    offset: int = Field(default=0, description="next_offset from a previous call, to fetch the next page")
 
 
 class UpdateIssueStatusInput(BaseModel):
@@ -38,6 +67,32 @@ class UpdateIssueStatusInput(BaseModel):
     status: str = Field(..., description="New status: open, in_progress, resolved, closed")
 
 
+def _build_issue_data(title: str, description: str, status: str, priority: str,
+                      category: Optional[str], tags: Optional[List[str]],
+                      metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the issue row for the DB layer, generating a unique issue ID"""
+    return {
+        "issue_id": f"ISS-{uuid.uuid4().hex[:8].upper()}",
+        "title": title,
+        "description": description,
+        "status": status,
+        "priority": priority,
+        "category": category,
+        "tags": tags if tags is not None else [],
+        "metadata": metadata if metadata is not None else {}
+    }
+
+
+def _duplicate_result(existing_issue: Dict[str, Any], duplicate_of: str) -> Dict[str, Any]:
+    """Tool result for a report that was attached to an existing issue"""
+    return {
+        "success": True,
+        "issue": dict(existing_issue),
+        "duplicate_of": duplicate_of,
+        "message": f"This matches existing issue {duplicate_of}; the report was added to it"
+    }
+
+
 @tool(args_schema=SaveIssueInput)
 def save_issue_tool(title: str, description: str, status: str = "open", 
                     priority: str = "medium", category: Optional[str] = None,
@@ -55,29 +110,21 @@ def save_issue_tool(title: str, description: str, status: str = "open",
         metadata: Optional metadata dictionary
     
     Returns:
-        The saved issue as a dictionary
+        The saved issue as a dictionary. If the report duplicates an existing open issue,
+        it is attached to that issue instead and duplicate_of is set.
     """
-    if tags is None:
-        tags = []
-    if metadata is None:
-        metadata = {}
-    
-    # Generate unique issue ID
-    issue_id = f"ISS-{uuid.uuid4().hex[:8].upper()}"
-    
-    issue_data = {
-        "issue_id": issue_id,
-        "title": title,
-        "description": description,
-        "status": status,
-        "priority": priority,
-        "category": category,
-        "tags": tags,
-        "metadata": metadata
-    }
+    issue_data = _build_issue_data(title, description, status, priority, category, tags, metadata)
+    issue_id = issue_data["issue_id"]
     
     try:
+        duplicate = find_duplicate_for_issue(issue_data)
+        if duplicate:
+            existing = attach_report_to_issue(duplicate.issue_id, duplicate_report(issue_data, duplicate))
+            if existing:
+                return _duplicate_result(existing, duplicate.issue_id)
+        
         saved_issue = save_issue(issue_data)
+        index_saved_issue(saved_issue)
         return {
             "success": True,
             "issue": dict(saved_issue),
@@ -91,6 +138,63 @@ def save_issue_tool(title: str, description: str, status: str = "open",
         }
 
 
+@tool(args_schema=SaveIssuesBulkInput)
+def save_issues_bulk_tool(issues: List[SaveIssueInput]) -> Dict[str, Any]:
+    """
+    Save several new issues to the database in a single transaction.
+    Use this instead of calling save_issue_tool repeatedly when a user reports multiple issues.
+    
+    Args:
+        issues: List of issues, each with the same fields as save_issue_tool
+    
+    Returns:
+        The saved issues
+    """
+    issues_data = []
+    for issue in issues:
+        if isinstance(issue, BaseModel):
+            issue = issue.model_dump()
+        issues_data.append(_build_issue_data(
+            issue["title"], issue["description"], issue.get("status", "open"),
+            issue.get("priority", "medium"), issue.get("category"),
+            issue.get("tags"), issue.get("metadata")
+        ))
+    
+    try:
+        duplicates = []
+        new_issues = []
+        for issue_data in issues_data:
+            duplicate = find_duplicate_for_issue(issue_data)
+            existing = None
+            if duplicate:
+                existing = attach_report_to_issue(duplicate.issue_id, duplicate_report(issue_data, duplicate))
+            if existing:
+                duplicates.append(dict(existing, duplicate_of=duplicate.issue_id))
+            else:
+                new_issues.append(issue_data)
+        
+        saved_issues = save_issues_bulk(new_issues)
+        for saved_issue in saved_issues:
+            if saved_issue.get("inserted"):
+                index_saved_issue(saved_issue)
+        
+        message = f"Saved {len(saved_issues)} issue(s): {', '.join(i['issue_id'] for i in saved_issues)}"
+        if duplicates:
+            message += f". Added {len(duplicates)} report(s) to existing issue(s): {', '.join(d['issue_id'] for d in duplicates)}"
+        return {
+            "success": True,
+            "issues": [dict(issue) for issue in saved_issues] + duplicates,
+            "count": len(saved_issues) + len(duplicates),
+            "message": message
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to save issues: {e}"
+        }
+
+
 @tool(args_schema=GetIssueInput)
 def get_issue_tool(issue_id: str) -> Dict[str, Any]:
     """
@@ -124,24 +228,29 @@ def get_issue_tool(issue_id: str) -> Dict[str, Any]:
 
 
 @tool(args_schema=GetIssuesInput)
-def get_all_issues_tool(limit: int = 50, status: Optional[str] = None) -> Dict[str, Any]:
+def get_all_issues_tool(limit: int = 50, status: Optional[str] = None,
+                        cursor: Optional[str] = None, summary: bool = False) -> Dict[str, Any]:
     """
-    Get all issues with optional filtering.
+    Get all issues with optional filtering, newest first, one page at a time.
     
     Args:
         limit: Maximum number of issues to return (default: 50)
         status: Optional status filter (open, in_progress, resolved, closed)
+        cursor: Optional next_cursor from a previous call to fetch the following page
+        summary: Return summary rows only, without description/metadata (default: False)
     
     Returns:
-        List of issues
+        List of issues and next_cursor (None when there are no more pages)
     """
     try:
-        issues = get_all_issues(limit=limit, status=status)
+        page = get_issues_page(limit=limit, status=status, cursor=cursor, summary=summary)
+        issues = page["issues"]
         return {
             "success": True,
             "issues": [dict(issue) for issue in issues],
             "count": len(issues),
-            "message": f"Retrieved {len(issues)} issue(s)"
+            "next_cursor": page["next_cursor"],
+            "message": f"Retrieved {len(issues)} issue(s)" + (" (more available - pass next_cursor)" if page["next_cursor"] else "")
         }
     except Exception as e:
         return {
@@ -151,6 +260,47 @@ def get_all_issues_tool(limit: int = 50, status: Optional[str] = None) -> Dict[s
         }
 
 
+@tool(args_schema=SearchIssuesInput)
+def search_issues_tool(query: Optional[str] = None, location: Optional[str] = None,
+                       category: Optional[str] = None, status: Optional[str] = None,
+                       priority: Optional[str] = None, tags: Optional[List[str]] = None,
+                       limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+    """
+    Search reported issues by text, location, category, status, priority and tags.
+    Use this to answer enquiries when the user doesn't know the issue ID.
+    
+    Args:
+        query: Free-text search over titles and descriptions
+        location: Fuzzy location match
+        category: Fuzzy category match
+        status: Optional status filter
+        priority: Optional priority filter
+        tags: Optional tags the issues must have
+        limit: Maximum number of results (default: 10)
+        offset: Offset for the next page (default: 0)
+    
+    Returns:
+        Best-matching issues first, and next_offset (None when there are no more results)
+    """
+    try:
+        results = search_issues(query=query, location=location, category=category, status=status,
+                                priority=priority, tags=tags, limit=limit, offset=offset)
+        issues = results["issues"]
+        return {
+            "success": True,
+            "issues": issues,
+            "count": len(issues),
+            "next_offset": results["next_offset"],
+            "message": f"Found {len(issues)} matching issue(s)"
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to search issues: {e}"
+        }
+
+
 @tool(args_schema=UpdateIssueStatusInput)
 def update_issue_status_tool(issue_id: str, status: str) -> Dict[str, Any]:
     """
@@ -166,6 +316,156 @@ def update_issue_status_tool(issue_id: str, status: str) -> Dict[str, Any]:
     try:
         updated = update_issue_status(issue_id, status)
         if updated:
+            if status in ["resolved", "closed"]:
+                unindex_issue(issue_id)
+            return {
+                "success": True,
+                "issue": dict(updated),
+                "message": f"Issue {issue_id} status updated to {status}"
+            }
+        else:
+            return {
+                "success": False,
+                "message": f"Issue {issue_id} not found"
+            }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to update issue: {e}"
+        }
+
+
+# Async variants - same inputs and outputs, backed by app.shared_services.async_db
+# so they can be awaited on the event loop without blocking it.
+
+@tool("save_issue_tool", args_schema=SaveIssueInput)
+async def asave_issue_tool(title: str, description: str, status: str = "open",
+                           priority: str = "medium", category: Optional[str] = None,
+                           tags: List[str] = None, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Save a new issue to the database.
+    
+    Args:
+        title: Title of the issue
+        description: Detailed description
+        status: Status (default: open)
+        priority: Priority level (default: medium)
+        category: Optional category
+        tags: Optional list of tags
+        metadata: Optional metadata dictionary
+    
+    Returns:
+        The saved issue as a dictionary. If the report duplicates an existing open issue,
+        it is attached to that issue instead and duplicate_of is set.
+    """
+    issue_data = _build_issue_data(title, description, status, priority, category, tags, metadata)
+    issue_id = issue_data["issue_id"]
+    
+    try:
+        duplicate = await afind_duplicate_for_issue(issue_data)
+        if duplicate:
+            existing = await aattach_report_to_issue(duplicate.issue_id, duplicate_report(issue_data, duplicate))
+            if existing:
+                return _duplicate_result(existing, duplicate.issue_id)
+        
+        saved_issue = await asave_issue(issue_data)
+        await aindex_saved_issue(saved_issue)
+        return {
+            "success": True,
+            "issue": dict(saved_issue),
+            "message": f"Issue {issue_id} saved successfully"
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to save issue: {e}"
+        }
+
+
+@tool("get_issue_tool", args_schema=GetIssueInput)
+async def aget_issue_tool(issue_id: str) -> Dict[str, Any]:
+    """
+    Get an issue by its ID.
+    
+    Args:
+        issue_id: The issue ID to retrieve
+    
+    Returns:
+        The issue as a dictionary, or None if not found
+    """
+    try:
+        issue = await aget_issue(issue_id)
+        if issue:
+            return {
+                "success": True,
+                "issue": dict(issue),
+                "message": f"Issue {issue_id} retrieved successfully"
+            }
+        else:
+            return {
+                "success": False,
+                "message": f"Issue {issue_id} not found"
+            }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to get issue: {e}"
+        }
+
+
+@tool("get_all_issues_tool", args_schema=GetIssuesInput)
+async def aget_all_issues_tool(limit: int = 50, status: Optional[str] = None,
+                               cursor: Optional[str] = None, summary: bool = False) -> Dict[str, Any]:
+    """
+    Get all issues with optional filtering, newest first, one page at a time.
+    
+    Args:
+        limit: Maximum number of issues to return (default: 50)
+        status: Optional status filter (open, in_progress, resolved, closed)
+        cursor: Optional next_cursor from a previous call to fetch the following page
+        summary: Return summary rows only, without description/metadata (default: False)
+    
+    Returns:
+        List of issues and next_cursor (None when there are no more pages)
+    """
+    try:
+        page = await aget_issues_page(limit=limit, status=status, cursor=cursor, summary=summary)
+        issues = page["issues"]
+        return {
+            "success": True,
+            "issues": [dict(issue) for issue in issues],
+            "count": len(issues),
+            "next_cursor": page["next_cursor"],
+            "message": f"Retrieved {len(issues)} issue(s)" + (" (more available - pass next_cursor)" if page["next_cursor"] else "")
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to get issues: {e}"
+        }
+
+
+@tool("update_issue_status_tool", args_schema=UpdateIssueStatusInput)
+async def aupdate_issue_status_tool(issue_id: str, status: str) -> Dict[str, Any]:
+    """
+    Update the status of an issue.
+    
+    Args:
+        issue_id: The issue ID to update
+        status: New status (open, in_progress, resolved, closed)
+    
+    Returns:
+        The updated issue
+    """
+    try:
+        updated = await aupdate_issue_status(issue_id, status)
+        if updated:
+            if status in ["resolved", "closed"]:
+                await aunindex_issue(issue_id)
             return {
                 "success": True,
                 "issue": dict(updated),
@@ -188,8 +488,20 @@ def get_db_tools():
     """Get all database tools"""
     return [
         save_issue_tool,
+        save_issues_bulk_tool,
         get_issue_tool,
         get_all_issues_tool,
+        search_issues_tool,
         update_issue_status_tool
     ]
 
+
+def get_async_db_tools():
+    """Get all database tools as async (coroutine) tools, for use with ainvoke"""
+    return [
+        asave_issue_tool,
+        aget_issue_tool,
+        aget_all_issues_tool,
+        aupdate_issue_status_tool
+    ]
+
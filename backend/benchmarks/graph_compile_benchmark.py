@@ -0,0 +1,53 @@
+"""
+Per-turn graph overhead: rebuilding the workflow on every turn (the old get_graph)
+vs fetching the compiled graph from the registry.
+
+No LLM or database calls are made - only graph construction is timed.
+
+Usage (from backend/):
+    python -m benchmarks.graph_compile_benchmark --turns 200
+"""
+
+import argparse
+import statistics
+import time
+
+from app.graph.najua_graph import build_graph
+from app.graph.registry import get_compiled_graph, warm_up_graphs, clear_graph_registry
+
+
+def _time_calls(fn, turns: int) -> list:
+    timings = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summary(label: str, timings: list) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"{label:<28} mean {statistics.mean(timings):9.4f} ms   p95 {p95:9.4f} ms   total {sum(timings):9.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark graph build vs compiled graph reuse")
+    parser.add_argument("--turns", type=int, default=200, help="Simulated conversation turns")
+    args = parser.parse_args()
+
+    clear_graph_registry()
+    warmup = warm_up_graphs()
+    print(f"Warm-up (one-off): {warmup['najua'] * 1000:.2f} ms\n")
+
+    rebuild = _time_calls(build_graph, args.turns)
+    cached = _time_calls(lambda: get_compiled_graph("najua"), args.turns)
+
+    print(_summary("build_graph() per turn", rebuild))
+    print(_summary("registry lookup per turn", cached))
+    saved = statistics.mean(rebuild) - statistics.mean(cached)
+    print(f"\nOverhead removed per turn: {saved:.4f} ms ({statistics.mean(rebuild) / max(statistics.mean(cached), 1e-9):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Load generator for server.py: simulated citizens, each with its own session,
+sending a short scripted conversation over HTTP.
+
+Reports turn latency percentiles, throughput and rejected (429/503) requests.
+The server makes real LLM calls - keep --users small against paid providers.
+
+Usage (from backend/, with the server running):
+    python -m benchmarks.load_generator --url http://localhost:8000 --users 20 --rounds 2
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+SCRIPT = [
+    "hi",
+    "I want to report a pothole",
+    "There is a deep pothole on the main road near Kayole market that is damaging cars",
+    "thanks, bye",
+]
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _citizen(client: httpx.AsyncClient, rounds: int, results: dict) -> None:
+    for _ in range(rounds):
+        response = await client.post("/sessions")
+        if response.status_code != 200:
+            results["rejected"] += 1
+            continue
+        session_id = response.json()["session_id"]
+        for message in SCRIPT:
+            start = time.perf_counter()
+            response = await client.post(f"/sessions/{session_id}/messages", json={"message": message})
+            elapsed = time.perf_counter() - start
+            if response.status_code == 200:
+                results["latencies"].append(elapsed)
+            elif response.status_code in (429, 503):
+                results["rejected"] += 1
+            else:
+                results["errors"] += 1
+        await client.delete(f"/sessions/{session_id}")
+
+
+async def run(url: str, users: int, rounds: int, timeout: float) -> None:
+    results = {"latencies": [], "rejected": 0, "errors": 0}
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(_citizen(client, rounds, results) for _ in range(users)))
+        wall = time.perf_counter() - start
+        health = (await client.get("/health")).json()
+
+    latencies = results["latencies"]
+    print(f"users={users} rounds={rounds} turns={len(latencies)} wall={wall:.1f}s "
+          f"throughput={len(latencies) / wall:.2f} turns/s")
+    if latencies:
+        print(f"turn latency: mean={statistics.mean(latencies) * 1000:.0f} ms "
+              f"p50={_percentile(latencies, 0.50) * 1000:.0f} ms "
+              f"p95={_percentile(latencies, 0.95) * 1000:.0f} ms "
+              f"p99={_percentile(latencies, 0.99) * 1000:.0f} ms")
+    print(f"rejected={results['rejected']} errors={results['errors']}")
+    print(f"server: {health}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate concurrent conversation load against server.py")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated citizens")
+    parser.add_argument("--rounds", type=int, default=1, help="Conversations per citizen")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (seconds)")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.users, args.rounds, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Logging throughput under concurrent sessions: inline (sync) file + console writes
+vs the background queue listener.
+
+Each simulated session logs what an agent turn logs - an INFO line, a DEBUG dump
+of the response model and the diagnostic JSON dump - and yields to the event
+loop between turns. Reports the time callers spend inside logging calls.
+Console output goes to /dev/null so the terminal isn't the bottleneck.
+
+Usage (from backend/):
+    python -m benchmarks.logging_benchmark --sessions 50 --turns 200
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from app.models.najua_models import IssueFillerResponse, IssuesFillerResponse
+from app.shared_services.logger_setup import setup_logger, stop_log_listener
+
+
+def _response() -> IssuesFillerResponse:
+    return IssuesFillerResponse(
+        message_to_user="Thank you. Could you tell me roughly when you first noticed the pothole?",
+        issues=[IssueFillerResponse(
+            issue_type="Infrastructure",
+            issue_description="Deep pothole on Namanga Road near the Kitengela market, damaging cars " * 3,
+            issue_location="Kitengela, Kajiado",
+            issue_severity="high",
+        )],
+        suggested_handoff="continue_filling",
+    )
+
+
+async def _session(logger: logging.Logger, turns: int, timings: list) -> None:
+    response = _response()
+    for turn in range(turns):
+        start = time.perf_counter()
+        logger.info("Issue filler agent completed turn %d. Handoff to %s", turn, response.suggested_handoff)
+        logger.debug("Issue filler agent LLM response: %s", response)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Issue filler agent LLM response: data %s", response.model_dump_json())
+        timings.append(time.perf_counter() - start)
+        await asyncio.sleep(0)
+
+
+async def _run(logger: logging.Logger, sessions: int, turns: int) -> tuple:
+    timings: list = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_session(logger, turns, timings) for _ in range(sessions)))
+    return time.perf_counter() - start, timings
+
+
+def _report(label: str, wall: float, timings: list, flush: float) -> None:
+    ordered = sorted(timings)
+    calls = len(timings) * 3
+    print(f"{label:<6} {wall:7.2f} s  {calls / wall:9.0f} records/s  "
+          f"per-turn p50={ordered[len(ordered) // 2] * 1e6:6.1f} us  "
+          f"p99={ordered[int(len(ordered) * 0.99)] * 1e6:7.1f} us  (flush after: {flush * 1000:.0f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs queued logging")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stderr(devnull):
+        # StreamHandler binds sys.stderr when created, so create loggers inside the redirect
+        sync_logger = setup_logger("bench_sync", mode="sync", log_dir=os.path.join(log_dir, "sync"))
+        wall, timings = asyncio.run(_run(sync_logger, args.sessions, args.turns))
+        results = [("sync", wall, timings, 0.0)]
+
+        queue_logger = setup_logger("bench_queue", mode="queue", log_dir=os.path.join(log_dir, "queue"))
+        wall, timings = asyncio.run(_run(queue_logger, args.sessions, args.turns))
+        start = time.perf_counter()
+        stop_log_listener()
+        results.append(("queue", wall, timings, time.perf_counter() - start))
+
+    print(f"{args.sessions} sessions x {args.turns} turns, 3 records per turn", file=sys.stdout)
+    for result in results:
+        _report(*result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Prompt render time: rebuilding the full prompt and schema per request (the old
+get_*_prompt behaviour) vs the precompiled prefix + per-request issue block.
+
+No LLM calls are made.
+
+Usage (from backend/):
+    python -m benchmarks.prompt_render_benchmark --iterations 2000
+"""
+
+import argparse
+import statistics
+import time
+
+from app.models.najua_models import IssueFillerResponse
+from app.prompts.welcome_prompt import WELCOME_PROMPT
+from app.prompts.issue_filler_prompt import ISSUE_FILLER_PROMPT
+from app.prompts.issue_reporting_prompt import ISSUE_REPORTING_PROMPT
+from app.shared_services.llm import get_schema_json
+
+
+def _uncached(template, *args):
+    # Old behaviour: schema regenerated and the whole prompt formatted every call
+    get_schema_json.cache_clear()
+    prompt = template.build_prefix()
+    if template.dynamic is not None:
+        prompt += template.dynamic(*args)
+    return prompt
+
+
+def _time(fn, iterations: int) -> list:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prompt template rendering")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    state = {
+        "current_issues": [
+            IssueFillerResponse(issue_type="Infrastructure", issue_description="Deep pothole", issue_location="Kitengela"),
+        ]
+    }
+    cases = [
+        ("welcome", WELCOME_PROMPT, ()),
+        ("issue_filler", ISSUE_FILLER_PROMPT, (state,)),
+        ("issue_reporting", ISSUE_REPORTING_PROMPT, (state,)),
+    ]
+
+    print(f"{'prompt':<16} {'uncached mean':>14} {'cached mean':>12} {'speedup':>8}   prefix share")
+    for name, template, render_args in cases:
+        uncached = _time(lambda: _uncached(template, *render_args), args.iterations)
+        template.render(*render_args)  # warm the prefix
+        cached = _time(lambda: template.render(*render_args), args.iterations)
+        prompt = template.render(*render_args)
+        share = len(template.prefix) / len(prompt)
+        print(
+            f"{name:<16} {statistics.mean(uncached):11.1f} us {statistics.mean(cached):9.1f} us "
+            f"{statistics.mean(uncached) / statistics.mean(cached):7.0f}x   {share:.0%} of {len(prompt)} chars"
+        )
+
+
+if __name__ == "__main__":
+    main()
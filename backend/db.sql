@@ -23,8 +23,28 @@ CREATE INDEX IF NOT EXISTS idx_issues_issue_id ON issues(issue_id);
 -- Create index on status for filtering
 CREATE INDEX IF NOT EXISTS idx_issues_status ON issues(status);
 
--- Create index on created_at for sorting
-CREATE INDEX IF NOT EXISTS idx_issues_created_at ON issues(created_at DESC);
+-- Keyset pagination indexes: listings order by (created_at, id) and seek past the cursor
+CREATE INDEX IF NOT EXISTS idx_issues_created_at_id ON issues(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_issues_status_created_at_id ON issues(status, created_at DESC, id DESC);
+
+-- Search indexes (used by search_issues in app/shared_services/db.py)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Full-text search over title (weight A) + description (weight B).
+-- The expression must match ISSUE_SEARCH_VECTOR_SQL in db.py for the planner to use it.
+CREATE INDEX IF NOT EXISTS idx_issues_search_vector ON issues USING GIN (
+    (setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+     setweight(to_tsvector('english', coalesce(description, '')), 'B'))
+);
+
+-- Fuzzy matching on location (stored in metadata) and category
+CREATE INDEX IF NOT EXISTS idx_issues_location_trgm ON issues USING GIN ((metadata->>'location') gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_issues_category_trgm ON issues USING GIN (category gin_trgm_ops);
+
+-- Tag containment filters (tags @> ARRAY[...])
+CREATE INDEX IF NOT EXISTS idx_issues_tags ON issues USING GIN (tags);
+
+CREATE INDEX IF NOT EXISTS idx_issues_priority ON issues(priority);
 
 -- Function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
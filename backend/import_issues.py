@@ -0,0 +1,38 @@
+"""
+Bulk-load issues from a CSV or JSONL export (e.g. SMS/WhatsApp backfills).
+
+Usage:
+    python import_issues.py exports/sms_issues.csv [--batch-size 5000] [--update]
+"""
+import argparse
+from app.shared_services.db import save_issues_from_file, close_pool
+from app.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load issues into the issues table")
+    parser.add_argument("path", help="Path to a .csv (with header row) or .jsonl file")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction")
+    parser.add_argument("--update", action="store_true",
+                        help="Overwrite issues whose issue_id already exists (default: keep existing)")
+    args = parser.parse_args()
+
+    try:
+        total = save_issues_from_file(
+            args.path,
+            batch_size=args.batch_size,
+            on_conflict="update" if args.update else "ignore",
+        )
+        print(f"✓ Loaded {total} issue(s) from {args.path}")
+    except Exception as e:
+        logger.error(f"Import failed: {e}")
+        print(f"✗ Import failed: {e}")
+        raise
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,17 @@ Agents use instructor for LLM calls.
 """
 
 import asyncio
+import os
 import sys
+from contextlib import nullcontext
+from typing import Dict
 from app.shared_services.logger_setup import setup_logger
-from app.graph.najua_graph import get_graph
+from app.shared_services.checkpointer import get_checkpointer
+from app.graph.najua_graph import get_graph, astream_turn, new_conversation_state
+from app.graph.registry import warm_up_graphs, get_compiled_graph
 from app.models.najua_models import NajuaState
+from app.shared_services.tracing import span
+from app.shared_services.metrics import start_metrics_server
 
 logger = setup_logger()
 
@@ -16,18 +23,34 @@ if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
-async def run_conversation():
+async def run_conversation(thread_id: str):
     """Run the conversation loop with LangGraph flow control"""
     
-    graph = get_graph()
-
     # State - your memory/context
-    state: NajuaState = {
-        "conversation_history": [],
-        "current_node": None,
-        "handoff_decision": None,
-        "current_issues": [],
-    }
+    state: NajuaState = new_conversation_state()
+    
+    # With checkpointing, state is saved once per turn and the thread resumes after a restart
+    persist = os.getenv("CHECKPOINT_ENABLED", "false").lower() == "true"
+    config = {"configurable": {"thread_id": thread_id}}
+    
+    # Compile once at startup - every turn reuses the same graph
+    if persist:
+        checkpointer = get_checkpointer()
+        await checkpointer.setup()
+        warm_up_graphs(["najua_persistent"])
+        graph = get_compiled_graph("najua_persistent")
+        
+        snapshot = await graph.aget_state(config)
+        if snapshot.values:
+            state = snapshot.values
+            print(f"Resuming conversation '{thread_id}' ({len(state.get('conversation_history', []))} messages)")
+    else:
+        warm_up_graphs()
+        graph = get_graph()
+    
+    # Optional scrape endpoint for the terminal runtime (server.py serves GET /metrics itself)
+    if os.getenv("METRICS_PORT"):
+        start_metrics_server(int(os.getenv("METRICS_PORT")))
     
     print("Najua System - Enter 'exit' to quit\n")
     
@@ -41,20 +64,40 @@ async def run_conversation():
         state["conversation_history"].append({"role": "user", "content": user_input})
         
         try:
-            # Invoke graph - LangGraph handles flow/routing
+            # Run graph - LangGraph handles flow/routing
             # Entry point is determined by agent_after_human_response from previous handoff
-            result = await graph.ainvoke(state)
+            # message_to_user is printed as it is generated; drafts are tracked per node so
+            # messages of several agents in one turn are printed separately and only once
+            streamed: Dict[str, str] = {}
+            result = None
+            # All checkpoint writes of the turn (every hop) are committed together
+            with span("turn", kind="turn", session_id=thread_id):
+                async with (checkpointer.batch(thread_id) if persist else nullcontext()):
+                    async for event in astream_turn(graph, state, config, durability="exit" if persist else None):
+                        if event["type"] == "message_delta":
+                            if event["node"] not in streamed:
+                                print("\nAssistant: ", end="", flush=True)
+                                streamed[event["node"]] = ""
+                            streamed[event["node"]] += event["delta"]
+                            print(event["delta"], end="", flush=True)
+                        elif event["type"] == "message":
+                            # The node's message is final - finish its draft (or print it anew if validation changed it)
+                            draft = streamed.pop(event["node"], None)
+                            content = event["content"]
+                            if draft is not None and content.startswith(draft):
+                                print(f"{content[len(draft):]}\n")
+                            elif draft is not None:
+                                print(f"\n\nAssistant: {content}\n")
+                            elif content:
+                                print(f"\nAssistant: {content}\n")
+                        else:
+                            result = event["state"]
+            if streamed:
+                print()  # A draft that didn't end up as a message
             
             # Update state with result
             state = result
             
-            # Display the last assistant message if any
-            conversation_history = result.get("conversation_history", [])
-            if conversation_history:
-                last_message = conversation_history[-1]
-                if last_message.get("role") == "assistant":
-                    print(f"\nAssistant: {last_message.get('content', '')}\n")
-            
             logger.info(f"Graph execution completed. Current node: {result.get('current_node')}")
             
         except Exception as e:
@@ -65,4 +108,6 @@ async def run_conversation():
 
 
 if __name__ == "__main__":
-    asyncio.run(run_conversation())
+    # python main.py [thread_id] - reuse a thread_id to continue that conversation
+    thread_id = sys.argv[1] if len(sys.argv) > 1 else os.getenv("NAJUA_THREAD_ID", "cli-session")
+    asyncio.run(run_conversation(thread_id))
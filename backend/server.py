@@ -0,0 +1,79 @@
+"""
+Multi-session conversation server (HTTP + WebSocket) on the shared compiled graph.
+main.py remains the single-user terminal interface.
+
+Usage:
+    python server.py [--host 0.0.0.0] [--port 8000]
+    uvicorn server:app --port 8000
+"""
+import argparse
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Response
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.routers import chat_router
+from app.shared_services.logger_setup import setup_logger
+from app.shared_services.metrics import CONTENT_TYPE, render_metrics
+from app.shared_services.session_manager import SessionManager
+
+load_dotenv()
+logger = setup_logger()
+
+if sys.platform == 'win32':
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sessions = SessionManager.from_env()
+    await sessions.start()
+    app.state.sessions = sessions
+    yield
+    # Graceful shutdown: finish queued turns before the process exits
+    await sessions.drain(timeout=float(os.getenv("SESSION_DRAIN_SECONDS", "30")))
+    logger.info("Server stopped")
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Najua", lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[o.strip() for o in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(chat_router)
+
+    @app.get("/health")
+    async def health():
+        sessions = app.state.sessions
+        return {"status": "draining" if sessions.draining else "ok", **sessions.snapshot()}
+
+    @app.get("/metrics")
+    async def metrics():
+        # Prometheus scrape endpoint
+        return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+    return app
+
+
+app = create_app()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the Najua conversation server")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", "8000")))
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
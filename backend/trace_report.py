@@ -0,0 +1,166 @@
+"""
+Latency breakdown from exported spans (TRACE_EXPORT=jsonl).
+
+For each agent (graph node): p50/p95/p99 of the node's total time, and of the time
+spent in LLM calls, DB calls, prompt building and everything else. Also per LLM
+provider/model attempt (latency, errors, fallbacks, tokens) and per DB call.
+
+Usage:
+    python trace_report.py [--file logs/traces.jsonl] [--last-minutes 60] [--session ID]
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.shared_services.tracing import DEFAULT_TRACE_FILE
+
+# Child span kinds a node's time is split into; the rest is reported as "other"
+BREAKDOWN_KINDS = ("llm", "db", "prompt")
+
+
+def load_spans(path: str, since: Optional[float] = None) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                s = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut off by a crash
+            if since is None or s["start"] >= since:
+                spans.append(s)
+    return spans
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _fmt(ms: Optional[float]) -> str:
+    return "-" if ms is None else f"{ms:.0f}" if ms >= 10 else f"{ms:.1f}"
+
+
+def node_breakdown(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, List[float]]]:
+    """agent -> {"total": [...], "llm": [...], "db": [...], "prompt": [...], "other": [...]} in ms per node run"""
+    by_id = {s["span_id"]: s for s in spans}
+    children = defaultdict(list)
+    for s in spans:
+        if s["parent_id"]:
+            children[s["parent_id"]].append(s)
+
+    def time_in(span_id: str) -> Dict[str, float]:
+        # Outermost span of each kind only - an llm.call's attempts (hedged ones overlap) aren't added again
+        totals = defaultdict(float)
+        for child in children.get(span_id, []):
+            if child["kind"] in BREAKDOWN_KINDS:
+                totals[child["kind"]] += child["duration_ms"]
+            else:
+                for kind, ms in time_in(child["span_id"]).items():
+                    totals[kind] += ms
+        return totals
+
+    result: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for s in by_id.values():
+        if s["kind"] != "node":
+            continue
+        agent = s["name"].split(".", 1)[-1]
+        parts = time_in(s["span_id"])
+        result[agent]["total"].append(s["duration_ms"])
+        for kind in BREAKDOWN_KINDS:
+            result[agent][kind].append(parts.get(kind, 0.0))
+        result[agent]["other"].append(max(0.0, s["duration_ms"] - sum(parts.values())))
+    return result
+
+
+def print_table(title: str, header: List[str], rows: List[List[str]]) -> None:
+    print(f"\n{title}")
+    if not rows:
+        print("  (no spans)")
+        return
+    widths = [max(len(str(r[i])) for r in [header] + rows) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  " + "  ".join(str(c).ljust(w) if i == 0 else str(c).rjust(w) for i, (c, w) in enumerate(zip(row, widths))))
+
+
+def report(spans: List[Dict[str, Any]]) -> None:
+    turns = [s["duration_ms"] for s in spans if s["kind"] == "turn"]
+    print(f"{len(spans)} span(s), {len(turns)} turn(s)")
+    if turns:
+        print(f"Turn latency ms: p50 {_fmt(percentile(turns, .5))}  p95 {_fmt(percentile(turns, .95))}  "
+              f"p99 {_fmt(percentile(turns, .99))}")
+
+    rows = []
+    for agent, parts in sorted(node_breakdown(spans).items()):
+        for part in ("total",) + BREAKDOWN_KINDS + ("other",):
+            values = parts[part]
+            rows.append([
+                agent if part == "total" else f"  {part}", len(values) if part == "total" else "",
+                _fmt(percentile(values, .5)), _fmt(percentile(values, .95)), _fmt(percentile(values, .99)),
+            ])
+    print_table("Per agent (ms)", ["agent", "runs", "p50", "p95", "p99"], rows)
+
+    attempts = defaultdict(list)
+    for s in spans:
+        if s["name"] == "llm.attempt":
+            a = s["attributes"]
+            attempts[(a.get("provider"), a.get("model"))].append(s)
+    rows = []
+    for (provider, model), group in sorted(attempts.items(), key=lambda kv: str(kv[0])):
+        ok = [s for s in group if s["status"] == "ok"]
+        latencies = [s["duration_ms"] for s in ok]
+        tokens = [s["attributes"] for s in ok if "prompt_tokens" in s["attributes"]]
+        prompt = sum(t["prompt_tokens"] for t in tokens)
+        rows.append([
+            f"{provider}/{model}", len(group), sum(s["status"] == "error" for s in group),
+            sum(s["attributes"].get("fallback_index", 0) > 0 for s in group),
+            _fmt(percentile(latencies, .5)), _fmt(percentile(latencies, .95)), _fmt(percentile(latencies, .99)),
+            round(prompt / len(tokens)) if tokens else "-",
+            f"{sum(t.get('cached_tokens', 0) for t in tokens) / prompt:.0%}" if prompt else "-",
+            round(sum(t.get("completion_tokens", 0) for t in tokens) / len(tokens)) if tokens else "-",
+        ])
+    print_table("LLM attempts (ms, tokens per call)",
+                ["provider/model", "n", "err", "fallback", "p50", "p95", "p99", "prompt", "cached", "completion"], rows)
+
+    causes = defaultdict(int)
+    for group in attempts.values():
+        for s in group:
+            if s["attributes"].get("retry_cause"):
+                causes[s["attributes"]["retry_cause"].split(":", 1)[0]] += 1
+    if causes:
+        print("  retry causes: " + ", ".join(f"{c} x{n}" for c, n in sorted(causes.items(), key=lambda kv: -kv[1])))
+
+    db_calls = defaultdict(list)
+    for s in spans:
+        if s["kind"] == "db":
+            db_calls[s["name"]].append(s)
+    rows = [
+        [name, len(group), sum(s["status"] == "error" for s in group),
+         *(_fmt(percentile([s["duration_ms"] for s in group], p)) for p in (.5, .95, .99))]
+        for name, group in sorted(db_calls.items())
+    ]
+    print_table("DB calls (ms)", ["call", "n", "err", "p50", "p95", "p99"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-agent latency breakdown from exported trace spans")
+    parser.add_argument("--file", default=DEFAULT_TRACE_FILE, help="JSONL written with TRACE_EXPORT=jsonl")
+    parser.add_argument("--last-minutes", type=float, default=None, help="Only spans started this recently")
+    parser.add_argument("--session", default=None, help="Only turns of this session id")
+    args = parser.parse_args()
+
+    since = time.time() - args.last_minutes * 60 if args.last_minutes else None
+    spans = load_spans(args.file, since)
+    if args.session:
+        traces = {s["trace_id"] for s in spans if s["kind"] == "turn" and s["attributes"].get("session_id") == args.session}
+        spans = [s for s in spans if s["trace_id"] in traces]
+    report(spans)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Train the welcome fast-path classifier (TF-IDF + logistic regression) and write it as JSON.
+
+Usage:
+    python train_router.py [--examples app/shared_services/fast_router_examples.jsonl]
+                           [--output app/shared_services/fast_router_model.json]
+"""
+import argparse
+import json
+
+from app.shared_services.fast_router import (
+    DEFAULT_EXAMPLES_PATH, DEFAULT_MODEL_PATH, TfidfLogisticModel, ROUTABLE_INTENTS,
+)
+
+
+def load_examples(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the welcome fast-path router")
+    parser.add_argument("--examples", default=DEFAULT_EXAMPLES_PATH, help="JSONL of {\"text\", \"intent\"}")
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--threshold", type=float, default=0.8, help="Threshold to report training coverage at")
+    args = parser.parse_args()
+
+    examples = load_examples(args.examples)
+    model = TfidfLogisticModel.train(examples, epochs=args.epochs)
+    model.save(args.output)
+
+    correct = confident = 0
+    for e in examples:
+        probs = model.predict_proba(e["text"])
+        intent = max(probs, key=probs.get)
+        correct += intent == e["intent"]
+        confident += intent in ROUTABLE_INTENTS and probs[intent] >= args.threshold
+    print(f"✓ Trained on {len(examples)} example(s), classes {model.classes}")
+    print(f"  training accuracy {correct / len(examples):.0%}, "
+          f"{confident / len(examples):.0%} routable at threshold {args.threshold}")
+    print(f"  saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()